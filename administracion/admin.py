@@ -1,6 +1,8 @@
 # administracion/admin.py
 
 from django.contrib import admin
+from django.db import transaction
+from ventas.rollups import quitar_venta, sumar_venta
 from .models import Venta, DetalleVenta
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth import get_user_model
@@ -16,12 +18,21 @@ class DetalleVentaInline(admin.TabularInline):
 @admin.register(Venta)
 class VentaAdmin(admin.ModelAdmin):
     list_display = ('id', 'usuario', 'fecha_venta', 'total')
+    list_select_related = ('usuario',)
     list_filter = ('fecha_venta',)
     inlines = [DetalleVentaInline]
     # Dejamos estos como solo lectura, pues ahora se llenan automáticamente
     readonly_fields = ('total', 'fecha_venta')
     ordering = ('-fecha_venta',)
 
+    # Los rollups de ventas (app ventas) se ajustan aquí: el admin no pasa por crear_pedido.
+    # changeform_view y delete_view ya corren dentro de una transacción
+    def save_model(self, request, obj, form, change):
+        if change:
+            # Se resta la venta como estaba guardada, antes de aplicar el formulario
+            quitar_venta(obj)
+        super().save_model(request, obj, form, change)
+
     # Este método se llama después de guardar la Venta y sus Detalles (inlines)
     def save_related(self, request, form, formsets, change):
         super().save_related(request, form, formsets, change)
@@ -32,6 +43,18 @@ class VentaAdmin(admin.ModelAdmin):
         # Llamamos a la función de lógica de negocio para calcular el total
         # ¡Esto actualiza y guarda los campos total y fecha_venta!
         venta.calcular_total()
+        sumar_venta(venta)
+
+    def delete_model(self, request, obj):
+        quitar_venta(obj)
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        # La acción "eliminar seleccionados" no abre una transacción propia
+        with transaction.atomic():
+            for venta in queryset:
+                quitar_venta(venta)
+            super().delete_queryset(request, queryset)
 
 # ----------------------------------------------------
 # 2. Registro de Usuario (OPCIONAL, pero útil)
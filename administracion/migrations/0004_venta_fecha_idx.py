@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administracion', '0003_alter_detalleventa_producto_delete_producto'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['fecha_venta', 'id'], name='venta_fecha_idx'),
+        ),
+    ]
@@ -1,10 +1,12 @@
 # administracion/models.py
 
-from django.db import models
+from django.db import models, transaction
 from usuarios.models import CustomUser as User
 from django.utils import timezone
 from django.db.models import Sum, F
 from productos.models import Producto # Import from productos app
+from productos.cache import incrementar_version
+from ventas.rollups import registrar_venta
 
 class Venta(models.Model):
     # Relación uno a muchos: Un usuario puede tener muchas ventas
@@ -12,6 +14,12 @@ class Venta(models.Model):
     fecha_venta = models.DateTimeField(default=timezone.now)
     total = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
 
+    class Meta:
+        indexes = [
+            # Rangos de fechas de la exportación de ventas (ver administracion/exportacion.py)
+            models.Index(fields=['fecha_venta', 'id'], name='venta_fecha_idx'),
+        ]
+
     def calcular_total(self):
         total_calculado = self.detalles.aggregate(
             total_venta=Sum(F('cantidad') * F('precio_unitario'))
@@ -20,6 +28,47 @@ class Venta(models.Model):
         self.total = total_calculado if total_calculado is not None else 0.00
         self.save()
 
+    @classmethod
+    def crear_pedido(cls, usuario, items):
+        """
+        Crea una venta con todas sus líneas en una sola transacción y con un número
+        fijo de consultas, sin importar cuántas líneas tenga:
+        una lectura de precios, un UPDATE de stock, un INSERT de la venta y un
+        bulk_create de los detalles (que no pasa por DetalleVenta.save, así que
+        el total se calcula una sola vez aquí). También suma la venta a los
+        rollups de la app ventas dentro de la misma transacción.
+
+        items: {producto_id: cantidad}. Lanza Producto.DoesNotExist si algún
+        producto no existe o no está disponible, y StockInsuficiente si no alcanza.
+        """
+        with transaction.atomic():
+            productos = Producto.objects.filter(pk__in=items.keys(), disponible=True).only('id', 'nombre', 'precio')
+            productos = {producto.pk: producto for producto in productos}
+            faltantes = sorted(pk for pk in items if pk not in productos)
+            if faltantes:
+                raise Producto.DoesNotExist(f"Productos no encontrados: {faltantes}")
+
+            Producto.objects.ajustar_stock_lote({pk: -cantidad for pk, cantidad in items.items()})
+
+            detalles = [
+                DetalleVenta(
+                    producto=productos[pk],
+                    cantidad=cantidad,
+                    precio_unitario=productos[pk].precio,
+                )
+                for pk, cantidad in items.items()
+            ]
+            venta = cls.objects.create(
+                usuario=usuario,
+                total=sum(detalle.cantidad * detalle.precio_unitario for detalle in detalles),
+            )
+            for detalle in detalles:
+                detalle.venta = venta
+            DetalleVenta.objects.bulk_create(detalles)
+            registrar_venta(venta, detalles)
+            transaction.on_commit(incrementar_version)
+        return venta, detalles
+
     def __str__(self):
         return f"Venta {self.id} de {self.usuario.username}"
 
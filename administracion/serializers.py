@@ -15,9 +15,23 @@ class DetalleVentaSerializer(serializers.ModelSerializer):
 
 class VentaSerializer(serializers.ModelSerializer):
     usuario_username = serializers.ReadOnlyField(source='usuario.username') 
-    detalles = DetalleVentaSerializer(source='detalleventa_set', many=True, read_only=True)
+    detalles = DetalleVentaSerializer(many=True, read_only=True)
 
     class Meta:
         model = Venta
         fields = ['id', 'usuario', 'usuario_username', 'fecha_venta', 'total', 'detalles']
-        read_only_fields = ['id', 'fecha_venta', 'total']
\ No newline at end of file
+        read_only_fields = ['id', 'fecha_venta', 'total']
+
+
+class ItemPedidoSerializer(serializers.Serializer):
+    producto = serializers.IntegerField()
+    cantidad = serializers.IntegerField(min_value=1)
+
+
+class PedidoSerializer(serializers.Serializer):
+    items = ItemPedidoSerializer(many=True, allow_empty=False)
+
+    def validate_items(self, value):
+        if len(value) > 500:
+            raise serializers.ValidationError("Máximo 500 líneas por pedido")
+        return value
@@ -1,3 +1,360 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from unittest import mock
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIClient
+
+from productos.autocomplete import autocompletado
+from productos.cache import version_catalogo
+from productos.models import Categoria, Producto
+from usuarios.models import CustomUser
+
+from .models import DetalleVenta, Venta
+
+
+class PedidoTests(TestCase):
+    """Checkout en bloque: una venta con todas sus líneas en una transacción"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.usuario = CustomUser.objects.create_user(username='cliente', email='cliente@test.com', password='x')
+        self.client.force_authenticate(self.usuario)
+        categoria = Categoria.objects.create(nombre='Combos')
+        self.productos = Producto.objects.bulk_create([
+            Producto(nombre=f'Combo {i}', precio=Decimal('10000.50') + i, stock=5, categoria=categoria)
+            for i in range(30)
+        ])
+
+    def pedir(self, items):
+        return self.client.post('/api/pedidos/', {'items': items}, format='json')
+
+    def test_crea_venta_con_total_y_precios(self):
+        a, b = self.productos[:2]
+        response = self.pedir([
+            {'producto': a.id, 'cantidad': 2},
+            {'producto': b.id, 'cantidad': 1},
+            {'producto': a.id, 'cantidad': 1},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['total'], '40003.00')
+        self.assertEqual(response.data['detalles'][0], {
+            'producto': a.id, 'producto_nombre': a.nombre, 'cantidad': 3, 'precio_unitario': '10000.50',
+        })
+
+        venta = Venta.objects.get(pk=response.data['id'])
+        self.assertEqual(venta.usuario, self.usuario)
+        self.assertEqual(venta.total, Decimal('40003.00'))
+        self.assertEqual(venta.detalles.count(), 2)
+        a.refresh_from_db()
+        self.assertEqual(a.stock, 2)
+
+    def test_consultas_constantes_por_numero_de_lineas(self):
+        def contar(productos):
+            items = [{'producto': p.id, 'cantidad': 1} for p in productos]
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.pedir(items).status_code, 201)
+            return len(ctx.captured_queries)
+
+        # El primer pedido crea las filas de los rollups de la hora y el día
+        contar(self.productos[29:])
+        self.assertEqual(contar(self.productos[:2]), contar(self.productos[2:29]))
+
+    def test_stock_insuficiente_no_crea_nada(self):
+        a, b = self.productos[:2]
+        response = self.pedir([{'producto': a.id, 'cantidad': 1}, {'producto': b.id, 'cantidad': 6}])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['productos'], [b.id])
+        self.assertFalse(Venta.objects.exists())
+        a.refresh_from_db()
+        self.assertEqual(a.stock, 5)
+
+    def test_producto_no_disponible_o_inexistente(self):
+        a = self.productos[0]
+        Producto.objects.filter(pk=a.pk).update(disponible=False)
+        self.assertEqual(self.pedir([{'producto': a.id, 'cantidad': 1}]).status_code, 404)
+        self.assertEqual(self.pedir([{'producto': 999999, 'cantidad': 1}]).status_code, 404)
+        self.assertFalse(DetalleVenta.objects.exists())
+
+    def test_validaciones(self):
+        self.assertEqual(self.pedir([]).status_code, 400)
+        self.assertEqual(self.pedir([{'producto': self.productos[0].id, 'cantidad': 0}]).status_code, 400)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.pedir([{'producto': self.productos[0].id, 'cantidad': 1}]).status_code, 401)
+
+
+class VentaAdminListadoTests(TestCase):
+    """El listado de ventas trae usuario y detalles con un número fijo de consultas"""
+
+    def setUp(self):
+        self.client = APIClient()
+        admin = CustomUser.objects.create_user(username='admin', email='admin@test.com', password='x', is_staff=True)
+        self.client.force_authenticate(admin)
+        categoria = Categoria.objects.create(nombre='Pizza')
+        productos = Producto.objects.bulk_create([
+            Producto(nombre=f'Pizza {i}', precio=1000 + i, categoria=categoria) for i in range(10)
+        ])
+        usuarios = CustomUser.objects.bulk_create([
+            CustomUser(username=f'cliente{i}', email=f'cliente{i}@test.com') for i in range(100)
+        ])
+        ventas = Venta.objects.bulk_create([Venta(usuario=usuario, total=0) for usuario in usuarios])
+        DetalleVenta.objects.bulk_create([
+            DetalleVenta(venta=venta, producto=producto, cantidad=1, precio_unitario=producto.precio)
+            for venta in ventas for producto in productos
+        ])
+
+    def test_detalles_correctos(self):
+        response = self.client.get('/api/admin/ventas/')
+        venta = response.data['results'][0]
+        self.assertEqual(len(venta['detalles']), 10)
+        self.assertTrue(venta['usuario_username'].startswith('cliente'))
+        self.assertTrue(venta['detalles'][0]['producto_nombre'].startswith('Pizza'))
+
+    def test_pagina_de_100_ventas_con_consultas_constantes(self):
+        with mock.patch.object(PageNumberPagination, 'page_size', 100):
+            # COUNT + ventas con usuario + detalles con producto
+            with self.assertNumQueries(3):
+                response = self.client.get('/api/admin/ventas/')
+        self.assertEqual(len(response.data['results']), 100)
+        self.assertEqual(sum(len(v['detalles']) for v in response.data['results']), 1000)
+
+
+class ExportarVentasTests(TestCase):
+    """Exportación de líneas de venta por streaming, con un número fijo de consultas"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = CustomUser.objects.create_user(username='admin', email='admin@test.com', password='x', is_staff=True)
+        self.client.force_authenticate(self.admin)
+        categoria = Categoria.objects.create(nombre='Perros')
+        self.perro = Producto.objects.create(nombre='Perro "Especial", grande', precio='12000.50', categoria=categoria)
+        self.gaseosa = Producto.objects.create(nombre='Gaseosa', precio='3000.00', categoria=categoria)
+        self.ana = CustomUser.objects.create_user(username='ana', email='ana@test.com')
+        bogota = ZoneInfo('America/Bogota')
+        # 23:30 del 31 de marzo en Bogotá ya es 1 de abril en UTC: debe quedar fuera de abril
+        for fecha, usuario in (
+            (datetime(2026, 3, 31, 23, 30, tzinfo=bogota), self.ana),
+            (datetime(2026, 4, 1, 8, 0, tzinfo=bogota), self.ana),
+            (datetime(2026, 4, 30, 23, 59, tzinfo=bogota), self.admin),
+            (datetime(2026, 5, 1, 0, 0, tzinfo=bogota), self.ana),
+        ):
+            venta = Venta.objects.create(usuario=usuario, fecha_venta=fecha, total=0)
+            DetalleVenta.objects.bulk_create([
+                DetalleVenta(venta=venta, producto=self.perro, cantidad=2, precio_unitario=self.perro.precio),
+                DetalleVenta(venta=venta, producto=self.gaseosa, cantidad=1, precio_unitario=self.gaseosa.precio),
+            ])
+
+    def exportar(self, **params):
+        return self.client.get('/api/admin/ventas/exportar/', {'desde': '2026-04-01', 'hasta': '2026-04-30', **params})
+
+    def test_csv_una_fila_por_linea(self):
+        response = self.exportar()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('filename="ventas_2026-04-01_2026-04-30.csv"', response['Content-Disposition'])
+
+        filas = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+        self.assertEqual(filas[0], [
+            'venta_id', 'fecha_venta', 'usuario', 'producto_id', 'producto', 'cantidad', 'precio_unitario', 'subtotal'
+        ])
+        self.assertEqual(len(filas), 5)
+        self.assertEqual(filas[1][1:], [
+            '2026-04-01T08:00:00-05:00', 'ana', str(self.perro.id), 'Perro "Especial", grande', '2', '12000.50', '24001.00'
+        ])
+        self.assertEqual([fila[2] for fila in filas[1:]], ['ana', 'ana', 'admin', 'admin'])
+
+    def test_ndjson(self):
+        response = self.exportar(formato='ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        lineas = [json.loads(linea) for linea in b''.join(response.streaming_content).decode('utf-8').splitlines()]
+        self.assertEqual(len(lineas), 4)
+        self.assertEqual(lineas[1]['producto'], 'Gaseosa')
+        self.assertEqual(lineas[1]['precio_unitario'], '3000.00')
+        self.assertEqual(lineas[1]['subtotal'], '3000.00')
+
+    def test_consultas_constantes(self):
+        ventas = Venta.objects.bulk_create([Venta(usuario=self.ana, total=0) for _ in range(300)])
+        DetalleVenta.objects.bulk_create([
+            DetalleVenta(venta=venta, producto=self.gaseosa, cantidad=1, precio_unitario=1) for venta in ventas
+        ] * 10)
+        hoy = timezone.localdate(Venta.objects.latest('fecha_venta').fecha_venta)
+        with mock.patch('administracion.exportacion.FILAS_POR_ENVIO', 100):
+            response = self.client.get('/api/admin/ventas/exportar/', {'desde': hoy, 'hasta': hoy})
+            with CaptureQueriesContext(connection) as ctx:
+                contenido = list(response.streaming_content)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertIn('JOIN', ctx.captured_queries[0]['sql'])
+        # Cabecera + bloques de 100 líneas
+        self.assertEqual(len(contenido), 31)
+
+    @override_settings(SERVIDOR='asgi')
+    def test_iterador_async_bajo_asgi(self):
+        response = self.exportar(formato='ndjson')
+        self.assertTrue(response.is_async)
+
+        async def consumir():
+            return [bloque async for bloque in response.streaming_content]
+
+        contenido = b''.join(async_to_sync(consumir)()).decode('utf-8')
+        self.assertEqual(len(contenido.splitlines()), 4)
+
+    def test_validaciones_y_permisos(self):
+        for params in ({'formato': 'xml'}, {'desde': 'ayer'}, {'hasta': ''}, {'desde': '2026-05-01'},
+                       {'hasta': '9999-12-31'}):
+            self.assertEqual(self.exportar(**params).status_code, 400)
+        self.client.force_authenticate(self.ana)
+        self.assertEqual(self.exportar().status_code, 403)
+
+
+@override_settings(CATALOGO_CACHE_TIMEOUT=0)
+class ProductoLoteTests(TestCase):
+    """Altas, cambios y bajas de productos en bloque desde el panel de administración"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = CustomUser.objects.create_user(username='admin', email='admin@test.com', is_staff=True)
+        self.client.force_authenticate(self.admin)
+        self.combos = Categoria.objects.create(nombre='Combos')
+        self.bebidas = Categoria.objects.create(nombre='Bebidas')
+        self.productos = Producto.objects.bulk_create([
+            Producto(nombre=f'Combo {i}', precio=Decimal('10000.00') + i, stock=5, categoria=self.combos)
+            for i in range(5)
+        ])
+        autocompletado.invalidar()
+
+    def tearDown(self):
+        autocompletado.invalidar()
+
+    def lote(self, metodo, datos):
+        return getattr(self.client, metodo)('/api/admin/productos/lote/', datos, format='json')
+
+    def test_crea_en_un_bulk_create_con_categorias_consultadas_una_vez(self):
+        self.client.get('/api/productos/autocomplete/', {'q': 'x'})
+        version = version_catalogo()
+        productos = [
+            {'nombre': f'Jugo {i}', 'precio': '4500.50', 'categoria': self.bebidas.id if i % 2 else self.combos.id, 'stock': i}
+            for i in range(300)
+        ]
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as consultas:
+            response = self.lote('post', {'productos': productos})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['mensaje'], '300 productos creados')
+        # Categorías (2), el INSERT, la búsqueda y la respuesta: no crece con el lote
+        self.assertLess(len(consultas), 15)
+
+        self.assertEqual([p['nombre'] for p in response.data['productos']], [p['nombre'] for p in productos])
+        self.assertEqual(response.data['productos'][1]['categoria_nombre'], 'Bebidas')
+        self.assertEqual(response.data['productos'][0]['precio'], '4500.50')
+        self.assertEqual(Producto.objects.filter(nombre__startswith='Jugo').count(), 300)
+        self.assertEqual(len(set(Producto.objects.values_list('codigo', flat=True))), 305)
+
+        self.assertGreater(version_catalogo(), version)
+        response = self.client.get('/api/productos/autocomplete/', {'q': 'jugo 29'})
+        self.assertEqual(response.data[0]['texto'], 'Jugo 29')
+        response = self.client.get('/api/productos/', {'search': 'jugo'})
+        self.assertEqual(response.data['count'], 300)
+
+    @override_settings(CATALOGO_CACHE_TIMEOUT=0)
+    def test_solo_reindexa_los_productos_del_lote(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('El índice FTS5 solo existe en SQLite')
+        # Los productos de setUp vienen de bulk_create y no están en el índice: deben seguir fuera
+        response = self.lote('patch', {'productos': [{'id': self.productos[0].id, 'nombre': 'Combo Parrillero'}]})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/api/productos/', {'search': 'combo'})
+        self.assertEqual([p['nombre'] for p in response.data['results']], ['Combo Parrillero'])
+
+    def test_lote_invalido_no_crea_nada(self):
+        response = self.lote('post', {'productos': [
+            {'nombre': 'Bueno', 'precio': '1000', 'categoria': self.combos.id},
+            {'nombre': 'Malo', 'precio': '-5', 'categoria': self.combos.id},
+            {'nombre': 'Sin categoría', 'precio': '1000', 'categoria': 999},
+        ]})
+        self.assertEqual(response.status_code, 400)
+        errores = response.data['detalle']
+        self.assertEqual(errores[0], {})
+        self.assertIn('precio', errores[1])
+        self.assertIn('categoria', errores[2])
+        self.assertEqual(Producto.objects.count(), 5)
+
+    def test_cambia_precios_sin_tocar_otros_campos(self):
+        anterior = Producto.objects.get(pk=self.productos[0].pk).fecha_actualizacion
+        cambios = [{'id': p.pk, 'precio': str(p.precio * 2)} for p in self.productos[:4]]
+        cambios.append({'id': self.productos[4].pk, 'disponible': False, 'categoria': self.bebidas.id})
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as consultas:
+            response = self.lote('patch', {'productos': cambios})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['mensaje'], '5 productos actualizados')
+        self.assertLess(len(consultas), 15)
+        self.assertEqual([p['id'] for p in response.data['productos']], [c['id'] for c in cambios])
+
+        primero = Producto.objects.get(pk=self.productos[0].pk)
+        self.assertEqual((primero.precio, primero.stock, primero.nombre), (Decimal('20000.00'), 5, 'Combo 0'))
+        self.assertGreater(primero.fecha_actualizacion, anterior)
+        ultimo = Producto.objects.get(pk=self.productos[4].pk)
+        self.assertEqual((ultimo.disponible, ultimo.categoria_id, ultimo.precio), (False, self.bebidas.id, Decimal('10004.00')))
+
+    def test_cambio_solo_escribe_los_campos_enviados(self):
+        pk = self.productos[0].pk
+        real_bulk_update = Producto.objects.bulk_update
+
+        def stock_concurrente(productos, campos, **kwargs):
+            # El stock cambia entre la lectura del lote y la escritura
+            Producto.objects.filter(pk=pk).update(stock=1)
+            return real_bulk_update(productos, campos, **kwargs)
+
+        with mock.patch.object(Producto.objects, 'bulk_update', side_effect=stock_concurrente) as bulk_update:
+            response = self.lote('patch', {'productos': [{'id': pk, 'precio': '9000'}]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(bulk_update.call_args.args[1], ('precio', 'fecha_actualizacion'))
+        self.assertEqual(Producto.objects.get(pk=pk).stock, 1)
+
+    def test_cambio_con_ids_invalidos(self):
+        a = self.productos[0].pk
+        response = self.lote('patch', {'productos': [
+            {'id': a, 'precio': '1'}, {'id': a, 'precio': '2'}, {'id': 999, 'precio': '3'}, {'precio': '4'},
+        ]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [str(e['id'][0]) if e else None for e in response.data['detalle']],
+            [None, 'Producto repetido en el lote', 'Producto no encontrado', 'Producto no encontrado'],
+        )
+        self.assertEqual(Producto.objects.get(pk=a).precio, Decimal('10000.00'))
+
+    def test_elimina_todo_o_nada(self):
+        ids = [p.pk for p in self.productos[:3]]
+        response = self.lote('delete', {'ids': ids + [999]})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['productos'], [999])
+        self.assertEqual(Producto.objects.count(), 5)
+
+        self.client.get('/api/productos/autocomplete/', {'q': 'x'})
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.lote('delete', {'ids': ids})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['eliminados'], ids)
+        self.assertEqual(Producto.objects.count(), 2)
+        response = self.client.get('/api/productos/autocomplete/', {'q': 'combo'})
+        self.assertEqual(len([s for s in response.data if s['tipo'] == 'producto']), 2)
+
+    def test_limites_y_permisos(self):
+        self.assertEqual(self.lote('post', {'productos': []}).status_code, 400)
+        self.assertEqual(self.lote('delete', {'ids': ['1']}).status_code, 400)
+        with mock.patch('administracion.views.ProductoAdminViewSet.max_productos_lote', 2):
+            response = self.lote('delete', {'ids': [1, 2, 3]})
+        self.assertEqual(response.data['error'], 'Máximo 2 productos por petición')
+
+        cliente = CustomUser.objects.create_user(username='cliente', email='cliente@test.com')
+        self.client.force_authenticate(cliente)
+        self.assertEqual(self.lote('delete', {'ids': [self.productos[0].pk]}).status_code, 403)
+        self.assertEqual(Producto.objects.count(), 5)
@@ -1,12 +1,30 @@
 # administracion/views.py
 
-from rest_framework import viewsets, filters
-from rest_framework.permissions import IsAdminUser
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+from rest_framework import viewsets, filters, status, serializers
+from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
+from productos import imagenes
+from productos.autocomplete import autocompletado
+from productos.cache import incrementar_version
 from productos.models import Producto
 from productos.serializers import ProductoSerializer
-from .models import Venta
-from .serializers import VentaSerializer 
+from productos.pagination import ProductoPagination
+from productos.search import BusquedaProductoFilter, reindexar_productos
+from productos.models import StockInsuficiente
+from ventas.rollups import quitar_venta, sumar_venta
+from .exportacion import contenido_streaming, csv_por_bloques, lineas_de_venta, ndjson_por_bloques
+from .models import Venta, DetalleVenta
+from .serializers import VentaSerializer, DetalleVentaSerializer, PedidoSerializer
 
 # ViewSet para Productos: Permite a los administradores el CRUD completo.
 class ProductoAdminViewSet(viewsets.ModelViewSet):
@@ -14,15 +32,204 @@ class ProductoAdminViewSet(viewsets.ModelViewSet):
     serializer_class = ProductoSerializer
     # ¡CRUCIAL! Solo permite acceso a usuarios staff/admin
     permission_classes = [IsAdminUser]
+    # Paginación por páginas o keyset (?paginacion=cursor) para el dashboard
+    pagination_class = ProductoPagination
     # Add filtering support
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, BusquedaProductoFilter]
     filterset_fields = ['categoria', 'disponible']
-    search_fields = ['nombre', 'descripcion']
     ordering_fields = ['precio', 'fecha_creacion']
+    max_productos_lote = 2000
+
+    @action(detail=False, methods=['post', 'patch', 'delete'])
+    def lote(self, request):
+        """
+        Altas, cambios y bajas de muchos productos en una sola petición y transacción.
+        POST {"productos": [{...}, ...]} crea; PATCH {"productos": [{"id": 1, "precio": "9000"}, ...]}
+        cambia solo los campos enviados; DELETE {"ids": [1, 2, ...]} elimina.
+        Es todo o nada: si algún elemento es inválido no se escribe ninguno y los
+        errores vuelven en el mismo orden del lote.
+        """
+        clave = 'ids' if request.method == 'DELETE' else 'productos'
+        datos = request.data.get(clave)
+        if not isinstance(datos, list) or not datos:
+            return Response({'error': f'{clave} debe ser una lista no vacía'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(datos) > self.max_productos_lote:
+            return Response(
+                {'error': f'Máximo {self.max_productos_lote} productos por petición'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if request.method == 'DELETE':
+            return self.eliminar_lote(datos)
+
+        if request.method == 'POST':
+            serializer = self.get_serializer(data=datos, many=True)
+        else:
+            ids = [item['id'] for item in datos if isinstance(item, dict) and type(item.get('id')) is int]
+            serializer = self.get_serializer(Producto.objects.in_bulk(ids), data=datos, many=True, partial=True)
+        if not serializer.is_valid():
+            return Response(
+                {'error': 'Productos inválidos', 'detalle': serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        with transaction.atomic():
+            productos = serializer.save()
+            # bulk_create/bulk_update no emiten post_save: búsqueda, autocompletado y cache se actualizan aquí
+            campos = {campo for attrs in serializer.validated_data for campo in attrs}
+            if request.method == 'POST' or campos & {'nombre', 'descripcion'}:
+                reindexar_productos(producto.pk for producto in productos)
+            transaction.on_commit(lambda: [autocompletado.producto_guardado(p) for p in productos])
+            transaction.on_commit(incrementar_version)
+
+        pks = [producto.pk for producto in productos]
+        filas = {fila['id']: fila for fila in self.representar_productos(pks)}
+        creados = request.method == 'POST'
+        return Response({
+            'mensaje': f"{len(pks)} productos {'creados' if creados else 'actualizados'}",
+            'productos': [filas[pk] for pk in pks],
+        }, status=status.HTTP_201_CREATED if creados else status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], parser_classes=[MultiPartParser, FormParser])
+    def imagen(self, request, pk=None):
+        """
+        Sube la imagen del producto (multipart, campo 'imagen'). Se guarda en
+        MEDIA_ROOT y las miniaturas WebP/AVIF se generan en el pool de procesos:
+        imagen_srcset queda vacío hasta que terminan.
+        """
+        producto = self.get_object()
+        archivo = request.FILES.get('imagen')
+        if archivo is None:
+            return Response({'error': 'Envía el archivo en el campo imagen'}, status=status.HTTP_400_BAD_REQUEST)
+        if archivo.size > imagenes.tamano_maximo():
+            return Response({'error': 'La imagen supera el tamaño máximo permitido'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            producto.imagen = imagenes.guardar_original(archivo.read())
+        except imagenes.ImagenInvalida as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        producto.save(update_fields=['imagen', 'fecha_actualizacion'])
+        variantes = imagenes.procesar(producto)
+        if variantes:
+            producto.imagen_variantes = variantes
+        return Response(self.get_serializer(producto).data)
+
+    def eliminar_lote(self, ids):
+        if any(isinstance(pk, bool) or not isinstance(pk, int) for pk in ids):
+            return Response({'error': 'ids debe contener solo enteros'}, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            existentes = set(Producto.objects.select_for_update().filter(pk__in=ids).values_list('pk', flat=True))
+            faltantes = sorted(set(ids) - existentes)
+            if faltantes:
+                return Response(
+                    {'error': f'Productos no encontrados: {faltantes}', 'productos': faltantes},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            # delete() sí emite post_delete por producto: las señales sacan cada uno de la búsqueda y el autocompletado
+            Producto.objects.filter(pk__in=existentes).delete()
+        return Response({'mensaje': f'{len(existentes)} productos eliminados', 'eliminados': sorted(existentes)})
+
+    def representar_productos(self, pks):
+        """Respuesta del lote en una consulta, por el camino rápido de ProductoSerializer"""
+        filas = ProductoSerializer.filas(Producto.objects.filter(pk__in=pks))
+        return ProductoSerializer.representar_filas(filas, self.get_serializer_context())
 
 # ViewSet para Ventas: Permite a los administradores ver, crear, y potencialmente modificar ventas.
 class VentaAdminViewSet(viewsets.ModelViewSet):
-    queryset = Venta.objects.all().order_by('-fecha_venta') 
+    # Usuario por JOIN y detalles (con su producto) en una sola consulta extra por página
+    queryset = Venta.objects.select_related('usuario').prefetch_related(
+        Prefetch('detalles', queryset=DetalleVenta.objects.select_related('producto'))
+    ).order_by('-fecha_venta')
     serializer_class = VentaSerializer
     # ¡CRUCIAL! Solo permite acceso a usuarios staff/admin
-    permission_classes = [IsAdminUser]
\ No newline at end of file
+    permission_classes = [IsAdminUser]
+
+    # Estas ventas no pasan por crear_pedido: los rollups se ajustan en la misma transacción
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            sumar_venta(serializer.save())
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            quitar_venta(serializer.instance)
+            sumar_venta(serializer.save())
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            quitar_venta(instance)
+            instance.delete()
+
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        """
+        Líneas de venta entre dos fechas (inclusive) en CSV o NDJSON, enviadas por
+        bloques. Parámetros: ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD&formato=csv|ndjson
+        (formato y no format: ese lo usa DRF para elegir el renderer).
+        """
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in ('csv', 'ndjson'):
+            return Response({'error': 'formato debe ser csv o ndjson'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            desde = date.fromisoformat(request.query_params['desde'])
+            hasta = date.fromisoformat(request.query_params['hasta'])
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'desde y hasta son requeridos con formato AAAA-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if desde > hasta:
+            return Response({'error': 'desde no puede ser posterior a hasta'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Días completos en la zona horaria del negocio
+        zona = timezone.get_current_timezone()
+        try:
+            inicio = datetime.combine(desde, time.min, tzinfo=zona)
+            fin = datetime.combine(hasta + timedelta(days=1), time.min, tzinfo=zona)
+            # Se pasan a UTC aquí y no al consultar, cuando la respuesta ya empezó a enviarse
+            inicio, fin = inicio.astimezone(dt_timezone.utc), fin.astimezone(dt_timezone.utc)
+        except OverflowError:
+            return Response({'error': 'Rango de fechas fuera de lo permitido'}, status=status.HTTP_400_BAD_REQUEST)
+        filas = lineas_de_venta(inicio, fin)
+        if formato == 'csv':
+            bloques, content_type = csv_por_bloques(filas), 'text/csv; charset=utf-8'
+        else:
+            bloques, content_type = ndjson_por_bloques(filas), 'application/x-ndjson; charset=utf-8'
+
+        response = StreamingHttpResponse(contenido_streaming(bloques), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="ventas_{desde}_{hasta}.{formato}"'
+        return response
+
+# Checkout: crea la venta y todas sus líneas en una sola transacción
+class PedidoView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = PedidoSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {'error': 'Pedido inválido', 'detalle': serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        items = {}
+        for item in serializer.validated_data['items']:
+            items[item['producto']] = items.get(item['producto'], 0) + item['cantidad']
+
+        try:
+            venta, detalles = Venta.crear_pedido(request.user, items)
+        except Producto.DoesNotExist as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        except StockInsuficiente as e:
+            return Response(
+                {'error': 'Stock insuficiente', 'productos': e.productos},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        total = serializers.DecimalField(max_digits=10, decimal_places=2).to_representation(venta.total)
+        return Response({
+            'mensaje': 'Pedido creado exitosamente',
+            'id': venta.id,
+            'fecha_venta': venta.fecha_venta,
+            'total': total,
+            'detalles': DetalleVentaSerializer(detalles, many=True).data,
+        }, status=status.HTTP_201_CREATED)
@@ -0,0 +1,79 @@
+"""
+Benchmark de JWTCacheAuthentication: peticiones/s autenticadas con y sin la
+cache del usuario.
+
+Pide /api/categorias/ con un token Bearer; la respuesta sale de la cache del
+catálogo, así el costo medido es casi solo el de autenticar. Crea una base de
+datos temporal y la destruye al terminar. Uso:
+
+    python bench_autenticacion.py [--peticiones 2000]
+"""
+import os
+import sys
+import time
+import argparse
+import django
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mi_proyecto.settings')
+django.setup()
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from productos.models import Categoria
+from usuarios.models import CustomUser
+
+
+def medir(client, token, peticiones):
+    client.get('/api/categorias/', HTTP_AUTHORIZATION=f'Bearer {token}')
+    consultas = []
+
+    def contar(execute, sql, params, many, context):
+        consultas.append(sql)
+        return execute(sql, params, many, context)
+
+    inicio = time.perf_counter()
+    with connection.execute_wrapper(contar):
+        for _ in range(peticiones):
+            response = client.get('/api/categorias/', HTTP_AUTHORIZATION=f'Bearer {token}')
+            assert response.status_code == 200, response.status_code
+    segundos = time.perf_counter() - inicio
+    return peticiones / segundos, len(consultas) / peticiones
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--peticiones', type=int, default=2000)
+    args = parser.parse_args()
+
+    nombre_original = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        for i in range(10):
+            Categoria.objects.create(nombre=f'Categoría {i}')
+        user = CustomUser.objects.create_user(username='bench', email='bench@example.com', password='x')
+        token = str(RefreshToken.for_user(user).access_token)
+        client = Client()
+
+        print(f"{'modo':<12} {'peticiones/s':>13} {'consultas/petición':>19}")
+        with override_settings(CATALOGO_CACHE_TIMEOUT=300, ALLOWED_HOSTS=['*']):
+            for modo, timeout in (('sin cache', 0), ('con cache', 60)):
+                cache.clear()
+                with override_settings(JWT_USUARIO_CACHE_TIMEOUT=timeout):
+                    rps, consultas = medir(client, token, args.peticiones)
+                print(f"{modo:<12} {rps:>13.0f} {consultas:>19.2f}")
+        print(f"\nBase de datos: {settings.DATABASES['default']['ENGINE']}")
+    finally:
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
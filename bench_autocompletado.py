@@ -0,0 +1,61 @@
+"""
+Benchmark del autocompletado: latencia de IndicePrefijos.buscar con 100k nombres.
+
+No usa la base de datos; mide solo el índice en memoria. Uso:
+
+    python bench_autocompletado.py [--productos 100000]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import django
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mi_proyecto.settings')
+django.setup()
+
+from productos.autocomplete import IndicePrefijos
+
+PALABRAS = [
+    'hamburguesa', 'pizza', 'perro', 'café', 'malteada', 'papas', 'queso', 'tocineta',
+    'piña', 'jamón', 'pollo', 'gaseosa', 'limonada', 'combo', 'doble', 'picante',
+    'champiñones', 'salchicha', 'helado', 'brownie', 'mediana', 'familiar', 'natural',
+]
+PREFIJOS = ['h', 'ha', 'hamb', 'pizza pi', 'cafe', 'zzz']
+REPETICIONES = 10000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--productos', type=int, default=100000)
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    indice = IndicePrefijos()
+    inicio = time.perf_counter()
+    for i in range(args.productos):
+        nombre = ' '.join(rnd.sample(PALABRAS, 3)).capitalize() + f' {i}'
+        indice.agregar('producto', i, nombre, rnd.random() * 5)
+    print(f"Índice de {args.productos} nombres construido en {time.perf_counter() - inicio:.1f} s")
+
+    print(f"\n{'prefijo':<12} {'µs por consulta':>16} {'resultados':>11}")
+    for prefijo in PREFIJOS:
+        inicio = time.perf_counter()
+        for _ in range(REPETICIONES):
+            resultados = indice.buscar(prefijo, 8)
+        micro = (time.perf_counter() - inicio) / REPETICIONES * 1e6
+        print(f"{prefijo:<12} {micro:>16.1f} {len(resultados):>11}")
+
+    inicio = time.perf_counter()
+    for i in range(1000):
+        indice.agregar('producto', i, f'Producto renombrado {i}', 1.0)
+    print(f"\nActualización incremental: {(time.perf_counter() - inicio):.3f} ms por producto")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark de búsqueda de productos: icontains (SearchFilter anterior) vs texto completo.
+
+Crea una base de datos de prueba temporal, la llena con productos de nombres y
+descripciones variadas y mide, para varios términos, el tiempo de contar los
+resultados y traer la primera página (12 productos). Uso:
+
+    python bench_busqueda.py [--productos 100000]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import django
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mi_proyecto.settings')
+django.setup()
+
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import setup_test_environment
+from productos.models import Categoria, Producto
+from productos.search import buscar_productos, reindexar_productos
+
+PALABRAS = [
+    'hamburguesa', 'pizza', 'perro', 'café', 'malteada', 'papas', 'queso', 'tocineta',
+    'piña', 'jamón', 'pollo', 'gaseosa', 'limonada', 'combo', 'doble', 'picante',
+    'champiñones', 'salchicha', 'helado', 'brownie', 'mediana', 'familiar', 'natural',
+]
+TERMINOS = ['cafe', 'hamburguesa doble', 'piña jamon', 'brownie helado familiar', 'inexistente']
+REPETICIONES = 5
+
+
+def poblar(total):
+    rnd = random.Random(42)
+    categoria = Categoria.objects.create(nombre='General')
+    lote = []
+    for i in range(total):
+        lote.append(Producto(
+            nombre=' '.join(rnd.sample(PALABRAS, 2)).capitalize(),
+            descripcion=' '.join(rnd.sample(PALABRAS, 8)),
+            precio=1000 + i % 50000,
+            categoria=categoria,
+        ))
+        if len(lote) == 5000:
+            Producto.objects.bulk_create(lote)
+            lote = []
+    Producto.objects.bulk_create(lote)
+    # bulk_create no dispara señales: reconstruir la tabla de búsqueda
+    reindexar_productos()
+
+
+def icontains(termino):
+    condiciones = Q()
+    for palabra in termino.split():
+        condiciones &= Q(nombre__icontains=palabra) | Q(descripcion__icontains=palabra)
+    return Producto.objects.filter(disponible=True).filter(condiciones).order_by('-fecha_creacion')
+
+
+def texto_completo(termino):
+    queryset = buscar_productos(Producto.objects.filter(disponible=True), termino)
+    return queryset.order_by('-relevancia', '-fecha_creacion')
+
+
+def medir(queryset_fn, termino):
+    tiempos = []
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        queryset = queryset_fn(termino)
+        total = queryset.count()
+        list(queryset[:12])
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos) * 1000, total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--productos', type=int, default=100000)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    nombre_db = connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f"Creando {args.productos} productos ({connection.vendor})...")
+        poblar(args.productos)
+
+        print(f"\n{'termino':<26} {'icontains ms':>13} {'(n)':>8} {'texto completo ms':>18} {'(n)':>8}")
+        for termino in TERMINOS:
+            ms_viejo, n_viejo = medir(icontains, termino)
+            ms_nuevo, n_nuevo = medir(texto_completo, termino)
+            print(f"{termino:<26} {ms_viejo:>13.2f} {n_viejo:>8} {ms_nuevo:>18.2f} {n_nuevo:>8}")
+        print("\nicontains no ignora tildes: 'cafe' no encuentra 'café' y 'jamon' no encuentra 'jamón'.")
+    finally:
+        connection.creation.destroy_test_db(nombre_db, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
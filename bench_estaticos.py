@@ -0,0 +1,223 @@
+"""
+Benchmark de la página del menú servida por WhiteNoiseAsyncMiddleware: bytes
+transferidos y tiempo estimado hasta el primer render, antes (frontend sin
+precomprimir, fotos originales, sin cabeceras de cache) y después (assets
+brotli/gzip, miniaturas AVIF/WebP del ancho de la tarjeta, cabeceras immutable).
+
+Usa el build real de Vite si existe (generado con `VITE_API_URL=/ npm run build`
+en frontend/). Si no, arma uno de reemplazo con las fuentes de frontend/src:
+sin React ni dependencias, así que los bytes del JS son menores que los reales.
+
+Crea una base de datos de prueba temporal con productos con foto, pide cada
+recurso con el cliente de pruebas de Django a través del middleware real y
+estima el tiempo con un modelo de red simple: cada etapa de la cadena
+index.html -> JS/CSS -> /api/productos/ -> fotos visibles cuesta un RTT más
+sus bytes a la velocidad del enlace. Uso:
+
+    python bench_estaticos.py [--dist frontend/dist] [--productos 24] [--visibles 8] [--ancho-tarjeta 320]
+"""
+import os
+import re
+import sys
+import time
+import base64
+import shutil
+import hashlib
+import json
+import argparse
+import tempfile
+import django
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mi_proyecto.settings')
+django.setup()
+
+from io import BytesIO
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment
+from PIL import Image
+from whitenoise.compress import Compressor
+from productos import imagenes
+from productos.models import Categoria, Producto
+
+# (nombre, megabits/s, RTT en ms): el primero es el perfil "Slow 4G" de Lighthouse
+REDES = [('móvil lento', 1.6, 150), ('banda ancha', 20, 20)]
+ASSETS = re.compile(r'(?:src|href)="(/assets/[^"]+)"')
+
+
+def build_de_reemplazo(destino):
+    fuentes = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend', 'src')
+    partes = {'.js': [], '.css': []}
+    for raiz, _, nombres in sorted(os.walk(fuentes)):
+        for nombre in sorted(nombres):
+            extension = '.css' if nombre.endswith('.css') else '.js' if nombre.endswith(('.js', '.jsx')) else None
+            if extension:
+                with open(os.path.join(raiz, nombre), encoding='utf-8-sig') as archivo:
+                    partes[extension].append(archivo.read())
+
+    os.makedirs(os.path.join(destino, 'assets'))
+    nombres = {}
+    for extension, textos in partes.items():
+        contenido = '\n'.join(textos).encode('utf-8')
+        digest = base64.urlsafe_b64encode(hashlib.sha256(contenido).digest())[:8].decode()
+        nombres[extension] = f'/assets/index-{digest}{extension}'
+        with open(destino + nombres[extension], 'wb') as archivo:
+            archivo.write(contenido)
+    with open(os.path.join(destino, 'index.html'), 'w', encoding='utf-8') as archivo:
+        archivo.write(
+            '<!doctype html><html lang="es"><head><meta charset="UTF-8" />'
+            f'<script type="module" crossorigin src="{nombres[".js"]}"></script>'
+            f'<link rel="stylesheet" crossorigin href="{nombres[".css"]}"></head>'
+            '<body><div id="root"></div></body></html>'
+        )
+
+
+def foto(semilla, ancho, alto):
+    """JPEG con textura a varias escalas: se comprime como una foto y no como un color plano"""
+    ruido = Image.effect_noise((ancho // 12, alto // 12), 60 + semilla % 20)
+    ruido = ruido.resize((ancho, alto), Image.Resampling.BICUBIC).convert('RGB')
+    ruido = Image.blend(ruido, Image.effect_noise((ancho, alto), 20).convert('RGB'), 0.3)
+    degradado = Image.linear_gradient('L').resize((ancho, alto)).convert('RGB')
+    contenido = BytesIO()
+    Image.blend(ruido, degradado, 0.6).save(contenido, 'JPEG', quality=85)
+    return contenido.getvalue()
+
+
+def poblar(total, ancho):
+    categoria = Categoria.objects.create(nombre='Hamburguesas')
+    for i in range(total):
+        producto = Producto.objects.create(
+            nombre=f'Hamburguesa {i}', precio=15000 + i, categoria=categoria, stock=10,
+            imagen=imagenes.guardar_original(foto(i, ancho, ancho * 3 // 4)),
+        )
+        imagenes.procesar(producto)
+
+
+def elegir_miniatura(producto, ancho):
+    """Lo que haría el navegador con <picture>: AVIF (o WebP) del menor ancho que cubre la tarjeta"""
+    for formato in ('avif', 'webp'):
+        opciones = producto['imagen_srcset'].get(formato)
+        if opciones:
+            candidatos = [parte.rsplit(' ', 1) for parte in opciones.split(', ')]
+            candidatos = sorted((int(w[:-1]), url) for url, w in candidatos)
+            return next((url for w, url in candidatos if w >= ancho), candidatos[-1][1])
+    return producto['imagen']
+
+
+def pedir(cliente, url, **headers):
+    inicio = time.perf_counter()
+    response = cliente.get(url, headers={'accept-encoding': 'gzip, br', **headers})
+    contenido = b''.join(response.streaming_content) if response.streaming else response.content
+    servidor = time.perf_counter() - inicio
+    inmutable = 'immutable' in response.get('Cache-Control', '')
+    return {'url': url, 'bytes': len(contenido), 'servidor': servidor, 'inmutable': inmutable,
+            'cuerpo': contenido, 'codificacion': response.get('Content-Encoding', '-'),
+            'cache': response.get('Cache-Control', '-')}
+
+
+def visitar(dist, args):
+    with override_settings(SERVIR_FRONTEND=True, WHITENOISE_ROOT=dist, WHITENOISE_AUTOREFRESH=False):
+        cliente = Client(HTTP_HOST='menu.example.com')
+        index = pedir(cliente, '/', accept='text/html')
+        # El cuerpo puede venir en brotli: los assets se leen del index.html en disco
+        with open(os.path.join(dist, 'index.html'), encoding='utf-8') as archivo:
+            assets = [pedir(cliente, url) for url in ASSETS.findall(archivo.read())]
+        api = pedir(cliente, '/api/productos/', accept='application/json')
+        productos = json.loads(api['cuerpo'])['results'][:args.visibles]
+        return index, assets, api, productos, cliente
+
+
+def fotos(cliente, urls):
+    return [pedir(cliente, url.replace('http://menu.example.com', '')) for url in urls]
+
+
+def tiempo(etapas, megabits, rtt, repetida=False):
+    """Suma por etapa: RTT + bytes/ancho de banda + el servidor más lento de la etapa"""
+    total = 0.0
+    for etapa in etapas:
+        # En la visita repetida lo immutable sale de la cache sin pedirse; lo demás se revalida (304)
+        pendientes = [r for r in etapa if not (repetida and r['inmutable'])]
+        if not pendientes:
+            continue
+        descargados = sum(0 if repetida and r['url'] != '/api/productos/' else r['bytes'] for r in pendientes)
+        total += rtt / 1000 + descargados * 8 / (megabits * 1e6) + max(r['servidor'] for r in pendientes)
+    return total * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dist', default=os.path.join('frontend', 'dist'))
+    parser.add_argument('--productos', type=int, default=24)
+    parser.add_argument('--visibles', type=int, default=8, help="Fotos en la primera pantalla (default: 8)")
+    parser.add_argument('--ancho-foto', type=int, default=1600, help="Ancho de las fotos originales (default: 1600)")
+    parser.add_argument('--ancho-tarjeta', type=int, default=320,
+                        help="Ancho en px de la imagen en la tarjeta del menú (default: 320)")
+    args = parser.parse_args()
+
+    temporal = tempfile.mkdtemp()
+    setup_test_environment()
+    nombre_db = connection.creation.create_test_db(verbosity=0)
+    try:
+        antes, despues = os.path.join(temporal, 'antes'), os.path.join(temporal, 'despues')
+        if os.path.isfile(os.path.join(args.dist, 'index.html')):
+            shutil.copytree(args.dist, antes)
+            print(f"Build de Vite: {args.dist}")
+        else:
+            build_de_reemplazo(antes)
+            print(f"No hay build en {args.dist}: se usa uno de reemplazo con frontend/src (sin React)")
+        shutil.copytree(antes, despues)
+        compresor = Compressor(quiet=True)
+        for raiz, _, nombres in os.walk(despues):
+            for nombre in nombres:
+                if compresor.should_compress(nombre):
+                    list(compresor.compress(os.path.join(raiz, nombre)))
+
+        with override_settings(MEDIA_ROOT=os.path.join(temporal, 'media'), IMAGENES_PROCESOS=0):
+            print(f"Creando {args.productos} productos con fotos de {args.ancho_foto}px y sus miniaturas...")
+            poblar(args.productos, args.ancho_foto)
+
+            resultados = {}
+            for nombre, dist in (('antes', antes), ('después', despues)):
+                index, assets, api, productos, cliente = visitar(dist, args)
+                if nombre == 'antes':
+                    urls = [p['imagen'] for p in productos]
+                else:
+                    urls = [elegir_miniatura(p, args.ancho_tarjeta) for p in productos]
+                imagenes_visibles = fotos(cliente, urls)
+                if nombre == 'antes':
+                    # Antes el build y MEDIA_URL no tenían cabeceras de cache: todo se revalida
+                    for recurso in [*assets, *imagenes_visibles]:
+                        recurso['inmutable'], recurso['cache'] = False, '-'
+                resultados[nombre] = [[index], assets, [api], imagenes_visibles]
+
+        for nombre, etapas in resultados.items():
+            print(f"\n=== {nombre} ===")
+            print(f"{'recurso':<58} {'bytes':>9} {'encoding':>9}  cache")
+            for recurso in [r for etapa in etapas for r in etapa]:
+                url = recurso['url'] if len(recurso['url']) <= 58 else '...' + recurso['url'][-55:]
+                print(f"{url:<58} {recurso['bytes']:>9} {recurso['codificacion']:>9}  {recurso['cache']}")
+
+        print(f"\n=== menú: primer render (texto) / con {args.visibles} fotos, ms estimados ===")
+        print(f"{'':<12} {'KB primer render':>17} {'KB con fotos':>13}" + ''.join(
+            f" {red:>24}" for red, _, _ in REDES
+        ) + f" {'repetida (' + REDES[0][0] + ')':>28}")
+        for nombre, etapas in resultados.items():
+            texto = sum(r['bytes'] for etapa in etapas[:3] for r in etapa) / 1024
+            total = sum(r['bytes'] for etapa in etapas for r in etapa) / 1024
+            fila = f"{nombre:<12} {texto:>17.1f} {total:>13.1f}"
+            for _, megabits, rtt in REDES:
+                fila += f" {tiempo(etapas[:3], megabits, rtt):>11.0f} / {tiempo(etapas, megabits, rtt):>10.0f}"
+            _, megabits, rtt = REDES[0]
+            fila += f" {tiempo(etapas[:3], megabits, rtt, True):>13.0f} / {tiempo(etapas, megabits, rtt, True):>12.0f}"
+            print(fila)
+    finally:
+        connection.creation.destroy_test_db(nombre_db, verbosity=0)
+        shutil.rmtree(temporal, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
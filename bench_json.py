@@ -0,0 +1,133 @@
+"""
+Benchmark del renderer JSON: JSONRenderer de DRF (json de la biblioteca
+estándar) contra JSONRapidoRenderer (orjson), sobre los datos que devuelven
+los listados de productos, categorías y ventas.
+
+Crea una base de datos de prueba temporal, arma los datos con los mismos
+serializadores que usan las vistas y mide solo el render. También comprueba
+que ambos renderers produzcan los mismos bytes. Uso:
+
+    python bench_json.py [--productos 10000] [--ventas 2000] [--repeticiones 20]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import django
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mi_proyecto.settings')
+django.setup()
+
+from django.db import connection
+from django.db.models import Count, Prefetch, Q
+from django.test.utils import setup_test_environment
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from administracion.models import DetalleVenta, Venta
+from administracion.serializers import VentaSerializer
+from mi_proyecto.renderers import JSONRapidoRenderer, orjson
+from productos.models import Categoria, Producto
+from productos.serializers import CategoriaSerializer, ProductoSerializer
+from usuarios.models import CustomUser
+
+
+def poblar(productos, ventas):
+    categorias = Categoria.objects.bulk_create([
+        Categoria(nombre=f'Categoría {i}', icono='🍔', descripcion='Comidas rápidas y bebidas') for i in range(20)
+    ])
+    Producto.objects.bulk_create([
+        Producto(
+            nombre=f'Hamburguesa “{i}”',
+            descripcion='Pan artesanal, carne de res, queso y salsa de la casa',
+            precio=f'{1000 + (i * 37) % 50000}.50',
+            calificacion=(i % 50) / 10,
+            categoria=categorias[i % len(categorias)],
+            imagen=f'https://cdn.example.com/{i}.jpg',
+            stock=10,
+        )
+        for i in range(productos)
+    ], batch_size=5000)
+
+    usuario = CustomUser.objects.create_user(username='cliente', email='cliente@example.com')
+    precios = list(Producto.objects.values_list('id', 'precio')[:200])
+    aleatorio = random.Random(7)
+    Venta.objects.bulk_create([Venta(usuario=usuario, total='0.00') for _ in range(ventas)], batch_size=5000)
+    DetalleVenta.objects.bulk_create([
+        DetalleVenta(venta_id=venta_id, producto_id=pk, cantidad=aleatorio.randint(1, 4), precio_unitario=precio)
+        for venta_id in Venta.objects.values_list('id', flat=True)
+        for pk, precio in aleatorio.sample(precios, 3)
+    ], batch_size=5000)
+
+
+def payloads(request):
+    contexto = {'request': request}
+    productos = Producto.objects.filter(disponible=True).select_related('categoria').order_by('id')
+    categorias = Categoria.objects.annotate(
+        num_productos=Count('productos'),
+        num_disponibles=Count('productos', filter=Q(productos__disponible=True)),
+    ).order_by('nombre')
+    ventas = Venta.objects.select_related('usuario').prefetch_related(
+        Prefetch('detalles', queryset=DetalleVenta.objects.select_related('producto'))
+    ).order_by('-fecha_venta')
+
+    todos = ProductoSerializer.representar_filas(ProductoSerializer.filas(productos), contexto)
+    return [
+        ('productos (página de 12)', {'count': len(todos), 'next': None, 'previous': None, 'results': todos[:12]}),
+        (f'productos disponibles ({len(todos)})', todos),
+        ('categorías', CategoriaSerializer(categorias, many=True, context=contexto).data),
+        (f'ventas ({ventas.count()})', VentaSerializer(ventas, many=True, context=contexto).data),
+    ]
+
+
+def mejor(renderer, datos, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        contenido = renderer.render(datos, 'application/json')
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos) * 1000, contenido
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--productos', type=int, default=10000)
+    parser.add_argument('--ventas', type=int, default=2000)
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    if orjson is None:
+        print("orjson no está instalado: JSONRapidoRenderer usa el renderer de DRF")
+
+    setup_test_environment()
+    nombre_db = connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f"Creando {args.productos} productos y {args.ventas} ventas...")
+        poblar(args.productos, args.ventas)
+        request = Request(APIRequestFactory().get('/api/productos/', HTTP_HOST='menu.example.com'))
+
+        print(f"\n=== render (ms, mejor de {args.repeticiones}) ===")
+        print(f"{'payload':<30} {'KB':>8} {'DRF':>9} {'orjson':>9} {'mejora':>8} {'iguales':>8}")
+        distintos = False
+        for nombre, datos in payloads(request):
+            estandar, esperado = mejor(JSONRenderer(), datos, args.repeticiones)
+            rapido, contenido = mejor(JSONRapidoRenderer(), datos, args.repeticiones)
+            iguales = contenido == esperado
+            distintos = distintos or not iguales
+            print(
+                f"{nombre:<30} {len(esperado) / 1024:>8.1f} {estandar:>9.2f} {rapido:>9.2f} "
+                f"{estandar / rapido:>7.1f}x {'sí' if iguales else 'NO':>8}"
+            )
+        if distintos:
+            sys.exit(1)
+    finally:
+        connection.creation.destroy_test_db(nombre_db, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
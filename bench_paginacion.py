@@ -0,0 +1,90 @@
+"""
+Benchmark de paginación del catálogo: OFFSET (?page=N) vs keyset (?paginacion=cursor).
+
+Crea una base de datos de prueba temporal con 100k productos y mide la latencia
+de las páginas 1, 10, 100 y 1000 en ambos modos. Uso:
+
+    python bench_paginacion.py [--productos 100000]
+"""
+import os
+import sys
+import time
+import argparse
+import django
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mi_proyecto.settings')
+django.setup()
+
+from django.db import connection
+from django.test.utils import setup_test_environment
+from rest_framework.test import APIClient
+from productos.models import Categoria, Producto
+
+PAGINAS = [1, 10, 100, 1000]
+REPETICIONES = 5
+
+
+def poblar(total):
+    categorias = Categoria.objects.bulk_create([Categoria(nombre=f'Categoria {i}') for i in range(10)])
+    lote = []
+    for i in range(total):
+        lote.append(Producto(
+            nombre=f'Producto {i}',
+            precio=1000 + (i * 37) % 50000,
+            calificacion=(i % 50) / 10,
+            categoria=categorias[i % len(categorias)],
+            stock=10,
+        ))
+        if len(lote) == 5000:
+            Producto.objects.bulk_create(lote)
+            lote = []
+    Producto.objects.bulk_create(lote)
+
+
+def medir(client, url):
+    tiempos = []
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        response = client.get(url)
+        tiempos.append(time.perf_counter() - inicio)
+        assert response.status_code == 200, response.status_code
+    return min(tiempos) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--productos', type=int, default=100000)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    nombre_db = connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f"Creando {args.productos} productos...")
+        poblar(args.productos)
+        client = APIClient()
+
+        for orden in ['-fecha_creacion', 'precio']:
+            print(f"\n=== ordering={orden} (ms, mejor de {REPETICIONES}) ===")
+            print(f"{'pagina':>8} {'offset':>10} {'keyset':>10}")
+            # Recorre las páginas keyset siguiendo los enlaces 'next'
+            url = f'/api/productos/?paginacion=cursor&ordering={orden}'
+            cursores = {}
+            for pagina in range(1, max(PAGINAS) + 1):
+                if pagina in PAGINAS:
+                    cursores[pagina] = url
+                url = client.get(url).data['next']
+
+            for pagina in PAGINAS:
+                offset = medir(client, f'/api/productos/?page={pagina}&ordering={orden}')
+                keyset = medir(client, cursores[pagina])
+                print(f"{pagina:>8} {offset:>10.2f} {keyset:>10.2f}")
+    finally:
+        connection.creation.destroy_test_db(nombre_db, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Microbenchmark del serializador de productos: ProductoSerializer(many=True)
+contra el camino rápido desde .values() (ProductoSerializer.representar_filas).
+
+Crea una base de datos de prueba temporal con 10k productos (la mitad con
+imagen relativa, que obliga a armar la URL absoluta) y mide por separado la
+consulta y la serialización, como en la acción `disponibles`. También
+comprueba que el JSON de ambos caminos sea idéntico byte a byte. Uso:
+
+    python bench_serializador.py [--productos 10000] [--repeticiones 5]
+"""
+import os
+import sys
+import time
+import argparse
+import django
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mi_proyecto.settings')
+django.setup()
+
+from django.db import connection
+from django.test.utils import setup_test_environment
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from productos.models import Categoria, Producto
+from productos.serializers import ProductoSerializer
+
+
+def poblar(total):
+    categorias = Categoria.objects.bulk_create([Categoria(nombre=f'Categoria {i}') for i in range(10)])
+    lote = []
+    for i in range(total):
+        lote.append(Producto(
+            nombre=f'Producto {i}',
+            descripcion='Pan artesanal, carne de res y queso',
+            precio=1000 + (i * 37) % 50000,
+            calificacion=(i % 50) / 10,
+            categoria=categorias[i % len(categorias)],
+            imagen=f'/media/productos/{i}.jpg' if i % 2 else f'https://cdn.example.com/{i}.jpg',
+            stock=10,
+        ))
+        if len(lote) == 5000:
+            Producto.objects.bulk_create(lote)
+            lote = []
+    Producto.objects.bulk_create(lote)
+
+
+def mejor(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos) * 1000, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--productos', type=int, default=10000)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    nombre_db = connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f"Creando {args.productos} productos...")
+        poblar(args.productos)
+
+        request = Request(APIRequestFactory().get('/api/productos/disponibles/', HTTP_HOST='menu.example.com'))
+        contexto = {'request': request}
+        queryset = Producto.objects.filter(disponible=True).select_related('categoria').order_by('id')
+
+        consulta_modelos, instancias = mejor(lambda: list(queryset.all()), args.repeticiones)
+        consulta_filas, filas = mejor(lambda: list(ProductoSerializer.filas(queryset.all())), args.repeticiones)
+        generico, datos = mejor(
+            lambda: ProductoSerializer(instancias, many=True, context=contexto).data, args.repeticiones
+        )
+        rapido, datos_rapidos = mejor(
+            lambda: ProductoSerializer.representar_filas(filas, contexto), args.repeticiones
+        )
+
+        identicos = JSONRenderer().render(datos) == JSONRenderer().render(datos_rapidos)
+        print(f"\n=== {len(instancias)} productos (ms, mejor de {args.repeticiones}) ===")
+        print(f"{'camino':<22} {'consulta':>10} {'serializar':>11} {'total':>10}")
+        print(f"{'ModelSerializer':<22} {consulta_modelos:>10.1f} {generico:>11.1f} {consulta_modelos + generico:>10.1f}")
+        print(f"{'values() + rápido':<22} {consulta_filas:>10.1f} {rapido:>11.1f} {consulta_filas + rapido:>10.1f}")
+        print(f"\nSerialización {generico / rapido:.1f}x más rápida; JSON idéntico: {'sí' if identicos else 'NO'}")
+        if not identicos:
+            sys.exit(1)
+    finally:
+        connection.creation.destroy_test_db(nombre_db, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Prueba de carga WSGI vs ASGI: peticiones/s y latencia p50/p99 con muchos
+clientes concurrentes sobre las lecturas del catálogo.
+
+Cargar productos en la base de datos, p. ej. con:
+
+    python manage.py catalogo_import productos/datos/categorias.csv --tipo categorias
+    python manage.py catalogo_import productos/datos/productos.csv
+
+levantar los dos servidores contra ella con el mismo número de workers:
+
+    gunicorn mi_proyecto.wsgi:application --workers 4 --bind 127.0.0.1:8000
+    uvicorn mi_proyecto.asgi:application --workers 4 --port 8001
+
+y luego:
+
+    python bench_servidores.py --wsgi http://127.0.0.1:8000 --asgi http://127.0.0.1:8001 [--clientes 500] [--segundos 20]
+
+Cada cliente abre una conexión por petición (los workers sync de gunicorn no
+mantienen keep-alive). El generador de carga corre en un solo proceso: si la
+CPU de la máquina se satura, los números miden al cliente y no al servidor.
+"""
+import sys
+import time
+import asyncio
+import argparse
+from urllib.parse import urlsplit
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+RUTAS = [
+    '/api/productos/',
+    '/api/productos/?ordering=precio',
+    '/api/categorias/',
+    '/api/productos/disponibles/',
+    '/api/productos/autocomplete/?q=ha',
+]
+
+
+async def pedir(host, puerto, ruta):
+    lector, escritor = await asyncio.open_connection(host, puerto)
+    try:
+        escritor.write(
+            f"GET {ruta} HTTP/1.1\r\nHost: {host}:{puerto}\r\nAccept: application/json\r\n"
+            f"Connection: close\r\n\r\n".encode('ascii')
+        )
+        await escritor.drain()
+        respuesta = await lector.read()
+    finally:
+        escritor.close()
+    return int(respuesta.split(b' ', 2)[1])
+
+
+async def cliente(host, puerto, fin, indice, latencias, errores):
+    i = indice
+    while time.perf_counter() < fin:
+        ruta = RUTAS[i % len(RUTAS)]
+        i += 1
+        inicio = time.perf_counter()
+        try:
+            status = await pedir(host, puerto, ruta)
+        except (OSError, IndexError, ValueError):
+            errores.append(ruta)
+            await asyncio.sleep(0.05)
+            continue
+        if status != 200:
+            errores.append(ruta)
+            continue
+        latencias.append(time.perf_counter() - inicio)
+
+
+async def medir(url, clientes, segundos):
+    partes = urlsplit(url)
+    host, puerto = partes.hostname, partes.port or 80
+
+    # Calentar caches y el índice de autocompletado de los workers
+    for ruta in RUTAS * 8:
+        await pedir(host, puerto, ruta)
+
+    latencias, errores = [], []
+    inicio = time.perf_counter()
+    fin = inicio + segundos
+    await asyncio.gather(*(cliente(host, puerto, fin, i, latencias, errores) for i in range(clientes)))
+    duracion = time.perf_counter() - inicio
+    return latencias, errores, duracion
+
+
+def percentil(valores, p):
+    if not valores:
+        return float('nan')
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--wsgi', default='http://127.0.0.1:8000')
+    parser.add_argument('--asgi', default='http://127.0.0.1:8001')
+    parser.add_argument('--clientes', type=int, default=500)
+    parser.add_argument('--segundos', type=float, default=20)
+    args = parser.parse_args()
+
+    print(f"{args.clientes} clientes concurrentes, {args.segundos:.0f} s por servidor\n")
+    print(f"{'servidor':<8} {'peticiones/s':>13} {'p50 ms':>9} {'p99 ms':>9} {'errores':>9}")
+    for nombre, url in (('WSGI', args.wsgi), ('ASGI', args.asgi)):
+        latencias, errores, duracion = asyncio.run(medir(url, args.clientes, args.segundos))
+        print(
+            f"{nombre:<8} {len(latencias) / duracion:>13.0f} "
+            f"{percentil(latencias, 0.50) * 1000:>9.1f} {percentil(latencias, 0.99) * 1000:>9.1f} "
+            f"{len(errores):>9}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -5,7 +5,14 @@ set -o errexit
 # Modify this line as needed for your package manager (pip, poetry, etc.)
 pip install -r requirements.txt
 
-# Convert static asset files
+# Frontend servido por Django/WhiteNoise (SERVIR_FRONTEND=True): build de Vite
+# apuntando a la API del mismo origen y precomprimido con brotli/gzip
+if [ "${SERVIR_FRONTEND:-False}" = "True" ]; then
+    (cd frontend && npm ci && VITE_API_URL=/ npm run build)
+    python -m whitenoise.compress frontend/dist
+fi
+
+# Convert static asset files (CompressedManifestStaticFilesStorage también genera .br/.gz)
 python manage.py collectstatic --no-input
 
 # Apply any outstanding database migrations
@@ -0,0 +1,12 @@
+// Imagen de producto con las miniaturas AVIF/WebP de la API (imagen_srcset);
+// el navegador elige formato y ancho, y la imagen original queda de respaldo.
+export default function ImagenProducto({ producto, sizes, ...props }) {
+    const srcset = producto.imagen_srcset || {};
+    return (
+        <picture>
+            {srcset.avif && <source type="image/avif" srcSet={srcset.avif} sizes={sizes} />}
+            {srcset.webp && <source type="image/webp" srcSet={srcset.webp} sizes={sizes} />}
+            <img src={producto.imagen} alt={producto.nombre} loading="lazy" decoding="async" {...props} />
+        </picture>
+    );
+}
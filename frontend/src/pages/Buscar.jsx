@@ -2,6 +2,7 @@ import { useSearchParams, useNavigate } from "react-router-dom";
 import { useState, useEffect } from "react";
 import { getProductos } from "../services/api";
 import logo from "../assets/LogotipoProyecto.png";
+import ImagenProducto from "../components/ImagenProducto";
 
 export default function Buscar() {
   const [searchParams] = useSearchParams();
@@ -62,7 +63,11 @@ export default function Buscar() {
                 className="bg-white rounded-2xl overflow-hidden shadow-lg"
               >
                 {p.imagen ? (
-                  <img src={p.imagen} alt={p.nombre} className="w-full h-48 object-cover" />
+                  <ImagenProducto
+                    producto={p}
+                    sizes="(min-width: 1024px) 25vw, (min-width: 768px) 50vw, 100vw"
+                    className="w-full h-48 object-cover"
+                  />
                 ) : (
                   <div className="w-full h-48 bg-gray-200 flex items-center justify-center">
                     📷
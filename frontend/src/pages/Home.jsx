@@ -3,6 +3,7 @@ import { Link, useNavigate } from "react-router-dom";
 import { logout, getProductos, getCategorias } from "../services/api";
 import logo from "../assets/LogotipoProyecto.png";
 import { useCart } from "../context/CartContext";
+import ImagenProducto from "../components/ImagenProducto";
 
 export default function Home() {
   const [searchQuery, setSearchQuery] = useState("");
@@ -340,14 +341,14 @@ export default function Home() {
                       {/* Imagen */}
                       <div className="relative h-64 overflow-hidden bg-gray-100">
                         {product.imagen ? (
-                          <img
-                            src={product.imagen}
-                            alt={product.nombre}
+                          <ImagenProducto
+                            producto={product}
+                            sizes="(min-width: 1024px) 25vw, (min-width: 768px) 50vw, 100vw"
                             className="w-full h-full object-cover group-hover:scale-110 transition-transform duration-700"
                             onError={(e) => {
                               console.error("Error cargando imagen:", product.imagen);
                               e.target.style.display = 'none';
-                              e.target.parentElement.querySelector('.fallback-icon').style.display = 'flex';
+                              e.target.closest('.relative').querySelector('.fallback-icon').style.display = 'flex';
                             }}
                           />
                         ) : null}
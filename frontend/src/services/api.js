@@ -114,6 +114,11 @@ export const adminLogin = (data) => api.post("/api/usuarios/admin-login/", data)
 export const verifyCode = (data) => api.post("/api/usuarios/verify-code/", data);
 
 export const logout = () => {
+  // Revoca los tokens en el servidor; la sesión local se cierra igual si falla
+  const refresh = localStorage.getItem("refresh_token");
+  if (localStorage.getItem("access_token")) {
+    api.post("/api/usuarios/logout/", refresh ? { refresh } : {}).catch(() => {});
+  }
   localStorage.removeItem("access_token");
   localStorage.removeItem("refresh_token");
   localStorage.removeItem("username");
@@ -124,6 +129,9 @@ export const getProductos = (params = {}) => api.get("/api/productos/", { params
 
 export const getProducto = (id) => api.get(`/api/productos/${id}/`);
 
+export const getAutocompletado = (q, limit = 8) =>
+  api.get("/api/productos/autocomplete/", { params: { q, limit } });
+
 export const calificarProducto = (id, calificacion) =>
   api.post(`/api/productos/${id}/calificar/`, { calificacion });
 
@@ -138,6 +146,17 @@ export const updateAdminProducto = (id, data) => api.put(`/api/admin/productos/$
 
 export const deleteAdminProducto = (id) => api.delete(`/api/admin/productos/${id}/`);
 
+// Lotes (todo o nada): productos = [{ nombre, precio, categoria, ... }] / [{ id, precio, ... }]
+export const createAdminProductosLote = (productos) => api.post("/api/admin/productos/lote/", { productos });
+
+export const updateAdminProductosLote = (productos) => api.patch("/api/admin/productos/lote/", { productos });
+
+export const deleteAdminProductosLote = (ids) => api.delete("/api/admin/productos/lote/", { data: { ids } });
+
+// ========== PEDIDOS ==========
+// items: [{ producto: id, cantidad: n }]
+export const crearPedido = (items) => api.post("/api/pedidos/", { items });
+
 // ========== CATEGORIAS ==========
 export const getCategorias = (params = {}) => api.get("/api/categorias/", { params });
 
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mi_proyecto.settings')
+# Activa las URLs con vistas async del catálogo (mi_proyecto/urls_asgi.py)
+os.environ.setdefault('FASTFOOD_SERVIDOR', 'asgi')
 
 application = get_asgi_application()
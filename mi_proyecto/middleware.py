@@ -0,0 +1,103 @@
+import os
+import re
+from urllib.parse import urlparse
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+from whitenoise.middleware import WhiteNoiseMiddleware
+from whitenoise.string_utils import ensure_leading_trailing_slash
+
+# Nombres que genera `vite build`: assets/<nombre>-<hash de 8 caracteres>.<ext>
+ASSET_VITE = re.compile(r'^/assets/.+-[A-Za-z0-9_-]{8}\.\w+$')
+
+
+class WhiteNoiseAsyncMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware que también funciona en la cadena async. La original es
+    solo síncrona: bajo ASGI obligaría a Django a correr todo el resto de la
+    cadena (y las vistas async del catálogo) en un hilo.
+
+    Además sirve MEDIA_URL y, con SERVIR_FRONTEND, el build de Vite
+    (WHITENOISE_ROOT) en el mismo origen que la API. Las imágenes de productos
+    se generan con el servidor corriendo, así que se buscan en disco la primera
+    vez que se piden. Los assets con hash de Vite y las imágenes de productos
+    (carpetas nombradas por el sha256 del contenido) se envían como immutable;
+    index.html se revalida siempre.
+    """
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        # Antes de super(): add_files() ya consulta immutable_file_test()
+        self.media_prefix = ensure_leading_trailing_slash(urlparse(settings.MEDIA_URL).path)
+        self.imagen_producto = re.compile(re.escape(self.media_prefix) + r'productos/[0-9a-f]{32}/')
+        self.servir_frontend = getattr(settings, 'SERVIR_FRONTEND', False)
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        static_file = self.buscar(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return self.ruta_del_frontend(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        # Lo ya conocido sale del diccionario de WhiteNoise. Ir al disco (MEDIA_URL aún no
+        # recordado o autorefresh en DEBUG) hace stat y no debe bloquear el event loop
+        url = request.path_info
+        static_file = None if self.autorefresh else self.files.get(url)
+        if static_file is None and (self.autorefresh or url.startswith(self.media_prefix)):
+            static_file = await sync_to_async(self.buscar, thread_sensitive=False)(url)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return self.ruta_del_frontend(request, await self.get_response(request))
+
+    def buscar(self, url):
+        if self.autorefresh:
+            static_file = self.find_file(url)
+        else:
+            static_file = self.files.get(url)
+        if static_file is None and url.startswith(self.media_prefix):
+            static_file = self.buscar_media(url)
+        return static_file
+
+    def buscar_media(self, url):
+        if not self.url_is_canonical(url):
+            return None
+        try:
+            ruta = safe_join(settings.MEDIA_ROOT, url[len(self.media_prefix):])
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(ruta):
+            return None
+        static_file = self.get_static_file(ruta, url)
+        # Una URL de imagen de producto nunca cambia de contenido: se recuerda sin volver al disco
+        if self.imagen_producto.match(url):
+            self.files[url] = static_file
+        return static_file
+
+    def ruta_del_frontend(self, request, response):
+        """Las rutas del SPA (/buscar, /admin/dashboard...) no existen en Django: se responde index.html"""
+        if (
+            not self.servir_frontend or response.status_code != 404 or request.method not in ('GET', 'HEAD')
+            or request.path_info.startswith('/api/') or 'text/html' not in request.headers.get('Accept', '')
+        ):
+            return response
+        index = self.find_file('/') if self.autorefresh else self.files.get('/')
+        return self.serve(index, request) if index is not None else response
+
+    def immutable_file_test(self, path, url):
+        if super().immutable_file_test(path, url):
+            return True
+        return bool(self.imagen_producto.match(url) or ASSET_VITE.match(url))
+
+    def add_cache_headers(self, headers, path, url):
+        super().add_cache_headers(headers, path, url)
+        if url.endswith('/') or url.endswith('.html'):
+            # index.html apunta a los assets con hash del último build: siempre se revalida
+            headers['Cache-Control'] = 'no-cache'
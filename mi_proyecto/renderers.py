@@ -0,0 +1,45 @@
+"""
+Renderer JSON de la API con orjson (ver API_JSON_RENDERER en settings).
+
+Produce los mismos bytes que el JSONRenderer de DRF: los tipos que orjson
+codificaría a su manera (Decimal, datetime, date, time, lazy strings...) pasan
+por el JSONEncoder de DRF, así un Decimal sigue saliendo como float y un
+datetime en UTC termina en 'Z'. Si orjson no está instalado, o la respuesta
+pide indentación (API navegable, ?format=json; indent=4), o algo no se puede
+codificar con orjson (enteros de más de 64 bits), se usa el renderer de DRF.
+
+Diferencias conocidas que no aplican a los datos de la API: orjson escribe
+NaN/Infinity como null (DRF lanza ValueError) y los floats con exponente sin
+'+' ni ceros a la izquierda (1e16 en lugar de 1e+16).
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SEPARADORES_LINEA = (b'\xe2\x80\xa8', b'\xe2\x80\xa9')
+codificar = JSONEncoder().default
+
+
+class JSONRapidoRenderer(JSONRenderer):
+    opciones = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=codificar, option=self.opciones)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Igual que DRF: U+2028 y U+2029 escapados para que el JSON sea JavaScript válido
+        if SEPARADORES_LINEA[0] in ret or SEPARADORES_LINEA[1] in ret:
+            ret = ret.replace(SEPARADORES_LINEA[0], b'\\u2028').replace(SEPARADORES_LINEA[1], b'\\u2029')
+        return ret
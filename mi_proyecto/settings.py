@@ -1,5 +1,6 @@
 
 import os
+import sys
 from pathlib import Path
 from decouple import config
 import dj_database_url
@@ -30,13 +31,14 @@ INSTALLED_APPS = [
     "usuarios",
     "productos",
     "administracion",
+    "ventas",
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware", 
     "django.middleware.common.CommonMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "mi_proyecto.middleware.WhiteNoiseAsyncMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
@@ -49,7 +51,9 @@ CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
 CSRF_TRUSTED_ORIGINS = config('CSRF_TRUSTED_ORIGINS', default='https://*.onrender.com').split(',')
 
-ROOT_URLCONF = 'mi_proyecto.urls'
+# 'asgi' lo fija mi_proyecto/asgi.py: mismas URLs, con vistas async para leer el catálogo
+SERVIDOR = config('FASTFOOD_SERVIDOR', default='wsgi')
+ROOT_URLCONF = 'mi_proyecto.urls_asgi' if SERVIDOR == 'asgi' else 'mi_proyecto.urls'
 
 TEMPLATES = [
     {
@@ -91,6 +95,38 @@ else:
     DATABASES['default']['OPTIONS']['sslmode'] = 'require'
     DATABASES['default']['OPTIONS'].pop('channel_binding', None)
 
+# Hash de contraseñas: scrypt por defecto (argon2 si está instalado argon2-cffi).
+# Los demás quedan para verificar hashes viejos, que se rehashean en el siguiente login.
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='scrypt')
+PASSWORD_HASHERS = [
+    'usuarios.hashers.ScryptAjustableHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+if PASSWORD_HASHER == 'argon2':
+    PASSWORD_HASHERS.insert(0, 'django.contrib.auth.hashers.Argon2PasswordHasher')
+elif PASSWORD_HASHER == 'pbkdf2':
+    PASSWORD_HASHERS.insert(0, PASSWORD_HASHERS.pop(1))
+SCRYPT_WORK_FACTOR = config('SCRYPT_WORK_FACTOR', default=2**14, cast=int)
+SCRYPT_BLOCK_SIZE = config('SCRYPT_BLOCK_SIZE', default=8, cast=int)
+SCRYPT_PARALLELISM = config('SCRYPT_PARALLELISM', default=1, cast=int)
+
+# Hilos que calculan hashes y peticiones que pueden esperar turno (más allá: 503)
+HASH_WORKERS = config('HASH_WORKERS', default=2, cast=int)
+HASH_COLA_MAXIMA = config('HASH_COLA_MAXIMA', default=8, cast=int)
+
+AUTHENTICATION_BACKENDS = ['usuarios.backends.HashAcotadoBackend']
+
+# Token bucket de registro/login, formato de DRF (ver usuarios/throttling.py)
+LIMITE_AUTH_IP = config('LIMITE_AUTH_IP', default='30/min')
+LIMITE_AUTH_USUARIO = config('LIMITE_AUTH_USUARIO', default='10/min')
+
+# Proxies delante de Django (Render: 1). DRF toma la IP del cliente de
+# X-Forwarded-For contando desde la derecha, donde escribe el proxy: sin esto
+# usaría la cabecera entera, que el cliente cambia a gusto para estrenar un
+# límite por IP en cada intento. 0 usa REMOTE_ADDR (sin proxy delante).
+NUM_PROXIES = config('NUM_PROXIES', default=1, cast=int)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -127,14 +163,85 @@ STORAGES = {
     },
 }
 
+# Frontend (build de Vite) servido por WhiteNoise en el mismo origen que la API.
+# build.sh lo compila con VITE_API_URL=/ y lo precomprime (brotli/gzip) con
+# whitenoise.compress; WhiteNoiseAsyncMiddleware responde index.html en las rutas
+# del SPA. El admin de Django se mueve a /django-admin/ porque el SPA usa /admin/.
+SERVIR_FRONTEND = config('SERVIR_FRONTEND', default=False, cast=bool)
+FRONTEND_DIST = config('FRONTEND_DIST', default=os.path.join(BASE_DIR, 'frontend', 'dist'))
+WHITENOISE_ROOT = FRONTEND_DIST if SERVIR_FRONTEND else None
+WHITENOISE_INDEX_FILE = True
+ADMIN_URL = config('ADMIN_URL', default='django-admin/' if SERVIR_FRONTEND else 'admin/')
+
+# Imágenes de productos: originales en MEDIA_ROOT y miniaturas por ancho en cada
+# formato que soporte Pillow (ver productos/imagenes.py). IMAGENES_PROCESOS=0
+# las genera dentro de la petición en lugar del pool de procesos.
+IMAGENES_ANCHOS = [160, 320, 640]
+IMAGENES_FORMATOS = ['avif', 'webp']
+IMAGENES_PROCESOS = config('IMAGENES_PROCESOS', default=2, cast=int)
+IMAGENES_TAMANO_MAXIMO = config('IMAGENES_TAMANO_MAXIMO', default=10 * 1024 * 1024, cast=int)
+
+# Segundos que se guardan las respuestas del menú público (0 la desactiva)
+CATALOGO_CACHE_TIMEOUT = config('CATALOGO_CACHE_TIMEOUT', default=300, cast=int)
+
+# Cache
+# La versión del catálogo (productos/cache.py) invalida las respuestas cacheadas,
+# los ETag y el autocompletado de todos los procesos, así que con la cache del
+# catálogo activa el default es 'file': compartida entre los workers y los
+# comandos de manage.py de la misma máquina. 'locmem' es una cache por proceso:
+# solo sirve con un único proceso o con CATALOGO_CACHE_TIMEOUT=0. Los tests usan
+# LocMem para empezar cada corrida con la cache vacía.
+TESTING = sys.argv[1:2] == ['test']
+CACHE_BACKEND = config(
+    'CACHE_BACKEND', default='file' if CATALOGO_CACHE_TIMEOUT and not TESTING else 'locmem'
+)
+if CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config('CACHE_LOCATION', default=os.path.join(BASE_DIR, 'cache')),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'fastfood',
+        }
+    }
+
+# Segundos que JWTCacheAuthentication guarda los datos del usuario (0 consulta siempre)
+JWT_USUARIO_CACHE_TIMEOUT = config('JWT_USUARIO_CACHE_TIMEOUT', default=60, cast=int)
+
+# True: los permisos se resuelven con los claims del access token, sin consultar el usuario.
+# Un cambio de rol o de is_staff se ve recién al refrescar el token (a lo sumo
+# ACCESS_TOKEN_LIFETIME, 5 min). Desactivar o borrar un usuario deja una marca
+# en la cache que rechaza sus tokens en el acto, así que con varios procesos
+# necesita la cache compartida (CACHE_BACKEND=file); el refresh también se rechaza.
+JWT_SOLO_CLAIMS = config('JWT_SOLO_CLAIMS', default=False, cast=bool)
+
+SIMPLE_JWT = {
+    "TOKEN_OBTAIN_SERIALIZER": "usuarios.tokens.TokenObtainPairUsuarioSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "usuarios.tokens.TokenRefreshUsuarioSerializer",
+}
+
 # Default auto field
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'usuarios.CustomUser'
 
 # REST Framework
+# Renderer JSON de la API: 'orjson' (misma salida que el de DRF, usa orjson si
+# está instalado; ver mi_proyecto/renderers.py) o 'estandar' (el JSONRenderer de DRF)
+API_JSON_RENDERER = config('API_JSON_RENDERER', default='orjson')
+
 REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": (
+        "mi_proyecto.renderers.JSONRapidoRenderer" if API_JSON_RENDERER == 'orjson'
+        else "rest_framework.renderers.JSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "usuarios.authentication.JWTCacheAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
@@ -146,6 +253,7 @@ REST_FRAMEWORK = {
     ),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 12,
+    "NUM_PROXIES": NUM_PROXIES,
 }
 
 # Email
@@ -157,6 +265,9 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default=EMAIL_HOST_USER)
 
+# Dónde se guardan los códigos 2FA: 'db' (CodigoVerificacion) o 'cache' (ver usuarios/codigos.py)
+CODIGOS_2FA_STORE = config('CODIGOS_2FA_STORE', default='db')
+
 # Logging
 LOGGING = {
     'version': 1,
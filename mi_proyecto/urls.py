@@ -14,21 +14,24 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework.routers import DefaultRouter
-from administracion.views import ProductoAdminViewSet, VentaAdminViewSet
+from administracion.views import ProductoAdminViewSet, VentaAdminViewSet, PedidoView
 
 router_admin = DefaultRouter()
 router_admin.register(r'productos', ProductoAdminViewSet, basename='admin-producto')
 router_admin.register(r'ventas', VentaAdminViewSet, basename='admin-venta')
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    path(settings.ADMIN_URL, admin.site.urls),
     path('api/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path("api/usuarios/", include("usuarios.urls")),  # nuestra API de usuarios
+    path('api/pedidos/', PedidoView.as_view(), name='pedido-crear'),
     path("api/", include("productos.urls")),
+    path('api/admin/estadisticas/', include("ventas.urls")),
     path('api/admin/', include(router_admin.urls)),
 ]
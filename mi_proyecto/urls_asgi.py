@@ -0,0 +1,23 @@
+"""
+URLs del modo ASGI (FASTFOOD_SERVIDOR=asgi, lo fija mi_proyecto/asgi.py).
+
+Son las mismas de mi_proyecto/urls.py; solo los listados del catálogo y el
+autocompletado se atienden con las vistas async de productos/async_views.py,
+que delegan en los mismos ViewSets del router cuando no pueden responder solas.
+"""
+from django.urls import path
+
+from productos.async_views import autocomplete_async, catalogo_async
+from productos.urls import router
+
+from .urls import urlpatterns as urlpatterns_wsgi
+
+vistas = {url.name: url.callback for url in router.urls}
+
+urlpatterns = [
+    path('api/categorias/', catalogo_async(vistas['categoria-list'])),
+    path('api/categorias/activas/', catalogo_async(vistas['categoria-activas'])),
+    path('api/productos/', catalogo_async(vistas['producto-list'])),
+    path('api/productos/disponibles/', catalogo_async(vistas['producto-disponibles'])),
+    path('api/productos/autocomplete/', autocomplete_async(vistas['producto-autocomplete'])),
+] + urlpatterns_wsgi
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Categoria, Producto
+from .models import Calificacion, Categoria, Producto
 
 @admin.register(Categoria)
 class CategoriaAdmin(admin.ModelAdmin):
@@ -13,3 +13,15 @@ class ProductoAdmin(admin.ModelAdmin):
     list_filter = ['categoria', 'disponible']
     search_fields = ['nombre', 'descripcion']
     list_editable = ['precio', 'stock', 'disponible']
+    readonly_fields = ['calificacion', 'calificaciones_suma', 'calificaciones_total']
+
+@admin.register(Calificacion)
+class CalificacionAdmin(admin.ModelAdmin):
+    list_display = ['producto', 'usuario', 'valor', 'fecha']
+    list_select_related = ['producto', 'usuario']
+    search_fields = ['producto__nombre', 'usuario__username']
+    # Los votos se cambian desde la API para mantener los agregados del producto
+    readonly_fields = ['producto', 'usuario', 'valor', 'fecha']
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,130 @@
+"""
+Vistas async del catálogo para el modo ASGI (ver mi_proyecto/urls_asgi.py).
+
+DRF no tiene vistas async: bajo ASGI cada petición a un ViewSet se ejecuta en
+un hilo con sync_to_async. Estas vistas responden dentro del event loop lo que
+más se pide en el menú:
+- listados del catálogo que ya están en la cache (mismas cabeceras y mismo
+  GET condicional que CategoriaViewSet/ProductoViewSet);
+- el autocompletado, que sale del índice en memoria (la primera carga usa el
+  ORM async).
+
+Lo demás (fallos de cache, escrituras, formatos distintos de JSON, tokens que
+obligan a consultar al usuario) se delega al ViewSet de siempre, así que el
+contrato de las URLs no cambia. Las cabeceras Allow y Vary se copian de la
+primera respuesta real del ViewSet.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.views.decorators.http import condition
+from rest_framework.exceptions import APIException
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from usuarios.authentication import JWTCacheAuthentication
+
+from .autocomplete import autocompletado
+from .cache import HITS_KEY, _contar, clave_respuesta, etag_catalogo, ultima_modificacion
+from .views import datos_autocompletado
+
+CABECERAS_COPIADAS = ('Allow', 'Vary')
+
+
+def preparar_request(request, vista):
+    """
+    Request de DRF con el formato ya negociado, o None si la petición debe ir
+    al ViewSet (otro formato, token inválido o usuario fuera de cache).
+    Las llamadas a la cache son síncronas: con LocMem o archivos (lecturas pequeñas del
+    disco) cuestan menos que un salto de hilo.
+    """
+    drf_request = Request(request)
+    renderers = [renderer() for renderer in vista.cls.renderer_classes]
+    try:
+        renderer, media_type = DefaultContentNegotiation().select_renderer(drf_request, renderers)
+    except APIException:
+        return None
+    if not isinstance(renderer, JSONRenderer):
+        return None
+    drf_request.accepted_renderer, drf_request.accepted_media_type = renderer, media_type
+
+    if list(vista.cls.authentication_classes) != [JWTCacheAuthentication]:
+        return None if 'HTTP_AUTHORIZATION' in request.META else drf_request
+
+    autenticacion = JWTCacheAuthentication()
+    header = autenticacion.get_header(drf_request)
+    raw_token = autenticacion.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return drf_request
+    try:
+        user = autenticacion.usuario_sin_consulta(autenticacion.get_validated_token(raw_token))
+    except APIException:
+        # Token inválido o revocado: el ViewSet responde el 401 de siempre
+        return None
+    return drf_request if user is not None else None
+
+
+def respuesta_json(drf_request, data, cabeceras):
+    contenido = drf_request.accepted_renderer.render(data, drf_request.accepted_media_type)
+    response = HttpResponse(contenido, content_type=drf_request.accepted_media_type)
+    for nombre, valor in cabeceras.items():
+        response[nombre] = valor
+    return response
+
+
+def vista_async(vista, respuesta_rapida):
+    """
+    Envuelve la vista de un ViewSet. respuesta_rapida(drf_request, cabeceras)
+    es una corrutina que devuelve la respuesta o None para delegar.
+    """
+    vista_sync = sync_to_async(vista)
+    cabeceras = {}
+
+    async def envoltura(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD') and cabeceras:
+            drf_request = preparar_request(request, vista)
+            if drf_request is not None:
+                response = await respuesta_rapida(drf_request, cabeceras)
+                if response is not None:
+                    return response
+
+        response = await vista_sync(request, *args, **kwargs)
+        if not cabeceras and request.method == 'GET' and response.status_code == 200:
+            cabeceras.update({h: response[h] for h in CABECERAS_COPIADAS if response.has_header(h)})
+        return response
+
+    return envoltura
+
+
+@condition(etag_func=etag_catalogo, last_modified_func=ultima_modificacion)
+async def _responder_cache(drf_request, data, cabeceras):
+    _contar(HITS_KEY)
+    response = respuesta_json(drf_request, data, cabeceras)
+    response['X-Cache'] = 'HIT'
+    return response
+
+
+async def _catalogo_cacheado(drf_request, cabeceras):
+    if not getattr(settings, 'CATALOGO_CACHE_TIMEOUT', 300):
+        return None
+    data = cache.get(clave_respuesta(drf_request))
+    if data is None:
+        return None
+    return await _responder_cache(drf_request, data, cabeceras)
+
+
+async def _autocompletado(drf_request, cabeceras):
+    if not autocompletado.vigente():
+        await autocompletado.acargar()
+    return respuesta_json(drf_request, datos_autocompletado(drf_request.query_params), cabeceras)
+
+
+def catalogo_async(vista):
+    """Listados con @cache_catalogo: los aciertos de cache se sirven sin pasar a un hilo"""
+    return vista_async(vista, _catalogo_cacheado)
+
+
+def autocomplete_async(vista):
+    return vista_async(vista, _autocompletado)
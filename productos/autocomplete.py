@@ -0,0 +1,262 @@
+"""
+Índice de prefijos en memoria para el autocompletado del buscador.
+
+Guarda los nombres de productos disponibles y categorías activas en un trie
+normalizado (minúsculas, sin tildes). Cada nodo mantiene en caché sus mejores
+K sugerencias, así una consulta solo recorre len(prefijo) nodos sin tocar la
+base de datos. Cada palabra del nombre es un punto de entrada, de modo que
+"dob" encuentra "Hamburguesa Doble".
+
+El índice se construye la primera vez que se consulta (una consulta por
+modelo) y luego se mantiene con las señales post_save/post_delete. Es propio
+de cada proceso: con varios workers cada uno tiene su copia. Cada alta, baja
+o cambio de nombre incrementa 'autocompletado:version' en la cache
+compartida; un proceso que encuentra otra versión (cambios de otro worker o
+de un comando como catalogo_import) reconstruye su copia aparte y la
+reemplaza al terminar. Los cambios de calificación solo mueven el peso: no
+se publican y en los demás procesos aparecen como mucho tras TTL segundos.
+"""
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from collections import namedtuple
+from itertools import chain
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from .cache import VERSION_TIMEOUT
+
+# El orden de los campos define el ranking: primero las coincidencias al inicio
+# del nombre, luego mayor peso, luego orden alfabético.
+Sugerencia = namedtuple('Sugerencia', ['interna', 'peso', 'clave', 'tipo', 'id', 'texto'])
+
+PESO_CATEGORIA = 5.0
+VERSION_KEY = 'autocompletado:version'
+TTL = 10 * 60
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.lower().split())
+
+
+class _Nodo:
+    __slots__ = ('hijos', 'items', 'mejores')
+
+    def __init__(self):
+        self.hijos = {}
+        self.items = []     # sugerencias cuya clave termina (o se trunca) aquí
+        self.mejores = []   # mejores K sugerencias del subárbol, ordenadas
+
+
+class IndicePrefijos:
+    def __init__(self, k=20, max_prefijo=20):
+        self.k = k
+        self.max_prefijo = max_prefijo
+        self.raiz = _Nodo()
+        self.entradas = {}
+        self.lock = threading.RLock()
+
+    def agregar(self, tipo, id, texto, peso=0.0):
+        with self.lock:
+            self.eliminar(tipo, id)
+            normalizado = normalizar(texto)
+            inicios = [m.start() for m in re.finditer(r'\S+', normalizado)]
+            sugerencias = []
+            for inicio in inicios:
+                clave = normalizado[inicio:]
+                sugerencia = Sugerencia(inicio > 0, -peso, clave, tipo, id, texto)
+                self._insertar(clave[:self.max_prefijo], sugerencia)
+                sugerencias.append(sugerencia)
+            if sugerencias:
+                self.entradas[(tipo, id)] = sugerencias
+
+    def _insertar(self, clave, sugerencia):
+        nodo = self.raiz
+        self._agregar_mejor(nodo, sugerencia)
+        for caracter in clave:
+            nodo = nodo.hijos.setdefault(caracter, _Nodo())
+            self._agregar_mejor(nodo, sugerencia)
+        nodo.items.append(sugerencia)
+
+    def _agregar_mejor(self, nodo, sugerencia):
+        if len(nodo.mejores) < self.k or sugerencia < nodo.mejores[-1]:
+            nodo.mejores.append(sugerencia)
+            nodo.mejores.sort()
+            del nodo.mejores[self.k:]
+
+    def eliminar(self, tipo, id):
+        with self.lock:
+            for sugerencia in self.entradas.pop((tipo, id), []):
+                self._quitar(sugerencia)
+
+    def _quitar(self, sugerencia):
+        camino = [self.raiz]
+        for caracter in sugerencia.clave[:self.max_prefijo]:
+            camino.append(camino[-1].hijos[caracter])
+        camino[-1].items.remove(sugerencia)
+
+        # De abajo hacia arriba: recalcular el top-K y podar nodos vacíos
+        clave = sugerencia.clave[:self.max_prefijo]
+        for profundidad in range(len(camino) - 1, -1, -1):
+            nodo = camino[profundidad]
+            if sugerencia in nodo.mejores:
+                nodo.mejores = heapq.nsmallest(
+                    self.k, chain(nodo.items, *(hijo.mejores for hijo in nodo.hijos.values()))
+                )
+            if profundidad > 0 and not nodo.items and not nodo.hijos:
+                del camino[profundidad - 1].hijos[clave[profundidad - 1]]
+
+    def buscar(self, prefijo, limite=8):
+        normalizado = normalizar(prefijo)
+        if not normalizado:
+            return []
+        with self.lock:
+            return self._buscar(normalizado, limite)
+
+    def _buscar(self, normalizado, limite):
+        nodo = self.raiz
+        for caracter in normalizado[:self.max_prefijo]:
+            nodo = nodo.hijos.get(caracter)
+            if nodo is None:
+                return []
+
+        resultados, vistos = [], set()
+        for sugerencia in nodo.mejores:
+            if (sugerencia.tipo, sugerencia.id) in vistos or not sugerencia.clave.startswith(normalizado):
+                continue
+            vistos.add((sugerencia.tipo, sugerencia.id))
+            resultados.append(sugerencia)
+            if len(resultados) == limite:
+                break
+        return resultados
+
+
+class Autocompletado:
+    """Índice de productos y categorías cargado bajo demanda"""
+
+    def __init__(self):
+        self.indice = IndicePrefijos()
+        self.cargado = False
+        self.version = None     # versión compartida que refleja el índice
+        self.cargado_en = 0.0
+        self.lock = threading.Lock()
+
+    def consultas(self):
+        from .models import Categoria, Producto
+
+        return (
+            Categoria.objects.filter(activa=True).values_list('id', 'nombre'),
+            Producto.objects.filter(disponible=True).values_list('id', 'nombre', 'calificacion'),
+        )
+
+    def version_compartida(self):
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            # Como version_catalogo(): si la clave se pierde, el valor nuevo no coincide con ningún índice
+            version = cache.get_or_set(VERSION_KEY, int(time.time() * 1000), VERSION_TIMEOUT)
+        return version
+
+    def vigente(self):
+        """Cargado, sin cambios de otros procesos y dentro del TTL"""
+        return (
+            self.cargado and time.monotonic() - self.cargado_en < TTL
+            and self.version == self.version_compartida()
+        )
+
+    def cargar(self):
+        with self.lock:
+            if self.vigente():
+                return
+            # La versión se lee antes de consultar: un cambio durante la carga fuerza otra
+            version = self.version_compartida()
+            categorias, productos = self.consultas()
+            self._reemplazar(self._construir(categorias, productos.iterator(chunk_size=2000)), version)
+
+    async def acargar(self):
+        """Igual que cargar() pero con el ORM async, para las vistas ASGI"""
+        if self.vigente():
+            return
+        version = self.version_compartida()
+        categorias, productos = self.consultas()
+        categorias = [fila async for fila in categorias]
+        productos = [fila async for fila in productos]
+        # Armar el trie es CPU pura: fuera del event loop
+        indice = await sync_to_async(self._construir, thread_sensitive=False)(categorias, productos)
+        with self.lock:
+            if not self.vigente():
+                self._reemplazar(indice, version)
+
+    def _construir(self, categorias, productos):
+        indice = IndicePrefijos()
+        for id, nombre in categorias:
+            indice.agregar('categoria', id, nombre, PESO_CATEGORIA)
+        for id, nombre, calificacion in productos:
+            indice.agregar('producto', id, nombre, calificacion)
+        return indice
+
+    def _reemplazar(self, indice, version):
+        # Las búsquedas en curso terminan sobre el índice anterior, nunca ven uno a medio llenar
+        self.indice = indice
+        self.version, self.cargado_en = version, time.monotonic()
+        self.cargado = True
+
+    def _publicar(self):
+        """
+        Avisa del cambio a los demás procesos. Este ya lo aplicó: si nadie más
+        cambió la versión desde su carga, su índice sigue al día.
+        """
+        anterior = self.version
+        try:
+            version = cache.incr(VERSION_KEY)
+        except ValueError:
+            return
+        # incr() de la cache de archivos vuelve a guardar la clave con el TIMEOUT por defecto
+        cache.touch(VERSION_KEY, VERSION_TIMEOUT)
+        if anterior is not None and version == anterior + 1:
+            self.version = version
+
+    def invalidar(self):
+        """Fuerza una recarga completa en la próxima consulta de todos los procesos (p. ej. tras un bulk_create)"""
+        with self.lock:
+            self.cargado = False
+            self.version = None
+        self._publicar()
+
+    def buscar(self, prefijo, limite=8):
+        if not self.vigente():
+            self.cargar()
+        return self.indice.buscar(prefijo, limite)
+
+    def producto_guardado(self, producto):
+        if self.cargado:
+            if producto.disponible:
+                self.indice.agregar('producto', producto.pk, producto.nombre, producto.calificacion)
+            else:
+                self.indice.eliminar('producto', producto.pk)
+        self._publicar()
+
+    def calificacion_cambiada(self, producto):
+        """Solo cambia el peso: los demás procesos lo toman al recargar por TTL"""
+        if self.cargado and producto.disponible:
+            self.indice.agregar('producto', producto.pk, producto.nombre, producto.calificacion)
+
+    def categoria_guardada(self, categoria):
+        if self.cargado:
+            if categoria.activa:
+                self.indice.agregar('categoria', categoria.pk, categoria.nombre, PESO_CATEGORIA)
+            else:
+                self.indice.eliminar('categoria', categoria.pk)
+        self._publicar()
+
+    def eliminado(self, tipo, pk):
+        if self.cargado:
+            self.indice.eliminar(tipo, pk)
+        self._publicar()
+
+
+autocompletado = Autocompletado()
@@ -0,0 +1,158 @@
+"""
+Cache de lectura y validadores HTTP (ETag/Last-Modified) para el menú público.
+
+Las respuestas se guardan con una clave que incluye la versión del catálogo;
+cualquier cambio en Producto o Categoria incrementa la versión (ver
+productos/signals.py), así las entradas viejas simplemente dejan de usarse y
+expiran solas.
+
+La versión solo es la misma para todos los procesos con una cache compartida
+(CACHE_BACKEND=file). Con LocMem cada worker y cada comando de manage.py tiene
+la suya, así que el GET condicional se desactiva: un worker respondería 304 a
+cambios hechos en otro. La versión además expira (VERSION_TIMEOUT), lo que
+acota lo que puede durar una versión vieja si se pierde un incremento.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import timezone
+from rest_framework.response import Response
+
+VERSION_KEY = 'catalogo:version'
+MODIFICADO_KEY = 'catalogo:modificado'
+HITS_KEY = 'catalogo:hits'
+MISSES_KEY = 'catalogo:misses'
+VERSION_TIMEOUT = 24 * 60 * 60
+
+
+def cache_compartida():
+    """False si la cache es propia de cada proceso (LocMem) o no guarda nada"""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def version_catalogo():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Valor inicial basado en el reloj: si la clave se pierde o expira, la nueva
+        # versión no coincide con la de respuestas que aún sigan en la cache
+        cache.set(MODIFICADO_KEY, timezone.now(), VERSION_TIMEOUT)
+        version = cache.get_or_set(VERSION_KEY, int(time.time() * 1000), VERSION_TIMEOUT)
+    return version
+
+
+def incrementar_version():
+    """Invalida todas las respuestas cacheadas del catálogo"""
+    cache.set(MODIFICADO_KEY, timezone.now(), VERSION_TIMEOUT)
+    try:
+        version = cache.incr(VERSION_KEY)
+    except ValueError:
+        return version_catalogo()
+    # incr() de la cache de archivos vuelve a guardar la clave con el TIMEOUT por defecto
+    cache.touch(VERSION_KEY, VERSION_TIMEOUT)
+    return version
+
+
+def ultima_modificacion(request=None, *args, **kwargs):
+    """Fecha del último cambio del catálogo conocido por la cache (None sin cache compartida)"""
+    if not cache_compartida():
+        return None
+    version_catalogo()
+    return cache.get(MODIFICADO_KEY)
+
+
+def _contar(clave):
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.add(clave, 0, None)
+        cache.incr(clave)
+
+
+def estadisticas():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'version': version_catalogo(),
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else 0.0,
+    }
+
+
+def clave_respuesta(request):
+    """La clave depende de la versión, el host (enlaces de paginación), la ruta y los parámetros"""
+    parametros = sorted((k, sorted(v)) for k, v in request.query_params.lists())
+    base = f"{request.get_host()}|{request.path}|{parametros}"
+    digest = hashlib.md5(base.encode('utf-8')).hexdigest()
+    return f"catalogo:v{version_catalogo()}:{digest}"
+
+
+def cache_catalogo(metodo):
+    """
+    Decorador read-through para acciones GET de los ViewSets del catálogo.
+    Guarda response.data; CATALOGO_CACHE_TIMEOUT = 0 lo desactiva.
+    """
+    @wraps(metodo)
+    def envoltura(self, request, *args, **kwargs):
+        timeout = getattr(settings, 'CATALOGO_CACHE_TIMEOUT', 300)
+        if not timeout:
+            return metodo(self, request, *args, **kwargs)
+
+        clave = clave_respuesta(request)
+        data = cache.get(clave)
+        if data is not None:
+            _contar(HITS_KEY)
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        _contar(MISSES_KEY)
+        response = metodo(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(clave, response.data, timeout)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    return envoltura
+
+
+def etag_catalogo(request, *args, **kwargs):
+    """ETag de listados: versión del catálogo + URL + formato, sin tocar la base de datos"""
+    if not cache_compartida():
+        return None
+    base = f"{clave_respuesta(request)}|{getattr(request, 'accepted_media_type', '')}"
+    return hashlib.md5(base.encode('utf-8')).hexdigest()
+
+
+def _fecha_producto(request, pk):
+    # condition() pide el ETag y el Last-Modified por separado: una sola consulta para ambos
+    if not hasattr(request, '_fecha_producto'):
+        from .models import Producto
+
+        request._fecha_producto = Producto.objects.filter(
+            pk=pk, disponible=True
+        ).values_list('fecha_actualizacion', flat=True).first()
+    return request._fecha_producto
+
+
+def etag_producto(request, pk=None, *args, **kwargs):
+    """ETag del detalle de un producto: fecha_actualizacion + versión del catálogo"""
+    if not cache_compartida():
+        return None
+    fecha = _fecha_producto(request, pk)
+    if fecha is None:
+        return None
+    base = f"{pk}|{fecha.isoformat()}|{version_catalogo()}|{getattr(request, 'accepted_media_type', '')}"
+    return hashlib.md5(base.encode('utf-8')).hexdigest()
+
+
+def ultima_modificacion_producto(request, pk=None, *args, **kwargs):
+    if not cache_compartida():
+        return None
+    return _fecha_producto(request, pk)
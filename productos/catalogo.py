@@ -0,0 +1,216 @@
+"""
+Importación y exportación del catálogo en CSV o JSON Lines (comandos
+catalogo_import y catalogo_export).
+
+Los archivos se leen y escriben fila por fila y se procesan en lotes, así que
+la memoria no depende del tamaño del catálogo. Cada lote de la importación es
+un solo bulk_create(update_conflicts=True) en su propia transacción: las
+categorías se identifican por nombre y los productos por codigo. Las
+categorías de los productos se resuelven con un mapa nombre -> id cargado al
+inicio, sin una consulta por fila.
+"""
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+
+from .models import Categoria, Producto
+
+COLUMNAS = {
+    'categorias': ('nombre', 'icono', 'descripcion', 'activa'),
+    'productos': ('codigo', 'nombre', 'descripcion', 'precio', 'categoria', 'imagen', 'disponible', 'stock'),
+}
+REQUERIDAS = {
+    'categorias': ('nombre',),
+    'productos': ('codigo', 'nombre', 'precio', 'categoria'),
+}
+EXTENSIONES = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+VERDADEROS = {'1', 'true', 't', 'si', 'sí', 's', 'yes', 'y', 'x'}
+FALSOS = {'0', 'false', 'f', 'no', 'n', ''}
+PRECIO_MAXIMO = Decimal('100000000')  # max_digits=10, decimal_places=2
+
+
+class FilaInvalida(Exception):
+    pass
+
+
+def formato_de(ruta, formato=None):
+    if formato:
+        return formato
+    for extension, nombre in EXTENSIONES.items():
+        if ruta.lower().endswith(extension):
+            return nombre
+    return None
+
+
+def en_lotes(iterable, tamano):
+    iterador = iter(iterable)
+    while lote := list(islice(iterador, tamano)):
+        yield lote
+
+
+def leer_filas(archivo, formato):
+    """Genera (número de línea, dict) sin cargar el archivo completo"""
+    if formato == 'csv':
+        lector = csv.DictReader(archivo)
+        for fila in lector:
+            yield lector.line_num, fila
+        return
+
+    for numero, linea in enumerate(archivo, start=1):
+        if not linea.strip():
+            continue
+        try:
+            fila = json.loads(linea)
+        except ValueError as e:
+            fila = FilaInvalida(f"JSON inválido: {e}")
+        if not isinstance(fila, (dict, FilaInvalida)):
+            fila = FilaInvalida("Cada línea debe ser un objeto JSON")
+        yield numero, fila
+
+
+def escribir_filas(archivo, formato, columnas, filas):
+    """Escribe tuplas en el orden de columnas; devuelve cuántas se escribieron"""
+    total = 0
+    if formato == 'csv':
+        escritor = csv.writer(archivo)
+        escritor.writerow(columnas)
+        for fila in filas:
+            escritor.writerow(fila)
+            total += 1
+        return total
+
+    for fila in filas:
+        archivo.write(json.dumps(dict(zip(columnas, fila)), ensure_ascii=False, default=str) + '\n')
+        total += 1
+    return total
+
+
+def texto(fila, columna, requerido=False, maximo=None):
+    valor = fila.get(columna)
+    valor = '' if valor is None else str(valor).strip()
+    if requerido and not valor:
+        raise FilaInvalida(f"'{columna}' es requerido")
+    if maximo and len(valor) > maximo:
+        raise FilaInvalida(f"'{columna}' supera {maximo} caracteres")
+    return valor
+
+
+def booleano(fila, columna, defecto=True):
+    valor = fila.get(columna)
+    if valor is None:
+        return defecto
+    if isinstance(valor, bool):
+        return valor
+    valor = str(valor).strip().lower()
+    if valor in VERDADEROS:
+        return True
+    if valor in FALSOS:
+        return False
+    raise FilaInvalida(f"'{columna}' debe ser verdadero o falso")
+
+
+class Importador:
+    """convertir() arma una instancia por fila (o lanza FilaInvalida); guardar() hace el upsert del lote"""
+    modelo = None
+    clave = None
+    campos_actualizados = []
+
+    def __init__(self, crear_categorias=False):
+        self.crear_categorias = crear_categorias
+
+    def convertir(self, fila):
+        raise NotImplementedError
+
+    def guardar(self, objetos):
+        # La última fila gana si la clave se repite dentro del lote (ON CONFLICT no admite duplicados)
+        unicos = list({getattr(objeto, self.clave): objeto for objeto in objetos}.values())
+        with transaction.atomic():
+            self.modelo.objects.bulk_create(
+                unicos,
+                update_conflicts=True,
+                unique_fields=[self.clave],
+                update_fields=self.campos_actualizados,
+            )
+        return len(unicos)
+
+
+class ImportadorCategorias(Importador):
+    modelo = Categoria
+    clave = 'nombre'
+    campos_actualizados = ['icono', 'descripcion', 'activa']
+
+    def convertir(self, fila):
+        return Categoria(
+            nombre=texto(fila, 'nombre', requerido=True, maximo=100),
+            icono=texto(fila, 'icono', maximo=10),
+            descripcion=texto(fila, 'descripcion'),
+            activa=booleano(fila, 'activa'),
+        )
+
+
+class ImportadorProductos(Importador):
+    modelo = Producto
+    clave = 'codigo'
+    # calificacion y sus agregados vienen de los votos: no se importan
+    campos_actualizados = [
+        'nombre', 'descripcion', 'precio', 'categoria', 'imagen', 'disponible', 'stock', 'fecha_actualizacion',
+    ]
+
+    def __init__(self, crear_categorias=False):
+        super().__init__(crear_categorias)
+        self.categorias = {
+            nombre.casefold(): pk for pk, nombre in Categoria.objects.values_list('pk', 'nombre')
+        }
+
+    def categoria_id(self, nombre):
+        pk = self.categorias.get(nombre.casefold())
+        if pk is None:
+            if not self.crear_categorias:
+                raise FilaInvalida(f"La categoría '{nombre}' no existe")
+            pk = Categoria.objects.get_or_create(nombre=nombre)[0].pk
+            self.categorias[nombre.casefold()] = pk
+        return pk
+
+    def convertir(self, fila):
+        try:
+            precio = Decimal(str(fila.get('precio', '')).strip()).quantize(Decimal('0.01'))
+        except (InvalidOperation, ValueError):
+            raise FilaInvalida("'precio' debe ser un número")
+        if not precio.is_finite() or not 0 < precio < PRECIO_MAXIMO:
+            raise FilaInvalida("'precio' debe ser mayor a 0 y menor a 100.000.000")
+
+        try:
+            stock = int(str(fila.get('stock') or 0).strip())
+        except ValueError:
+            raise FilaInvalida("'stock' debe ser un entero")
+        if stock < 0:
+            raise FilaInvalida("'stock' no puede ser negativo")
+
+        return Producto(
+            codigo=texto(fila, 'codigo', requerido=True, maximo=40),
+            nombre=texto(fila, 'nombre', requerido=True, maximo=200),
+            descripcion=texto(fila, 'descripcion'),
+            precio=precio,
+            categoria_id=self.categoria_id(texto(fila, 'categoria', requerido=True)),
+            imagen=texto(fila, 'imagen', maximo=200) or None,
+            disponible=booleano(fila, 'disponible'),
+            stock=stock,
+        )
+
+
+IMPORTADORES = {'categorias': ImportadorCategorias, 'productos': ImportadorProductos}
+
+
+def filas_exportadas(tipo, lote):
+    """Tuplas en el orden de COLUMNAS[tipo], leídas por id con un cursor del servidor"""
+    if tipo == 'categorias':
+        consulta = Categoria.objects.order_by('id').values_list(*COLUMNAS['categorias'])
+    else:
+        consulta = Producto.objects.order_by('id').values_list(
+            'codigo', 'nombre', 'descripcion', 'precio', 'categoria__nombre', 'imagen', 'disponible', 'stock'
+        )
+    for fila in consulta.iterator(chunk_size=lote):
+        yield tuple('' if valor is None else valor for valor in fila)
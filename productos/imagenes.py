@@ -0,0 +1,179 @@
+"""
+Imágenes de productos guardadas en MEDIA_ROOT con miniaturas WebP/AVIF.
+
+- guardar_original(): valida el archivo con Pillow y lo guarda como
+  productos/<sha256>/original.<ext>. El nombre sale del contenido: la misma
+  foto no se guarda dos veces y una URL nunca cambia de contenido.
+  descargar() hace lo mismo con imágenes externas (comando procesar_imagenes).
+- procesar(): genera <ancho>.<formato> en esa carpeta para IMAGENES_ANCHOS e
+  IMAGENES_FORMATOS en un pool de IMAGENES_PROCESOS procesos (0: en el mismo
+  hilo) y al terminar guarda en Producto.imagen_variantes qué anchos existen.
+- srcset(): arma los srcset por formato que expone ProductoSerializer. Las
+  variantes solo cuentan si su 'origen' sigue siendo la imagen del producto,
+  así un cambio de imagen nunca sirve miniaturas de la anterior.
+"""
+import hashlib
+import logging
+import multiprocessing
+import posixpath
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+
+from . import miniaturas
+from .cache import incrementar_version
+from .models import Producto
+
+logger = logging.getLogger(__name__)
+
+CARPETA = 'productos'
+EXTENSIONES = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif', 'AVIF': 'avif'}
+
+
+class ImagenInvalida(Exception):
+    pass
+
+
+def anchos():
+    return list(getattr(settings, 'IMAGENES_ANCHOS', [160, 320, 640]))
+
+
+def formatos():
+    return miniaturas.formatos_disponibles(getattr(settings, 'IMAGENES_FORMATOS', ['avif', 'webp']))
+
+
+def tamano_maximo():
+    return getattr(settings, 'IMAGENES_TAMANO_MAXIMO', 10 * 1024 * 1024)
+
+
+def guardar_original(contenido):
+    """Valida los bytes de una imagen, la guarda si no existía y devuelve su URL bajo MEDIA_URL"""
+    if len(contenido) > tamano_maximo():
+        raise ImagenInvalida("La imagen supera el tamaño máximo permitido")
+    try:
+        with Image.open(BytesIO(contenido)) as imagen:
+            formato = imagen.format
+            imagen.verify()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+        raise ImagenInvalida("El archivo no es una imagen válida")
+    if formato not in EXTENSIONES:
+        raise ImagenInvalida(f"Formato de imagen no soportado: {formato}")
+
+    digest = hashlib.sha256(contenido).hexdigest()[:32]
+    nombre = posixpath.join(CARPETA, digest, f'original.{EXTENSIONES[formato]}')
+    if not default_storage.exists(nombre):
+        default_storage.save(nombre, ContentFile(contenido))
+    return settings.MEDIA_URL + nombre
+
+
+def descargar(url, timeout=10):
+    """Baja una imagen externa y la guarda con guardar_original(); devuelve su URL bajo MEDIA_URL"""
+    if not url.startswith(('http://', 'https://')):
+        raise ImagenInvalida("Solo se descargan URLs http o https")
+    try:
+        with urlopen(Request(url, headers={'User-Agent': 'FastFood'}), timeout=timeout) as respuesta:
+            # Un byte de más basta para saber si supera el máximo sin leer el resto
+            contenido = respuesta.read(tamano_maximo() + 1)
+    except (OSError, ValueError) as e:
+        raise ImagenInvalida(f"No se pudo descargar: {e}")
+    return guardar_original(contenido)
+
+
+def ruta_local(imagen):
+    """Ruta en disco de una imagen guardada por guardar_original(), o None si es externa o no es canónica"""
+    prefijo = settings.MEDIA_URL + CARPETA + '/'
+    if not imagen or not imagen.startswith(prefijo):
+        return None
+    nombre = imagen[len(settings.MEDIA_URL):]
+    # Con '..' o '//' la ruta podría salir de la carpeta o de MEDIA_ROOT: no se lee
+    if posixpath.normpath(nombre) != nombre:
+        return None
+    try:
+        return default_storage.path(nombre)
+    except SuspiciousFileOperation:
+        return None
+
+
+def srcset(imagen, variantes, absoluta):
+    """{formato: 'url 160w, url 320w'} para la imagen actual, o {} si aún no tiene miniaturas"""
+    if not variantes or variantes.get('origen') != imagen:
+        return {}
+    carpeta = imagen.rsplit('/', 1)[0]
+    return {
+        formato: ', '.join(f"{absoluta(f'{carpeta}/{ancho}.{formato}')} {ancho}w" for ancho in lista)
+        for formato, lista in variantes.items()
+        if formato != 'origen' and lista
+    }
+
+
+def generar(imagen):
+    """Genera las miniaturas en este proceso y devuelve el valor de Producto.imagen_variantes"""
+    return {'origen': imagen, **miniaturas.generar_variantes(ruta_local(imagen), anchos(), formatos())}
+
+
+def registrar(pk, variantes):
+    """Guarda las variantes si el producto sigue teniendo esa imagen; True si se guardaron"""
+    actualizados = Producto.objects.filter(pk=pk, imagen=variantes['origen']).update(
+        imagen_variantes=variantes, fecha_actualizacion=timezone.now()
+    )
+    if actualizados:
+        incrementar_version()
+    return bool(actualizados)
+
+
+_executor = None
+_lock = threading.Lock()
+
+
+def pool():
+    """
+    Pool de procesos compartido por las peticiones. Usa 'spawn': los hijos solo
+    importan productos/miniaturas.py y no heredan conexiones ni hilos de Django.
+    """
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'IMAGENES_PROCESOS', 2),
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+    return _executor
+
+
+def procesar(producto):
+    """
+    Genera las miniaturas de la imagen local del producto. Con IMAGENES_PROCESOS=0
+    lo hace en este hilo y devuelve las variantes; si no, lo envía al pool y
+    devuelve None (las variantes aparecen en la API cuando terminan).
+    """
+    imagen, pk = producto.imagen, producto.pk
+    origen = ruta_local(imagen)
+    if origen is None:
+        return None
+    if not getattr(settings, 'IMAGENES_PROCESOS', 2):
+        variantes = generar(imagen)
+        registrar(pk, variantes)
+        return variantes
+
+    futuro = pool().submit(miniaturas.generar_variantes, origen, anchos(), formatos())
+
+    def terminado(futuro):
+        # Corre en un hilo del pool: abre su propia conexión y la cierra al salir
+        try:
+            registrar(pk, {'origen': imagen, **futuro.result()})
+        except Exception:
+            logger.exception("No se pudieron generar las miniaturas de %s", imagen)
+        finally:
+            connection.close()
+
+    futuro.add_done_callback(terminado)
+    return None
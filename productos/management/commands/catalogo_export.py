@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from productos.catalogo import COLUMNAS, escribir_filas, filas_exportadas, formato_de
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta categorías o productos a CSV o JSON Lines, leyendo por lotes con un cursor. "
+        "El archivo se puede volver a cargar con catalogo_import."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta del archivo, o - para escribir en la salida estándar")
+        parser.add_argument('--tipo', choices=sorted(COLUMNAS), default='productos',
+                            help="Qué se exporta (default: productos)")
+        parser.add_argument('--formato', choices=['csv', 'jsonl'],
+                            help="Formato del archivo (default: según la extensión)")
+        parser.add_argument('--lote', type=int, default=5000, help="Filas leídas por consulta (default: 5000)")
+
+    def handle(self, *args, **options):
+        formato = formato_de(options['archivo'], options['formato'])
+        if formato is None:
+            raise CommandError("No se reconoce el formato: usa --formato csv o --formato jsonl")
+
+        inicio = time.monotonic()
+        filas = filas_exportadas(options['tipo'], max(1, options['lote']))
+        if options['archivo'] == '-':
+            total = escribir_filas(self.stdout, formato, COLUMNAS[options['tipo']], filas)
+            # El resumen va a stderr para no mezclarse con los datos
+            salida = self.stderr
+        else:
+            try:
+                with open(options['archivo'], 'w', encoding='utf-8', newline='') as archivo:
+                    total = escribir_filas(archivo, formato, COLUMNAS[options['tipo']], filas)
+            except OSError as e:
+                raise CommandError(f"No se pudo escribir {options['archivo']}: {e}")
+            salida = self.stdout
+
+        segundos = time.monotonic() - inicio
+        salida.write(self.style.SUCCESS(
+            f"{options['tipo'].capitalize()} exportados: {total} en {segundos:.1f} s "
+            f"({total / segundos if segundos else 0:.0f} filas/s)"
+        ))
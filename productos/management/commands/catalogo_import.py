@@ -0,0 +1,97 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import reset_queries
+
+from productos.autocomplete import autocompletado
+from productos.cache import cache_compartida, incrementar_version
+from productos.catalogo import IMPORTADORES, REQUERIDAS, FilaInvalida, en_lotes, formato_de, leer_filas
+from productos.search import reindexar_productos
+
+ERRORES_MOSTRADOS = 20
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa categorías o productos desde CSV o JSON Lines por lotes. Cada lote es un upsert "
+        "(bulk_create con update_conflicts) en su propia transacción: categorías por nombre, "
+        "productos por codigo, con la categoría indicada por nombre."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta del archivo, o - para leer de la entrada estándar")
+        parser.add_argument('--tipo', choices=sorted(IMPORTADORES), default='productos',
+                            help="Qué se importa (default: productos)")
+        parser.add_argument('--formato', choices=['csv', 'jsonl'],
+                            help="Formato del archivo (default: según la extensión)")
+        parser.add_argument('--lote', type=int, default=5000, help="Filas por transacción (default: 5000)")
+        parser.add_argument('--crear-categorias', action='store_true',
+                            help="Crea las categorías de productos que no existan en lugar de rechazar la fila")
+
+    def handle(self, *args, **options):
+        formato = formato_de(options['archivo'], options['formato'])
+        if formato is None:
+            raise CommandError("No se reconoce el formato: usa --formato csv o --formato jsonl")
+        importador = IMPORTADORES[options['tipo']](crear_categorias=options['crear_categorias'])
+
+        if options['archivo'] == '-':
+            return self.importar(sys.stdin, formato, importador, options)
+        try:
+            archivo = open(options['archivo'], encoding='utf-8-sig', newline='')
+        except OSError as e:
+            raise CommandError(f"No se pudo abrir {options['archivo']}: {e}")
+        with archivo:
+            self.importar(archivo, formato, importador, options)
+
+    def importar(self, archivo, formato, importador, options):
+        inicio = time.monotonic()
+        leidas = importadas = rechazadas = 0
+
+        for lote in en_lotes(leer_filas(archivo, formato), max(1, options['lote'])):
+            if not leidas and formato == 'csv':
+                self.validar_columnas(lote[0][1], options['tipo'])
+            objetos = []
+            for linea, fila in lote:
+                try:
+                    if isinstance(fila, FilaInvalida):
+                        raise fila
+                    objetos.append(importador.convertir(fila))
+                except FilaInvalida as e:
+                    rechazadas += 1
+                    if rechazadas <= ERRORES_MOSTRADOS:
+                        self.stderr.write(f"Línea {linea}: {e}")
+            if objetos:
+                importadas += importador.guardar(objetos)
+            # Con DEBUG=True cada INSERT quedaría en connection.queries hasta el final
+            reset_queries()
+            leidas += len(lote)
+            segundos = time.monotonic() - inicio
+            self.stdout.write(f"{leidas} filas leídas ({leidas / segundos:.0f} filas/s)")
+
+        if importadas:
+            # bulk_create no emite señales: búsqueda, autocompletado y cache se actualizan aquí.
+            # Este proceso no es el servidor: el autocompletado y la versión del catálogo le
+            # llegan por la cache compartida
+            if options['tipo'] == 'productos':
+                reindexar_productos()
+            autocompletado.invalidar()
+            incrementar_version()
+            if not cache_compartida():
+                self.stderr.write(self.style.WARNING(
+                    "La cache es propia de cada proceso (CACHE_BACKEND=locmem): el servidor en marcha "
+                    "sigue con el menú cacheado y el autocompletado anteriores hasta reiniciarlo"
+                ))
+
+        if rechazadas > ERRORES_MOSTRADOS:
+            self.stderr.write(f"... y {rechazadas - ERRORES_MOSTRADOS} filas rechazadas más")
+        segundos = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['tipo'].capitalize()} importados: {importadas}, rechazados: {rechazadas}, "
+            f"en {segundos:.1f} s ({leidas / segundos if segundos else 0:.0f} filas/s)"
+        ))
+
+    def validar_columnas(self, fila, tipo):
+        faltantes = [columna for columna in REQUERIDAS[tipo] if columna not in fila]
+        if faltantes:
+            raise CommandError(f"Faltan columnas en el archivo: {', '.join(faltantes)}")
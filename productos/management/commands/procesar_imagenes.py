@@ -0,0 +1,98 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from productos import imagenes, miniaturas
+from productos.cache import incrementar_version
+from productos.models import Producto
+
+ERRORES_MOSTRADOS = 20
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera las miniaturas WebP/AVIF de las imágenes de productos guardadas en MEDIA_ROOT, "
+        "en un pool de procesos. Con --descargar primero copia a MEDIA_ROOT las imágenes externas "
+        "(p. ej. las de un catálogo importado)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--descargar', action='store_true',
+                            help="Descarga las imágenes http(s) externas y las guarda en MEDIA_ROOT")
+        parser.add_argument('--procesos', type=int, default=multiprocessing.cpu_count(),
+                            help="Procesos que generan miniaturas (default: número de núcleos)")
+        parser.add_argument('--descargas', type=int, default=8, help="Descargas simultáneas (default: 8)")
+        parser.add_argument('--timeout', type=float, default=10, help="Segundos por descarga (default: 10)")
+        parser.add_argument('--todas', action='store_true',
+                            help="Regenera también las miniaturas que ya están al día (p. ej. tras cambiar IMAGENES_ANCHOS)")
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        errores = []
+        descargadas = 0
+        if options['descargar']:
+            descargadas = self.descargar(options, errores)
+
+        # Varias filas pueden compartir la misma imagen (mismo contenido): se procesa una vez
+        pendientes = {
+            imagen
+            for imagen, variantes in Producto.objects.exclude(imagen=None).values_list('imagen', 'imagen_variantes')
+            .iterator()
+            if imagenes.ruta_local(imagen) and (options['todas'] or (variantes or {}).get('origen') != imagen)
+        }
+        generadas = 0
+        contexto = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=max(1, options['procesos']), mp_context=contexto) as pool:
+            futuros = {
+                pool.submit(miniaturas.generar_variantes, imagenes.ruta_local(imagen), imagenes.anchos(),
+                            imagenes.formatos()): imagen
+                for imagen in pendientes
+            }
+            for futuro in as_completed(futuros):
+                imagen = futuros[futuro]
+                try:
+                    variantes = {'origen': imagen, **futuro.result()}
+                except Exception as e:
+                    errores.append(f"{imagen}: {e}")
+                    continue
+                Producto.objects.filter(imagen=imagen).update(
+                    imagen_variantes=variantes, fecha_actualizacion=timezone.now()
+                )
+                generadas += 1
+
+        if descargadas or generadas:
+            # update() no emite señales: invalidar la cache del catálogo a mano
+            incrementar_version()
+        for error in errores[:ERRORES_MOSTRADOS]:
+            self.stderr.write(error)
+        if len(errores) > ERRORES_MOSTRADOS:
+            self.stderr.write(f"... y {len(errores) - ERRORES_MOSTRADOS} errores más")
+        segundos = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"Imágenes descargadas: {descargadas}, con miniaturas: {generadas}, "
+            f"con error: {len(errores)} en {segundos:.1f} s"
+        ))
+
+    def descargar(self, options, errores):
+        """Reemplaza cada URL externa por su copia en MEDIA_ROOT; devuelve cuántas se descargaron"""
+        externas = set(
+            Producto.objects.filter(Q(imagen__startswith='http://') | Q(imagen__startswith='https://'))
+            .values_list('imagen', flat=True).iterator()
+        )
+        descargadas = 0
+        with ThreadPoolExecutor(max_workers=max(1, options['descargas']), thread_name_prefix='imagenes') as pool:
+            futuros = {pool.submit(imagenes.descargar, url, options['timeout']): url for url in externas}
+            for futuro in as_completed(futuros):
+                url = futuros[futuro]
+                try:
+                    local = futuro.result()
+                except imagenes.ImagenInvalida as e:
+                    errores.append(f"{url}: {e}")
+                    continue
+                Producto.objects.filter(imagen=url).update(imagen=local, fecha_actualizacion=timezone.now())
+                descargadas += 1
+        return descargadas
@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, IntegerField, Max, Q, Sum, Value, When
+
+from productos.cache import incrementar_version
+from productos.models import Calificacion, Producto
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula calificaciones_suma, calificaciones_total y el promedio de cada producto "
+        "desde la tabla de votos, por rangos de ids. Repara los agregados tras borrar votos o usuarios."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help="Productos por transacción (default: 1000)")
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+        hasta_id = Producto.objects.aggregate(maximo=Max('id'))['maximo'] or 0
+
+        inicio = time.monotonic()
+        corregidos = 0
+        desde = 0
+        while desde < hasta_id:
+            fin = min(desde + lote, hasta_id)
+            with transaction.atomic():
+                corregidos += self.recalcular_lote(desde, fin)
+            desde = fin
+
+        if corregidos:
+            # update() no emite señales: invalidar la cache del catálogo a mano
+            incrementar_version()
+        segundos = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"Calificaciones recalculadas: {corregidos} productos corregidos en {segundos:.1f} s"
+        ))
+
+    def recalcular_lote(self, desde, hasta):
+        votos = {
+            fila['producto_id']: (fila['suma'], fila['total'])
+            for fila in Calificacion.objects.filter(producto_id__gt=desde, producto_id__lte=hasta)
+            .values('producto_id').annotate(suma=Sum('valor'), total=Count('id'))
+        }
+        actuales = Producto.objects.filter(id__gt=desde, id__lte=hasta).filter(
+            Q(calificaciones_total__gt=0) | Q(id__in=votos.keys())
+        ).values_list('id', 'calificaciones_suma', 'calificaciones_total', 'calificacion')
+
+        esperados = {}
+        for pk, suma, total, promedio in actuales:
+            suma_real, total_real = votos.get(pk, (0, 0))
+            promedio_real = suma_real / total_real if total_real else 0
+            if (suma, total) != (suma_real, total_real) or abs(promedio - promedio_real) > 1e-9:
+                esperados[pk] = (suma_real, total_real, promedio_real)
+        if not esperados:
+            return 0
+
+        def valores(indice, campo):
+            return Case(
+                *[When(pk=pk, then=Value(fila[indice])) for pk, fila in esperados.items()],
+                default=F(campo),
+                output_field=IntegerField() if indice == 1 else FloatField(),
+            )
+
+        return Producto.objects.filter(pk__in=esperados.keys()).update(
+            calificaciones_suma=valores(0, 'calificaciones_suma'),
+            calificaciones_total=valores(1, 'calificaciones_total'),
+            calificacion=valores(2, 'calificacion'),
+        )
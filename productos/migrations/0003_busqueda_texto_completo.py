@@ -0,0 +1,59 @@
+from django.db import migrations, OperationalError
+
+PG_VECTOR = (
+    "(setweight(to_tsvector('spanish_unaccent'::regconfig, COALESCE(nombre, '')), 'A') || "
+    "setweight(to_tsvector('spanish_unaccent'::regconfig, COALESCE(descripcion, '')), 'B'))"
+)
+
+
+def crear_busqueda(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        schema_editor.execute("""
+            DO $$
+            BEGIN
+                IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'spanish_unaccent') THEN
+                    CREATE TEXT SEARCH CONFIGURATION spanish_unaccent (COPY = spanish);
+                    ALTER TEXT SEARCH CONFIGURATION spanish_unaccent
+                        ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+                END IF;
+            END
+            $$
+        """)
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS productos_producto_busqueda_gin "
+            f"ON productos_producto USING gin ({PG_VECTOR})"
+        )
+    elif vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS productos_producto_fts "
+                "USING fts5(nombre, descripcion, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+        except OperationalError:
+            # SQLite compilado sin FTS5: la búsqueda usa icontains
+            return
+        schema_editor.execute(
+            "INSERT INTO productos_producto_fts (rowid, nombre, descripcion) "
+            "SELECT id, nombre, descripcion FROM productos_producto"
+        )
+
+
+def eliminar_busqueda(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS productos_producto_busqueda_gin")
+    elif vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS productos_producto_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0002_producto_indices_keyset'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_busqueda, eliminar_busqueda),
+    ]
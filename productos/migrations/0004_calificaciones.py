@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:39
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0003_busqueda_texto_completo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='calificaciones_suma',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='calificaciones_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='Calificacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('valor', models.FloatField(help_text='De 1 a 5 estrellas')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='calificaciones', to='productos.producto')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='calificaciones', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Calificaciones',
+                'constraints': [models.UniqueConstraint(fields=('producto', 'usuario'), name='calificacion_unica_por_usuario')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations, models
+from django.db.models import Value
+from django.db.models.functions import Cast, Concat
+
+import productos.models
+
+
+def asignar_codigos(apps, schema_editor):
+    """Los productos existentes reciben un código derivado de su id (sin relleno: LPad trunca los ids largos)"""
+    Producto = apps.get_model('productos', 'Producto')
+    Producto.objects.filter(codigo__isnull=True).update(
+        codigo=Concat(Value('P-'), Cast('id', models.CharField()))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0004_calificaciones'),
+    ]
+
+    operations = [
+        # En tres pasos: un default callable en AddField daría el mismo código a todas las filas
+        migrations.AddField(
+            model_name='producto',
+            name='codigo',
+            field=models.CharField(max_length=40, null=True),
+        ),
+        migrations.RunPython(asignar_codigos, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='producto',
+            name='codigo',
+            field=models.CharField(default=productos.models.generar_codigo, max_length=40, unique=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 21:34
+
+import productos.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0006_producto_imagen_variantes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='producto',
+            name='imagen',
+            field=models.CharField(blank=True, max_length=200, null=True, validators=[productos.models.validar_imagen]),
+        ),
+    ]
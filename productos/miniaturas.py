@@ -0,0 +1,60 @@
+"""
+Generación de miniaturas con Pillow, sin nada de Django: corre dentro de los
+procesos del pool de productos/imagenes.py (y de procesar_imagenes), que la
+importan sin cargar settings ni modelos.
+
+Redimensionar y sobre todo codificar AVIF es trabajo de CPU (cientos de ms por
+imagen), por eso va en procesos aparte y no en el hilo de la petición.
+"""
+import math
+import os
+
+from PIL import Image, ImageOps, features
+
+ORIENTACION = 0x0112
+OPCIONES = {
+    'avif': {'quality': 60, 'speed': 6},
+    'webp': {'quality': 80, 'method': 4},
+}
+
+
+def formatos_disponibles(formatos):
+    """Los formatos pedidos que esta instalación de Pillow sabe codificar"""
+    return [formato for formato in formatos if formato in OPCIONES and features.check(formato)]
+
+
+def anchos_para(ancho_original, anchos):
+    """Solo se reduce: si la original es más angosta que todos los anchos, una variante de su tamaño"""
+    return [ancho for ancho in sorted(anchos) if ancho < ancho_original] or [ancho_original]
+
+
+def generar_variantes(origen, anchos, formatos):
+    """
+    Escribe <ancho>.<formato> junto a origen para cada ancho y formato.
+    Devuelve {formato: [anchos]} con lo que quedó en disco.
+    """
+    carpeta = os.path.dirname(origen)
+    with Image.open(origen) as imagen:
+        # Orientaciones EXIF 5-8 giran 90°: el ancho final es el alto guardado
+        girada = imagen.getexif().get(ORIENTACION, 1) in (5, 6, 7, 8)
+        ancho_final = imagen.height if girada else imagen.width
+        anchos = anchos_para(ancho_final, anchos)
+        # JPEG decodifica directamente a una escala menor (DCT) si la variante más grande lo permite
+        escala = max(anchos) / ancho_final
+        imagen.draft('RGB', (math.ceil(imagen.width * escala), math.ceil(imagen.height * escala)))
+        imagen = ImageOps.exif_transpose(imagen)
+        if imagen.mode not in ('RGB', 'RGBA'):
+            imagen = imagen.convert('RGBA' if 'transparency' in imagen.info or 'A' in imagen.mode else 'RGB')
+
+        variantes = {formato: [] for formato in formatos}
+        for ancho in sorted(anchos, reverse=True):
+            alto = max(1, round(imagen.height * ancho / imagen.width))
+            reducida = imagen.resize((ancho, alto), Image.Resampling.LANCZOS, reducing_gap=3.0)
+            for formato in formatos:
+                destino = os.path.join(carpeta, f'{ancho}.{formato}')
+                temporal = f'{destino}.{os.getpid()}.tmp'
+                reducida.save(temporal, format=formato.upper(), **OPCIONES[formato])
+                # Quien lea la carpeta nunca ve un archivo a medio escribir
+                os.replace(temporal, destino)
+                variantes[formato].append(ancho)
+    return {formato: sorted(lista) for formato, lista in variantes.items()}
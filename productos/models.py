@@ -1,4 +1,21 @@
-from django.db import models
+import posixpath
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, ExpressionWrapper, F, FloatField, IntegerField, Value, When
+from django.db.models.functions import Greatest
+from django.db.models.lookups import GreaterThanOrEqual
+from django.utils import timezone
+
+
+class StockInsuficiente(Exception):
+    def __init__(self, productos):
+        super().__init__(f"Stock insuficiente para los productos {productos}")
+        self.productos = productos
+
 
 class Categoria(models.Model):
     nombre = models.CharField(max_length=100, unique=True)
@@ -15,24 +32,149 @@ class Categoria(models.Model):
         return self.nombre
 
 
+class ProductoQuerySet(models.QuerySet):
+    """
+    Ajustes de stock hechos con UPDATE condicionales: la suma se hace en la base
+    de datos (sin leer y guardar desde Python) y solo se escriben stock y
+    fecha_actualizacion (que alimenta el Last-Modified del detalle).
+    """
+
+    def ajustar_stock(self, pk, cantidad):
+        """Suma cantidad al stock sin bajar de cero. Devuelve el stock nuevo o None si no existe"""
+        with transaction.atomic():
+            actualizados = self.filter(pk=pk).update(
+                stock=Greatest(F('stock') + cantidad, 0), fecha_actualizacion=timezone.now()
+            )
+            if not actualizados:
+                return None
+            return self.model.objects.filter(pk=pk).values_list('stock', flat=True).get()
+
+    def ajustar_stock_lote(self, ajustes):
+        """
+        Aplica {pk: cantidad} en un solo UPDATE dentro de una transacción.
+        Es todo o nada: si algún producto quedaría con stock negativo (o no existe)
+        se lanza StockInsuficiente / Producto.DoesNotExist y no se cambia nada.
+        Devuelve {pk: stock nuevo}.
+        """
+        if not ajustes:
+            return {}
+        delta = Case(
+            *[When(pk=pk, then=Value(cantidad)) for pk, cantidad in ajustes.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+        try:
+            with transaction.atomic():
+                actualizados = self.filter(pk__in=ajustes.keys()).filter(
+                    GreaterThanOrEqual(F('stock') + delta, 0)
+                ).update(stock=F('stock') + delta, fecha_actualizacion=timezone.now())
+                if actualizados != len(ajustes):
+                    raise StockInsuficiente([])
+                return dict(self.model.objects.filter(pk__in=ajustes.keys()).values_list('pk', 'stock'))
+        except StockInsuficiente:
+            # La transacción ya se revirtió: identificar qué falló para informar
+            actuales = dict(self.model.objects.filter(pk__in=ajustes.keys()).values_list('pk', 'stock'))
+            faltantes = sorted(pk for pk in ajustes if pk not in actuales)
+            if faltantes:
+                raise self.model.DoesNotExist(f"Productos no encontrados: {faltantes}")
+            raise StockInsuficiente(sorted(pk for pk, c in ajustes.items() if actuales[pk] + c < 0))
+
+    def calificar(self, pk, usuario, valor):
+        """
+        Guarda el voto del usuario (uno por producto; votar de nuevo lo reemplaza)
+        y actualiza suma, total y promedio del producto en un UPDATE con F().
+        Devuelve (promedio, total) o lanza Producto.DoesNotExist.
+        """
+        with transaction.atomic():
+            votos = Calificacion.objects.filter(producto_id=pk, usuario=usuario)
+            anterior = votos.select_for_update().values_list('valor', flat=True).first()
+            if anterior is None:
+                try:
+                    with transaction.atomic():
+                        Calificacion.objects.create(producto_id=pk, usuario=usuario, valor=valor)
+                except IntegrityError:
+                    # El mismo usuario votó a la vez desde otra petición: se reemplaza su voto
+                    return self.calificar(pk, usuario, valor)
+                delta_suma, delta_total = valor, 1
+            else:
+                votos.update(valor=valor, fecha=timezone.now())
+                delta_suma, delta_total = valor - anterior, 0
+
+            suma = F('calificaciones_suma') + delta_suma
+            total = F('calificaciones_total') + delta_total
+            actualizados = self.filter(pk=pk).update(
+                calificaciones_suma=suma,
+                calificaciones_total=total,
+                calificacion=ExpressionWrapper(suma / total, output_field=FloatField()),
+                fecha_actualizacion=timezone.now(),
+            )
+            if not actualizados:
+                raise self.model.DoesNotExist(f"Producto {pk} no encontrado")
+            return self.model.objects.filter(pk=pk).values_list('calificacion', 'calificaciones_total').get()
+
+
+def validar_imagen(value):
+    """URL externa o ruta canónica de MEDIA_URL (las imágenes propias, ver productos/imagenes.py)"""
+    if value.startswith(settings.MEDIA_URL):
+        if posixpath.normpath(value) != value:
+            raise ValidationError("La ruta de la imagen no es válida", code='invalid')
+        return
+    URLValidator()(value)
+
+
+def generar_codigo():
+    """Código por defecto para productos creados desde la API o el admin"""
+    return f"P-{uuid.uuid4().hex[:12].upper()}"
+
+
 class Producto(models.Model):
+    # Clave estable del catálogo (SKU): catalogo_import/catalogo_export la usan para el upsert
+    codigo = models.CharField(max_length=40, unique=True, default=generar_codigo)
     nombre = models.CharField(max_length=200)
     descripcion = models.TextField(blank=True)
     precio = models.DecimalField(max_digits=10, decimal_places=2)
     categoria = models.ForeignKey(Categoria, on_delete=models.PROTECT, related_name='productos')
-    imagen = models.URLField(blank=True, null=True)
+    imagen = models.CharField(max_length=200, blank=True, null=True, validators=[validar_imagen])
+    # Miniaturas generadas para imagen: {'origen': imagen, 'webp': [160, 320], ...} (ver productos/imagenes.py)
+    imagen_variantes = models.JSONField(default=dict, blank=True, editable=False)
     disponible = models.BooleanField(default=True)
     stock = models.IntegerField(default=0)
     calificacion = models.FloatField(default=0, help_text="De 0 a 5 estrellas")
+    # Agregados de Calificacion: el promedio se lee sin recorrer los votos
+    calificaciones_suma = models.FloatField(default=0)
+    calificaciones_total = models.PositiveIntegerField(default=0)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
 
+    objects = ProductoQuerySet.as_manager()
+
     class Meta:
         ordering = ['-fecha_creacion']
         indexes = [
             models.Index(fields=['categoria', 'disponible']),
             models.Index(fields=['nombre']),
+            # Índices para la paginación keyset (campo de orden + id como desempate)
+            models.Index(fields=['precio', 'id']),
+            models.Index(fields=['calificacion', 'id']),
+            models.Index(fields=['fecha_creacion', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre} - ${self.precio}"
+
+
+class Calificacion(models.Model):
+    """Voto de un usuario sobre un producto (ver ProductoQuerySet.calificar)"""
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='calificaciones')
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='calificaciones')
+    valor = models.FloatField(help_text="De 1 a 5 estrellas")
+    fecha = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "Calificaciones"
+        constraints = [
+            models.UniqueConstraint(fields=['producto', 'usuario'], name='calificacion_unica_por_usuario'),
         ]
 
     def __str__(self):
-        return f"{self.nombre} - ${self.precio}"
\ No newline at end of file
+        return f"{self.usuario} - {self.producto}: {self.valor}"
@@ -0,0 +1,142 @@
+from base64 import b64decode, b64encode
+from datetime import datetime
+from urllib import parse
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .models import Producto
+
+
+class ProductoPagination(PageNumberPagination):
+    """
+    Paginación por número de página (la de siempre) con un modo keyset opcional.
+
+    El modo keyset se activa con ?paginacion=cursor (o al seguir un enlace con
+    ?cursor=...). En lugar de OFFSET + COUNT(*) filtra por la posición del último
+    producto visto, usando el primer campo de ordenamiento más el id como
+    desempate, así cada página cuesta lo mismo sin importar qué tan profunda sea.
+    """
+    modo_query_param = 'paginacion'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Cursor inválido'
+    # Campos soportados por el modo keyset; cada uno tiene un índice (campo, id)
+    campos_keyset = ('precio', 'calificacion', 'fecha_creacion')
+    ordering = '-fecha_creacion'
+
+    keyset = False
+
+    def usa_keyset(self, request):
+        return (
+            request.query_params.get(self.modo_query_param) == 'cursor'
+            or self.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.usa_keyset(request)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.campo, self.descendente = self.get_orden(request, queryset, view)
+
+        cursor = self.decode_cursor(request)
+        atras = cursor is not None and cursor[2]
+        if cursor is not None:
+            valor, pk, _ = cursor
+            # Avanzar en orden descendente (o retroceder en ascendente) busca valores menores
+            op = 'lt' if self.descendente != atras else 'gt'
+            # El rango redundante (campo >= / <= valor) permite buscar en el índice en vez de recorrerlo
+            queryset = queryset.filter(**{f'{self.campo}__{op}e': valor}).filter(
+                Q(**{f'{self.campo}__{op}': valor}) |
+                Q(**{self.campo: valor, f'pk__{op}': pk})
+            )
+
+        descendente = self.descendente != atras
+        prefijo = '-' if descendente else ''
+        queryset = queryset.order_by(f'{prefijo}{self.campo}', f'{prefijo}pk')
+
+        resultados = list(queryset[:self.page_size + 1])
+        hay_mas = len(resultados) > self.page_size
+        resultados = resultados[:self.page_size]
+        if atras:
+            resultados.reverse()
+            self.tiene_siguiente, self.tiene_anterior = True, hay_mas
+        else:
+            self.tiene_siguiente, self.tiene_anterior = hay_mas, cursor is not None
+        self.page = resultados
+        return resultados
+
+    def get_orden(self, request, queryset, view):
+        """Devuelve (campo, descendente) a partir del OrderingFilter de la vista"""
+        ordering = OrderingFilter().get_ordering(request, queryset, view) or [self.ordering]
+        campo = ordering[0]
+        if campo.lstrip('-') not in self.campos_keyset:
+            campo = self.ordering
+        return campo.lstrip('-'), campo.startswith('-')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            tokens = parse.parse_qs(b64decode(encoded.encode('ascii')).decode('ascii'), keep_blank_values=True)
+            valor = tokens['v'][0]
+            pk = int(tokens['id'][0])
+            atras = tokens.get('r', ['0'])[0] == '1'
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return self.convertir_valor(valor), pk, atras
+
+    def convertir_valor(self, valor):
+        try:
+            return Producto._meta.get_field(self.campo).to_python(valor)
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, producto, atras):
+        # producto puede ser una instancia o una fila de .values() (ver ProductoViewSet.list)
+        if isinstance(producto, dict):
+            valor, pk = producto[self.campo], producto['id']
+        else:
+            valor, pk = getattr(producto, self.campo), producto.pk
+        if isinstance(valor, datetime):
+            valor = valor.isoformat()
+        elif isinstance(valor, float):
+            valor = repr(valor)
+        tokens = {'v': str(valor), 'id': pk}
+        if atras:
+            tokens['r'] = '1'
+        encoded = b64encode(parse.urlencode(tokens, doseq=True).encode('ascii')).decode('ascii')
+        url = remove_query_param(self.base_url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.tiene_siguiente or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], atras=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.tiene_anterior or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], atras=True)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
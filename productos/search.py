@@ -0,0 +1,152 @@
+"""
+Búsqueda de texto completo sobre Producto (nombre y descripción).
+
+Según el motor de base de datos:
+- PostgreSQL: tsvector con la configuración 'spanish_unaccent' (stemming en
+  español + unaccent) y un índice GIN sobre la misma expresión.
+- SQLite: tabla virtual FTS5 'productos_producto_fts' con remove_diacritics,
+  sincronizada desde las señales de Producto (ver productos/signals.py).
+- Otros motores: icontains sobre nombre y descripción, como el SearchFilter.
+
+Los resultados se anotan con 'relevancia' (mayor es mejor).
+"""
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+FTS_TABLA = 'productos_producto_fts'
+REINDEXAR_TRAMO = 500
+
+# Debe coincidir exactamente con la expresión del índice GIN (migración 0003)
+PG_VECTOR = (
+    "(setweight(to_tsvector('spanish_unaccent'::regconfig, COALESCE(productos_producto.nombre, '')), 'A') || "
+    "setweight(to_tsvector('spanish_unaccent'::regconfig, COALESCE(productos_producto.descripcion, '')), 'B'))"
+)
+PG_QUERY = "websearch_to_tsquery('spanish_unaccent'::regconfig, %s)"
+
+_fts_disponible = None
+
+
+def fts_disponible():
+    """Indica si existe la tabla FTS5 (puede faltar si SQLite no trae FTS5)"""
+    global _fts_disponible
+    if _fts_disponible is None:
+        _fts_disponible = FTS_TABLA in connection.introspection.table_names()
+    return _fts_disponible
+
+
+def tokenizar(termino):
+    return re.findall(r'\w+', termino or '')
+
+
+def consulta_fts5(termino):
+    """Convierte el texto del usuario en una consulta FTS5 segura (AND de prefijos)"""
+    return ' '.join(f'"{token}"*' for token in tokenizar(termino))
+
+
+def buscar_productos(queryset, termino):
+    """Filtra el queryset por el término y lo anota con 'relevancia'"""
+    if not tokenizar(termino):
+        return queryset
+
+    if connection.vendor == 'postgresql':
+        return queryset.filter(
+            RawSQL(f"{PG_VECTOR} @@ {PG_QUERY}", [termino], output_field=BooleanField())
+        ).annotate(
+            relevancia=RawSQL(f"ts_rank({PG_VECTOR}, {PG_QUERY})", [termino], output_field=FloatField())
+        )
+
+    if connection.vendor == 'sqlite' and fts_disponible():
+        # Se une la tabla FTS5 para resolver el MATCH una sola vez; una subconsulta
+        # correlacionada repetiría el MATCH (costoso con prefijos) por cada fila.
+        # bm25 devuelve valores negativos (más negativo = más relevante); nombre pesa más
+        return queryset.extra(
+            tables=[FTS_TABLA],
+            where=[f"{FTS_TABLA}.rowid = productos_producto.id", f"{FTS_TABLA} MATCH %s"],
+            params=[consulta_fts5(termino)],
+            select={'relevancia': f"-bm25({FTS_TABLA}, 10.0, 1.0)"},
+        )
+
+    condiciones = Q()
+    for token in tokenizar(termino):
+        condiciones &= Q(nombre__icontains=token) | Q(descripcion__icontains=token)
+    return queryset.filter(condiciones).annotate(relevancia=Value(0.0, output_field=FloatField()))
+
+
+def indexar_producto(producto):
+    """Actualiza la fila FTS5 de un producto (no hace nada fuera de SQLite)"""
+    if connection.vendor != 'sqlite' or not fts_disponible():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLA} WHERE rowid = %s", [producto.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLA} (rowid, nombre, descripcion) VALUES (%s, %s, %s)",
+            [producto.pk, producto.nombre, producto.descripcion]
+        )
+
+
+def desindexar_producto(pk):
+    if connection.vendor != 'sqlite' or not fts_disponible():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLA} WHERE rowid = %s", [pk])
+
+
+def reindexar_productos(pks=None):
+    """
+    Reconstruye la tabla FTS5, p. ej. después de un bulk_create/bulk_update. Con
+    pks solo las filas de esos productos: un lote de la API no reescribe (ni
+    bloquea) el índice de todo el catálogo.
+    """
+    if connection.vendor != 'sqlite' or not fts_disponible():
+        return
+    with connection.cursor() as cursor:
+        if pks is None:
+            cursor.execute(f"DELETE FROM {FTS_TABLA}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLA} (rowid, nombre, descripcion) "
+                f"SELECT id, nombre, descripcion FROM productos_producto"
+            )
+            return
+        pks = list(pks)
+        # Por tramos: SQLite limita la cantidad de parámetros de una consulta
+        for inicio in range(0, len(pks), REINDEXAR_TRAMO):
+            tramo = pks[inicio:inicio + REINDEXAR_TRAMO]
+            marcas = ', '.join(['%s'] * len(tramo))
+            cursor.execute(f"DELETE FROM {FTS_TABLA} WHERE rowid IN ({marcas})", tramo)
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLA} (rowid, nombre, descripcion) "
+                f"SELECT id, nombre, descripcion FROM productos_producto WHERE id IN ({marcas})",
+                tramo
+            )
+
+
+class BusquedaProductoFilter(BaseFilterBackend):
+    """
+    Reemplaza a SearchFilter para Producto usando el mismo parámetro (?search=).
+    Si no se pide un ?ordering= explícito, ordena por relevancia.
+    """
+    search_param = api_settings.SEARCH_PARAM
+    ordering_param = api_settings.ORDERING_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        termino = request.query_params.get(self.search_param, '')
+        if not tokenizar(termino):
+            return queryset
+        queryset = buscar_productos(queryset, termino)
+        if self.ordering_param not in request.query_params:
+            queryset = queryset.order_by('-relevancia', '-fecha_creacion')
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Búsqueda de texto completo en nombre y descripción',
+            'schema': {'type': 'string'},
+        }]
@@ -1,28 +1,140 @@
+from django.conf import settings
+from django.utils import timezone
+from django.utils.encoding import iri_to_uri
 from rest_framework import serializers
-from .models import Categoria, Producto
+from .imagenes import srcset
+from .models import Categoria, Producto, validar_imagen
 
 class CategoriaSerializer(serializers.ModelSerializer):
     productos_count = serializers.SerializerMethodField()
+    productos_disponibles = serializers.SerializerMethodField()
 
     class Meta:
         model = Categoria
-        fields = ['id', 'nombre', 'icono', 'descripcion', 'activa', 'productos_count', 'fecha_creacion']
+        fields = [
+            'id', 'nombre', 'icono', 'descripcion', 'activa',
+            'productos_count', 'productos_disponibles', 'fecha_creacion'
+        ]
 
     def get_productos_count(self, obj):
+        # Usa la anotación del queryset (ver CategoriaViewSet) para evitar un COUNT por fila
+        if hasattr(obj, 'num_productos'):
+            return obj.num_productos
         return obj.productos.count()
 
+    def get_productos_disponibles(self, obj):
+        if hasattr(obj, 'num_disponibles'):
+            return obj.num_disponibles
+        return obj.productos.filter(disponible=True).count()
+
+
+COLUMNAS_PRODUCTO = (
+    'id', 'nombre', 'descripcion', 'precio', 'categoria_id', 'categoria__nombre', 'imagen', 'imagen_variantes',
+    'disponible', 'stock', 'calificacion', 'calificaciones_total', 'fecha_creacion', 'fecha_actualizacion',
+)
+
+
+class ImagenAbsoluta:
+    """
+    Misma normalización de imagen que ProductoSerializer.to_representation.
+    Para rutas que empiezan con una sola '/' evita el urlsplit de
+    request.build_absolute_uri() en cada fila: es el mismo resultado.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.base = request.build_absolute_uri('/')[:-1] if request is not None else None
+
+    def __call__(self, imagen):
+        if not imagen or imagen.startswith('http://') or imagen.startswith('https://') or self.request is None:
+            return imagen
+        if imagen.startswith('/') and not imagen.startswith('//') and '/./' not in imagen and '/../' not in imagen:
+            return iri_to_uri(self.base + imagen)
+        return self.request.build_absolute_uri(imagen)
+
+
+class RelacionMemorizada(serializers.PrimaryKeyRelatedField):
+    """Consulta cada pk una sola vez por serializador: en un lote las categorías repetidas no cuestan una consulta por fila"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.resueltas = {}
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool) or not isinstance(data, (int, str)):
+            return super().to_internal_value(data)
+        if data not in self.resueltas:
+            self.resueltas[data] = super().to_internal_value(data)
+        return self.resueltas[data]
+
+
+class ProductoLoteSerializer(serializers.ListSerializer):
+    """
+    Altas y cambios de productos en bloque (ver ProductoAdminViewSet.lote). Cada
+    elemento se valida con ProductoSerializer y el lote se escribe con un
+    bulk_create / bulk_update. Para cambios, instance es un dict {id: Producto}
+    y cada elemento indica su id.
+    """
+
+    def to_internal_value(self, data):
+        self.vistos = set()
+        return super().to_internal_value(data)
+
+    def run_child_validation(self, data):
+        if self.instance is None:
+            return super().run_child_validation(data)
+
+        pk = data.get('id') if isinstance(data, dict) else None
+        if pk in self.vistos:
+            raise serializers.ValidationError({'id': ['Producto repetido en el lote']})
+        if isinstance(pk, bool) or not isinstance(pk, int) or pk not in self.instance:
+            raise serializers.ValidationError({'id': ['Producto no encontrado']})
+        self.vistos.add(pk)
+        self.child.instance = self.instance[pk]
+        validado = super().run_child_validation(data)
+        validado['id'] = pk
+        return validado
+
+    def create(self, validated_data):
+        return Producto.objects.bulk_create([Producto(**attrs) for attrs in validated_data])
+
+    def update(self, instance, validated_data):
+        """
+        Solo se escriben los campos enviados: los productos se agrupan por campos
+        cambiados y cada grupo es un bulk_update, así un cambio de precios no pisa
+        el stock que descuentan los pedidos al mismo tiempo.
+        """
+        ahora = timezone.now()
+        grupos = {}
+        for attrs in validated_data:
+            producto = instance[attrs['id']]
+            campos = tuple(sorted(campo for campo in attrs if campo != 'id')) + ('fecha_actualizacion',)
+            for campo in campos[:-1]:
+                setattr(producto, campo, attrs[campo])
+            # bulk_update no aplica auto_now
+            producto.fecha_actualizacion = ahora
+            grupos.setdefault(campos, []).append(producto)
+        for campos, productos in grupos.items():
+            Producto.objects.bulk_update(productos, campos)
+        return [instance[attrs['id']] for attrs in validated_data]
+
 
 class ProductoSerializer(serializers.ModelSerializer):
     categoria_nombre = serializers.CharField(source='categoria.nombre', read_only=True)
+    # Miniaturas por formato en sintaxis srcset: {'avif': 'url 160w, url 320w', 'webp': ...}
+    imagen_srcset = serializers.SerializerMethodField()
+    serializer_related_field = RelacionMemorizada
 
     class Meta:
         model = Producto
+        list_serializer_class = ProductoLoteSerializer
         fields = [
             'id', 'nombre', 'descripcion', 'precio', 'categoria', 
-            'categoria_nombre', 'imagen', 'disponible', 'stock', 
-            'calificacion', 'fecha_creacion', 'fecha_actualizacion'
+            'categoria_nombre', 'imagen', 'imagen_srcset', 'disponible', 'stock', 
+            'calificacion', 'calificaciones_total', 'fecha_creacion', 'fecha_actualizacion'
         ]
-        read_only_fields = ['fecha_creacion', 'fecha_actualizacion']
+        # La calificación es el promedio de los votos (ver ProductoViewSet.calificar)
+        read_only_fields = ['calificacion', 'calificaciones_total', 'fecha_creacion', 'fecha_actualizacion']
 
     def to_representation(self, instance):
         """Personalizar la representación para devolver URLs absolutas de imágenes"""
@@ -40,12 +152,73 @@ class ProductoSerializer(serializers.ModelSerializer):
         
         return data
 
+    def get_imagen_srcset(self, obj):
+        return srcset(obj.imagen, obj.imagen_variantes, ImagenAbsoluta(self.context.get('request')))
+
+    @classmethod
+    def filas(cls, queryset):
+        """Queryset de .values() con las columnas que usa representar_filas()"""
+        return queryset.values(*COLUMNAS_PRODUCTO)
+
+    @classmethod
+    def representar_filas(cls, filas, context):
+        """
+        Camino rápido de solo lectura para listados: arma los dicts directamente
+        desde filas de .values() en lugar de recorrer los campos de DRF por cada
+        producto. La salida es idéntica a ProductoSerializer(many=True).data:
+        precio y fechas usan los mismos campos de DRF y la base de la URL absoluta
+        de las imágenes se calcula una sola vez por petición.
+        """
+        campos = cls(context=context).fields
+        for nombre in ('fecha_creacion', 'fecha_actualizacion'):
+            # Fijar la zona horaria en estas copias de los campos evita buscarla en cada fila
+            campos[nombre].timezone = campos[nombre].default_timezone()
+        precio = campos['precio'].to_representation
+        creacion = campos['fecha_creacion'].to_representation
+        actualizacion = campos['fecha_actualizacion'].to_representation
+        absoluta = ImagenAbsoluta(context.get('request'))
+
+        return [
+            {
+                'id': fila['id'],
+                'nombre': fila['nombre'],
+                'descripcion': fila['descripcion'],
+                'precio': precio(fila['precio']),
+                'categoria': fila['categoria_id'],
+                'categoria_nombre': fila['categoria__nombre'],
+                'imagen': absoluta(fila['imagen']),
+                'imagen_srcset': srcset(fila['imagen'], fila['imagen_variantes'], absoluta),
+                'disponible': fila['disponible'],
+                'stock': fila['stock'],
+                'calificacion': fila['calificacion'],
+                'calificaciones_total': fila['calificaciones_total'],
+                'fecha_creacion': creacion(fila['fecha_creacion']),
+                'fecha_actualizacion': actualizacion(fila['fecha_actualizacion']),
+            }
+            for fila in filas
+        ]
+
     def validate_precio(self, value):
         if value <= 0:
             raise serializers.ValidationError("El precio debe ser mayor a 0")
         return value
 
+    def validate_imagen(self, value):
+        # Las imágenes propias se leen como URL absoluta: al reenviarlas se guardan otra vez como ruta de MEDIA_URL
+        request = self.context.get('request')
+        if value and request is not None:
+            base = ImagenAbsoluta(request).base
+            if value.startswith(base + settings.MEDIA_URL):
+                value = value[len(base):]
+                validar_imagen(value)
+        return value
+
     def validate_stock(self, value):
         if value < 0:
             raise serializers.ValidationError("El stock no puede ser negativo")
-        return value
\ No newline at end of file
+        return value
+
+
+class AjusteStockSerializer(serializers.Serializer):
+    producto = serializers.IntegerField()
+    cantidad = serializers.IntegerField()
@@ -0,0 +1,38 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .autocomplete import autocompletado
+from .cache import incrementar_version
+from .models import Categoria, Producto
+from .search import desindexar_producto, indexar_producto
+
+
+@receiver(post_save, sender=Producto)
+def producto_guardado(sender, instance, **kwargs):
+    """Mantiene sincronizados la búsqueda FTS5 (solo SQLite), el autocompletado y la cache"""
+    indexar_producto(instance)
+    # El índice en memoria solo se toca si la transacción se confirma
+    transaction.on_commit(lambda: autocompletado.producto_guardado(instance))
+    transaction.on_commit(incrementar_version)
+
+
+@receiver(post_delete, sender=Producto)
+def producto_eliminado(sender, instance, **kwargs):
+    desindexar_producto(instance.pk)
+    pk = instance.pk
+    transaction.on_commit(lambda: autocompletado.eliminado('producto', pk))
+    transaction.on_commit(incrementar_version)
+
+
+@receiver(post_save, sender=Categoria)
+def categoria_guardada(sender, instance, **kwargs):
+    transaction.on_commit(lambda: autocompletado.categoria_guardada(instance))
+    transaction.on_commit(incrementar_version)
+
+
+@receiver(post_delete, sender=Categoria)
+def categoria_eliminada(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: autocompletado.eliminado('categoria', pk))
+    transaction.on_commit(incrementar_version)
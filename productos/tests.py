@@ -1,3 +1,1215 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, close_old_connections, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from django.utils.http import http_date
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+from whitenoise.compress import Compressor
+
+from mi_proyecto.renderers import JSONRapidoRenderer
+from usuarios.models import CustomUser
+
+from . import imagenes, miniaturas
+from . import autocomplete
+from .autocomplete import Autocompletado, IndicePrefijos, autocompletado
+from .cache import VERSION_KEY, VERSION_TIMEOUT, incrementar_version, version_catalogo
+from .models import Calificacion, Categoria, Producto, StockInsuficiente
+from .serializers import ProductoSerializer
+
+
+@override_settings(CATALOGO_CACHE_TIMEOUT=0)
+class SinCacheMenuTestCase(TestCase):
+    """Pruebas que miden el acceso a la base de datos: la cache del menú respondería sin consultar"""
+
+
+class CategoriaConteoProductosTests(SinCacheMenuTestCase):
+    """El listado de categorías no debe hacer un COUNT por cada fila"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def crear_categorias(self, cantidad):
+        inicio = Categoria.objects.count()
+        categorias = Categoria.objects.bulk_create([
+            Categoria(nombre=f'Categoria {inicio + i}') for i in range(cantidad)
+        ])
+        productos = []
+        for categoria in categorias:
+            productos.append(Producto(nombre='Disponible', precio=1000, categoria=categoria))
+            productos.append(Producto(nombre='Agotado', precio=1000, categoria=categoria, disponible=False))
+        Producto.objects.bulk_create(productos)
+
+    def contar_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_conteos_disponibles_y_totales(self):
+        self.crear_categorias(1)
+        response = self.client.get('/api/categorias/activas/')
+        categoria = response.data[0]
+        self.assertEqual(categoria['productos_count'], 2)
+        self.assertEqual(categoria['productos_disponibles'], 1)
+
+    def test_listado_con_queries_constantes(self):
+        self.crear_categorias(10)
+        queries_pocas, _ = self.contar_queries('/api/categorias/')
+        activas_pocas, _ = self.contar_queries('/api/categorias/activas/')
+
+        self.crear_categorias(990)
+        queries_muchas, response = self.contar_queries('/api/categorias/')
+        activas_muchas, activas = self.contar_queries('/api/categorias/activas/')
+
+        self.assertEqual(response.data['count'], 1000)
+        self.assertEqual(len(activas.data), 1000)
+        self.assertEqual(queries_pocas, queries_muchas)
+        self.assertEqual(activas_pocas, activas_muchas)
+        self.assertEqual(activas_muchas, 1)
+
+
+class ProductoPaginacionKeysetTests(SinCacheMenuTestCase):
+    """Modo keyset opcional (?paginacion=cursor) del listado de productos"""
+
+    def setUp(self):
+        self.client = APIClient()
+        categoria = Categoria.objects.create(nombre='Hamburguesas')
+        # Precios repetidos para comprobar el desempate por id
+        Producto.objects.bulk_create([
+            Producto(nombre=f'Producto {i}', precio=1000 + (i % 5) * 500, calificacion=i % 4, categoria=categoria)
+            for i in range(40)
+        ])
+
+    def recorrer(self, url):
+        ids, paginas = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            ids.extend(p['id'] for p in response.data['results'])
+            paginas.append(response.data)
+            url = response.data['next']
+        return ids, paginas
+
+    def test_recorre_todo_sin_repetir_en_cada_orden(self):
+        for orden in ['precio', '-precio', 'calificacion', '-fecha_creacion']:
+            ids, _ = self.recorrer(f'/api/productos/?paginacion=cursor&ordering={orden}')
+            campo = orden.lstrip('-')
+            esperado = Producto.objects.order_by(
+                *([f'-{campo}', '-id'] if orden.startswith('-') else [campo, 'id'])
+            ).values_list('id', flat=True)
+            self.assertEqual(ids, list(esperado), orden)
+
+    def test_enlace_anterior_devuelve_la_pagina_previa(self):
+        _, paginas = self.recorrer('/api/productos/?paginacion=cursor&ordering=precio')
+        self.assertIsNone(paginas[0]['previous'])
+        response = self.client.get(paginas[2]['previous'])
+        self.assertEqual(response.data['results'], paginas[1]['results'])
+
+    def test_una_sola_consulta_por_pagina(self):
+        _, paginas = self.recorrer('/api/productos/?paginacion=cursor')
+        with self.assertNumQueries(1):
+            self.client.get(paginas[1]['next'])
+
+    def test_cursor_invalido(self):
+        response = self.client.get('/api/productos/?cursor=no-es-un-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_paginacion_por_numero_sin_cambios(self):
+        response = self.client.get('/api/productos/?page=2')
+        self.assertEqual(response.data['count'], 40)
+        self.assertEqual(len(response.data['results']), 12)
+
+
+class BusquedaProductoTests(SinCacheMenuTestCase):
+    """Búsqueda de texto completo (?search=) sobre nombre y descripción"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.categoria = Categoria.objects.create(nombre='Bebidas')
+        self.cafe = Producto.objects.create(
+            nombre='Café Americano', descripcion='Café negro de origen', precio=5000, categoria=self.categoria
+        )
+        self.malteada = Producto.objects.create(
+            nombre='Malteada', descripcion='Malteada con un toque de café', precio=9000, categoria=self.categoria
+        )
+        Producto.objects.create(nombre='Limonada', descripcion='Natural', precio=4000, categoria=self.categoria)
+
+    def buscar(self, termino):
+        response = self.client.get('/api/productos/', {'search': termino})
+        self.assertEqual(response.status_code, 200)
+        return [p['nombre'] for p in response.data['results']]
+
+    def test_sin_tildes_encuentra_con_tildes(self):
+        self.assertEqual(self.buscar('cafe'), ['Café Americano', 'Malteada'])
+
+    def test_coincidencia_en_nombre_pesa_mas(self):
+        self.assertEqual(self.buscar('café')[0], 'Café Americano')
+
+    def test_todas_las_palabras_y_prefijos(self):
+        self.assertEqual(self.buscar('malt caf'), ['Malteada'])
+        self.assertEqual(self.buscar('limonada cafe'), [])
+
+    def test_sincroniza_al_guardar_y_eliminar(self):
+        self.cafe.nombre = 'Tinto'
+        self.cafe.descripcion = 'Tinto tradicional'
+        self.cafe.save()
+        self.assertEqual(self.buscar('tinto'), ['Tinto'])
+        self.assertEqual(self.buscar('americano'), [])
+
+        self.malteada.delete()
+        self.assertEqual(self.buscar('malteada'), [])
+
+    def test_terminos_sin_palabras_no_filtran(self):
+        self.assertEqual(len(self.buscar('"*)(')), 3)
+
+
+class IndicePrefijosTests(TestCase):
+
+    def setUp(self):
+        self.indice = IndicePrefijos(k=3)
+        self.indice.agregar('producto', 1, 'Hamburguesa Doble', 4.5)
+        self.indice.agregar('producto', 2, 'Hamburguesa Sencilla', 3.0)
+        self.indice.agregar('producto', 3, 'Hot Dog', 4.0)
+        self.indice.agregar('categoria', 1, 'Hamburguesas', 5.0)
+
+    def textos(self, prefijo, limite=8):
+        return [s.texto for s in self.indice.buscar(prefijo, limite)]
+
+    def test_ordena_por_peso_y_respeta_limite(self):
+        self.assertEqual(self.textos('h'), ['Hamburguesas', 'Hamburguesa Doble', 'Hot Dog'])
+        self.assertEqual(self.textos('ham', limite=2), ['Hamburguesas', 'Hamburguesa Doble'])
+
+    def test_prefijo_de_cualquier_palabra_sin_tildes(self):
+        self.indice.agregar('producto', 4, 'Café con Leche', 1.0)
+        self.assertEqual(self.textos('dob'), ['Hamburguesa Doble'])
+        self.assertEqual(self.textos('CAFE'), ['Café con Leche'])
+        self.assertEqual(self.textos('leche'), ['Café con Leche'])
+
+    def test_eliminar_recalcula_los_mejores(self):
+        self.indice.eliminar('categoria', 1)
+        self.indice.eliminar('producto', 1)
+        self.assertEqual(self.textos('h'), ['Hot Dog', 'Hamburguesa Sencilla'])
+        self.indice.eliminar('producto', 3)
+        self.assertEqual(self.textos('do'), [])
+        self.assertNotIn('d', self.indice.raiz.hijos)
+
+    def test_actualizar_reemplaza_la_entrada(self):
+        self.indice.agregar('producto', 3, 'Perro Caliente', 4.0)
+        self.assertEqual(self.textos('hot'), [])
+        self.assertEqual(self.textos('perro'), ['Perro Caliente'])
+
+
+class AutocompleteEndpointTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        autocompletado.invalidar()
+        self.categoria = Categoria.objects.create(nombre='Pizzas')
+        self.producto = Producto.objects.create(nombre='Pizza Hawaiana', precio=25000, categoria=self.categoria)
+
+    def tearDown(self):
+        autocompletado.invalidar()
+
+    def test_sugerencias_sin_consultas_a_la_base_de_datos(self):
+        self.client.get('/api/productos/autocomplete/', {'q': 'x'})
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/productos/autocomplete/', {'q': 'piz'})
+        self.assertEqual(response.data, [
+            {'tipo': 'categoria', 'id': self.categoria.id, 'texto': 'Pizzas'},
+            {'tipo': 'producto', 'id': self.producto.id, 'texto': 'Pizza Hawaiana'},
+        ])
+
+    def test_se_actualiza_con_las_senales(self):
+        self.client.get('/api/productos/autocomplete/', {'q': 'x'})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.producto.nombre = 'Pizza Pepperoni'
+            self.producto.save()
+            Producto.objects.create(nombre='Perro Caliente', precio=9000, categoria=self.categoria)
+        response = self.client.get('/api/productos/autocomplete/', {'q': 'pe'})
+        self.assertEqual([s['texto'] for s in response.data], ['Perro Caliente', 'Pizza Pepperoni'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.producto.delete()
+        response = self.client.get('/api/productos/autocomplete/', {'q': 'pepp'})
+        self.assertEqual(response.data, [])
+
+    def test_los_cambios_propios_no_recargan_el_indice(self):
+        self.client.get('/api/productos/autocomplete/', {'q': 'x'})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.producto.nombre = 'Pizza Napolitana'
+            self.producto.save()
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/productos/autocomplete/', {'q': 'napo'})
+        self.assertEqual([s['texto'] for s in response.data], ['Pizza Napolitana'])
+
+    def test_recarga_con_cambios_de_otro_proceso(self):
+        self.client.get('/api/productos/autocomplete/', {'q': 'x'})
+        # bulk_create no emite señales: otro worker o un comando solo incrementan la versión compartida
+        Producto.objects.bulk_create([Producto(nombre='Pizza Vegetariana', precio=24000, categoria=self.categoria)])
+        self.assertEqual(self.client.get('/api/productos/autocomplete/', {'q': 'vege'}).data, [])
+        cache.incr(autocomplete.VERSION_KEY)
+        response = self.client.get('/api/productos/autocomplete/', {'q': 'vege'})
+        self.assertEqual([s['texto'] for s in response.data], ['Pizza Vegetariana'])
+
+    def test_la_recarga_no_vacia_el_indice_en_uso(self):
+        self.client.get('/api/productos/autocomplete/', {'q': 'x'})
+        anterior = autocompletado.indice
+        construir = autocompletado._construir
+        durante = []
+
+        def construir_y_buscar(*args):
+            indice = construir(*args)
+            durante.append([s.texto for s in autocompletado.indice.buscar('piz')])
+            return indice
+
+        cache.incr(autocomplete.VERSION_KEY)
+        with mock.patch.object(autocompletado, '_construir', side_effect=construir_y_buscar):
+            self.client.get('/api/productos/autocomplete/', {'q': 'x'})
+        self.assertEqual(durante, [['Pizzas', 'Pizza Hawaiana']])
+        self.assertIsNot(autocompletado.indice, anterior)
+
+    def test_calificar_no_publica_una_version(self):
+        usuario = CustomUser.objects.create_user(username='ana', email='ana@test.com', password='x')
+        self.client.force_authenticate(usuario)
+        self.client.get('/api/productos/autocomplete/', {'q': 'x'})
+        version = autocompletado.version_compartida()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/productos/{self.producto.id}/calificar/', {'calificacion': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(autocompletado.version_compartida(), version)
+        # El peso local sí se actualiza
+        self.assertEqual(autocompletado.indice.buscar('pizza h')[0].peso, -5.0)
+
+    def test_recarga_tras_el_ttl(self):
+        self.client.get('/api/productos/autocomplete/', {'q': 'x'})
+        Producto.objects.bulk_create([Producto(nombre='Pizza Vegetariana', precio=24000, categoria=self.categoria)])
+        ahora = autocompletado.cargado_en + autocomplete.TTL + 1
+        with mock.patch('productos.autocomplete.time.monotonic', return_value=ahora):
+            response = self.client.get('/api/productos/autocomplete/', {'q': 'vege'})
+        self.assertEqual([s['texto'] for s in response.data], ['Pizza Vegetariana'])
+
+
+class CacheCatalogoTests(TestCase):
+    """Cache read-through del menú público, invalidada por la versión del catálogo"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.categoria = Categoria.objects.create(nombre='Postres')
+        self.producto = Producto.objects.create(nombre='Brownie', precio=7000, categoria=self.categoria)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_segunda_peticion_sin_consultas(self):
+        for url in ['/api/productos/', '/api/productos/disponibles/', '/api/categorias/', '/api/categorias/activas/']:
+            primera = self.client.get(url, {'ordering': 'precio'})
+            self.assertEqual(primera['X-Cache'], 'MISS')
+            with self.assertNumQueries(0):
+                segunda = self.client.get(url, {'ordering': 'precio'})
+            self.assertEqual(segunda['X-Cache'], 'HIT')
+            self.assertEqual(segunda.content, primera.content)
+
+    def test_la_clave_depende_de_los_parametros(self):
+        self.client.get('/api/productos/', {'ordering': 'precio', 'page': 1})
+        response = self.client.get('/api/productos/', {'page': 1, 'ordering': 'precio'})
+        self.assertEqual(response['X-Cache'], 'HIT')
+        response = self.client.get('/api/productos/', {'ordering': '-precio'})
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_cambios_del_catalogo_invalidan(self):
+        self.client.get('/api/productos/')
+        version = version_catalogo()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.producto.precio = 8000
+            self.producto.save()
+        self.assertNotEqual(version_catalogo(), version)
+        response = self.client.get('/api/productos/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['precio'], '8000.00')
+
+        self.client.get('/api/categorias/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Categoria.objects.create(nombre='Bebidas')
+        response = self.client.get('/api/categorias/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['count'], 2)
+
+    def test_estadisticas_solo_para_administradores(self):
+        self.client.get('/api/productos/')
+        self.client.get('/api/productos/')
+        self.assertEqual(self.client.get('/api/catalogo/cache/').status_code, 401)
+
+        admin = CustomUser.objects.create_user(username='admin', email='admin@test.com', password='x', is_staff=True)
+        self.client.force_authenticate(admin)
+        response = self.client.get('/api/catalogo/cache/')
+        self.assertEqual(response.data['hits'], 1)
+        self.assertEqual(response.data['misses'], 1)
+        self.assertEqual(response.data['hit_ratio'], 0.5)
+
+
+class CacheCompartidaMixin:
+    """Cache de archivos en una carpeta temporal: el GET condicional exige una cache compartida"""
+
+    @classmethod
+    def setUpClass(cls):
+        carpeta = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        cls.enterClassContext(override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': carpeta,
+        }}))
+        super().setUpClass()
+
+
+class GetCondicionalTests(CacheCompartidaMixin, TestCase):
+    """ETag y Last-Modified en el catálogo y el detalle de producto"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.categoria = Categoria.objects.create(nombre='Combos')
+        self.producto = Producto.objects.create(nombre='Combo Familiar', precio=50000, categoria=self.categoria)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_listados_responden_304_sin_consultas(self):
+        for url in ['/api/productos/', '/api/categorias/', '/api/categorias/activas/',
+                    f'/api/categorias/{self.categoria.id}/']:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('Last-Modified', response)
+            etag = response['ETag']
+            self.assertFalse(etag.startswith('W/'))
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b'')
+
+    def test_detalle_de_producto_con_una_consulta(self):
+        url = f'/api/productos/{self.producto.id}/'
+        response = self.client.get(url)
+        self.assertEqual(
+            response['Last-Modified'],
+            http_date(self.producto.fecha_actualizacion.timestamp())
+        )
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_cambios_generan_un_etag_nuevo(self):
+        etag_listado = self.client.get('/api/productos/')['ETag']
+        etag_detalle = self.client.get(f'/api/productos/{self.producto.id}/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.producto.precio = 45000
+            self.producto.save()
+
+        response = self.client.get('/api/productos/', HTTP_IF_NONE_MATCH=etag_listado)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag_listado)
+        response = self.client.get(f'/api/productos/{self.producto.id}/', HTTP_IF_NONE_MATCH=etag_detalle)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['precio'], '45000.00')
+
+    def test_etag_distinto_por_parametros(self):
+        self.assertNotEqual(
+            self.client.get('/api/productos/', {'ordering': 'precio'})['ETag'],
+            self.client.get('/api/productos/', {'ordering': '-precio'})['ETag'],
+        )
+
+    def test_la_version_expira(self):
+        version_catalogo()
+        with mock.patch('productos.cache.cache.touch') as touch:
+            incrementar_version()
+        touch.assert_called_once_with(VERSION_KEY, VERSION_TIMEOUT)
+
+    def test_sin_cache_compartida_no_hay_get_condicional(self):
+        # Con LocMem cada proceso tiene su versión: un 304 podría ocultar cambios de otro worker
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            for url in ['/api/productos/', f'/api/productos/{self.producto.id}/']:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('ETag', response)
+                self.assertNotIn('Last-Modified', response)
+
+
+@override_settings(ROOT_URLCONF='mi_proyecto.urls_asgi')
+class VistasAsyncTests(CacheCompartidaMixin, TestCase):
+    """Modo ASGI: mismas respuestas que los ViewSets, sin pasar por ellos si hay cache"""
+    cabeceras = ('Content-Type', 'Allow', 'Vary', 'ETag', 'Last-Modified', 'X-Cache')
+
+    def setUp(self):
+        cache.clear()
+        autocompletado.invalidar()
+        self.categoria = Categoria.objects.create(nombre='Postres')
+        Producto.objects.create(nombre='Brownie', precio=7000, categoria=self.categoria)
+        Producto.objects.create(nombre='Helado de mora', precio=5000, categoria=self.categoria)
+
+    def tearDown(self):
+        cache.clear()
+        autocompletado.invalidar()
+
+    async def test_acierto_de_cache_igual_al_viewset(self):
+        for url in ['/api/productos/', '/api/productos/disponibles/', '/api/categorias/', '/api/categorias/activas/']:
+            primera = await self.async_client.get(url, {'ordering': 'precio'})
+            self.assertEqual(primera['X-Cache'], 'MISS')
+
+            with mock.patch('rest_framework.views.APIView.dispatch', side_effect=AssertionError):
+                segunda = await self.async_client.get(url, {'ordering': 'precio'})
+
+            self.assertEqual(segunda.status_code, 200)
+            self.assertEqual(segunda.content, primera.content)
+            self.assertEqual(segunda['X-Cache'], 'HIT')
+            for cabecera in self.cabeceras[:-1]:
+                self.assertEqual(segunda.get(cabecera), primera.get(cabecera), cabecera)
+
+    async def test_get_condicional_sin_viewset(self):
+        primera = await self.async_client.get('/api/productos/')
+        with mock.patch('rest_framework.views.APIView.dispatch', side_effect=AssertionError):
+            response = await self.async_client.get('/api/productos/', headers={'if-none-match': primera['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_delega_token_invalido_y_otros_formatos(self):
+        await self.async_client.get('/api/productos/')
+
+        response = await self.async_client.get('/api/productos/', headers={'authorization': 'Bearer basura'})
+        self.assertEqual(response.status_code, 401)
+
+        # La negociación de formato que no termina en JSON la resuelve el ViewSet
+        response = await self.async_client.get('/api/productos/', headers={'accept': 'application/xml'})
+        self.assertEqual(response.status_code, 406)
+
+    async def test_token_con_usuario_en_cache(self):
+        user = await CustomUser.objects.acreate_user(username='ana', email='ana@example.com', password='x')
+        headers = {'authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+        await self.async_client.get('/api/productos/', headers=headers)
+
+        with mock.patch('rest_framework.views.APIView.dispatch', side_effect=AssertionError):
+            response = await self.async_client.get('/api/productos/', headers=headers)
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    async def test_autocompletado_carga_con_orm_async(self):
+        # La primera respuesta (del ViewSet) define las cabeceras; luego se invalida el índice
+        await self.async_client.get('/api/productos/autocomplete/', {'q': 'x'})
+        autocompletado.invalidar()
+
+        with mock.patch('rest_framework.views.APIView.dispatch', side_effect=AssertionError):
+            response = await self.async_client.get('/api/productos/autocomplete/', {'q': 'hel'})
+        self.assertEqual(response.json(), [{'tipo': 'producto', 'id': response.json()[0]['id'], 'texto': 'Helado de mora'}])
+        self.assertTrue(autocompletado.cargado)
+
+
+class SerializadorRapidoTests(TestCase):
+    """El camino rápido de los listados produce los mismos bytes que ProductoSerializer"""
+
+    def setUp(self):
+        cache.clear()
+        categoria = Categoria.objects.create(nombre='Café y Postres')
+        imagenes = [
+            None, '', 'https://cdn.example.com/a.jpg', 'http://cdn.example.com/b.jpg',
+            '/media/productos/c.jpg', '/media/productos/tildes ñ.jpg', 'media/relativa.jpg',
+            '//otro.example.com/d.jpg', '/media/../e.jpg',
+        ]
+        for i, imagen in enumerate(imagenes):
+            Producto.objects.create(
+                nombre=f'Capuchino “{i}”', descripcion='Con espuma\ny canela', precio=f'{4500 + i}.5',
+                categoria=categoria, imagen=imagen, stock=i, calificacion=i / 3, disponible=i != 4,
+            )
+        # Miniaturas vigentes en una imagen y de una imagen anterior en otra
+        Producto.objects.filter(imagen='/media/productos/c.jpg').update(
+            imagen_variantes={'origen': '/media/productos/c.jpg', 'avif': [160], 'webp': [160, 320]}
+        )
+        Producto.objects.filter(imagen='/media/productos/tildes ñ.jpg').update(
+            imagen_variantes={'origen': '/media/productos/vieja.jpg', 'webp': [160]}
+        )
+
+    def comparar(self, url):
+        factory = APIRequestFactory()
+        request = Request(factory.get(url, HTTP_HOST='menu.example.com'))
+        queryset = Producto.objects.select_related('categoria').order_by('id')
+
+        esperado = JSONRenderer().render(ProductoSerializer(queryset, many=True, context={'request': request}).data)
+        rapido = ProductoSerializer.representar_filas(ProductoSerializer.filas(queryset), {'request': request})
+        self.assertEqual(JSONRenderer().render(rapido), esperado)
+
+    def test_bytes_identicos(self):
+        self.comparar('/api/productos/')
+        self.comparar('/api/productos/sub/ruta/?page=2')
+
+    @override_settings(CATALOGO_CACHE_TIMEOUT=0)
+    def test_endpoints_iguales_al_serializador(self):
+        for url, filtro in (
+            ('/api/productos/?ordering=precio', {'disponible': True}),
+            ('/api/productos/disponibles/', {'disponible': True}),
+        ):
+            response = self.client.get(url, HTTP_HOST='menu.example.com')
+            resultados = response.json()
+            resultados = resultados.get('results', resultados) if isinstance(resultados, dict) else resultados
+            queryset = Producto.objects.filter(**filtro).select_related('categoria')
+            request = Request(APIRequestFactory().get(url, HTTP_HOST='menu.example.com'))
+            esperado = ProductoSerializer(queryset, many=True, context={'request': request}).data
+            self.assertEqual(
+                sorted(resultados, key=lambda p: p['id']),
+                json.loads(JSONRenderer().render(sorted(esperado, key=lambda p: p['id']))),
+            )
+
+
+class RendererJSONTests(TestCase):
+    """JSONRapidoRenderer (orjson) escribe los mismos bytes que el JSONRenderer de DRF"""
+
+    def datos(self):
+        bogota = ZoneInfo('America/Bogota')
+        return {
+            'precio': Decimal('25000.50'),
+            'total': Decimal('0.10'),
+            'fechas': [
+                datetime(2026, 3, 1, 12, 30, tzinfo=dt_timezone.utc),
+                datetime(2026, 3, 1, 12, 30, 5, 123456, tzinfo=bogota),
+                datetime(2026, 3, 1, 12, 30),
+                date(2026, 3, 1),
+                time(8, 15, 30),
+                timedelta(hours=1, seconds=3),
+            ],
+            'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'texto': 'Café “especial” \u2028 línea \u2029 fin',
+            'mensaje': gettext_lazy('Invalid token.'),
+            'tupla': (1, 2.5, None, True),
+            3: 'clave numérica',
+            'grande': 2 ** 70,
+            'flotantes': [0.1, 1.0, 4.333333333333333, 1e-3],
+        }
+
+    def test_misma_salida_que_drf(self):
+        datos = self.datos()
+        esperado = JSONRenderer().render(datos)
+        self.assertEqual(JSONRapidoRenderer().render(datos), esperado)
+        del datos['grande']
+        self.assertEqual(JSONRapidoRenderer().render(datos), JSONRenderer().render(datos))
+
+    def test_sin_orjson_o_con_indentacion_usa_drf(self):
+        datos = self.datos()
+        with mock.patch('mi_proyecto.renderers.orjson', None):
+            self.assertEqual(JSONRapidoRenderer().render(datos), JSONRenderer().render(datos))
+        self.assertEqual(
+            JSONRapidoRenderer().render(datos, 'application/json; indent=4'),
+            JSONRenderer().render(datos, 'application/json; indent=4'),
+        )
+        self.assertEqual(JSONRapidoRenderer().render(None), b'')
+
+    @override_settings(CATALOGO_CACHE_TIMEOUT=0)
+    def test_respuestas_de_la_api(self):
+        categoria = Categoria.objects.create(nombre='Bebidas')
+        Producto.objects.create(nombre='Limonada', precio='4500.00', categoria=categoria)
+        for url in ('/api/productos/', '/api/categorias/', '/api/productos/disponibles/'):
+            response = self.client.get(url)
+            self.assertIsInstance(response.accepted_renderer, JSONRapidoRenderer)
+            self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+
+class CatalogoImportExportTests(TestCase):
+    """catalogo_import / catalogo_export: upsert por lotes y archivos que se pueden volver a cargar"""
+
+    def setUp(self):
+        cache.clear()
+        autocompletado.invalidar()
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+
+    def tearDown(self):
+        autocompletado.invalidar()
+
+    def archivo(self, nombre, contenido):
+        ruta = os.path.join(self.directorio.name, nombre)
+        with open(ruta, 'w', encoding='utf-8', newline='') as archivo:
+            archivo.write(contenido)
+        return ruta
+
+    def importar(self, ruta, *args):
+        salida, errores = StringIO(), StringIO()
+        call_command('catalogo_import', ruta, *args, stdout=salida, stderr=errores)
+        return salida.getvalue(), errores.getvalue()
+
+    def cargar_datos_iniciales(self):
+        self.importar('productos/datos/categorias.csv', '--tipo', 'categorias')
+        self.importar('productos/datos/productos.csv')
+
+    def test_datos_iniciales(self):
+        self.cargar_datos_iniciales()
+        self.assertEqual(Categoria.objects.count(), 7)
+        producto = Producto.objects.get(codigo='PIZ-HAWAIANA')
+        self.assertEqual(producto.categoria.nombre, 'Pizza')
+        self.assertEqual(producto.precio, Decimal('25000.00'))
+
+        # Volver a cargar los mismos archivos no duplica nada
+        self.cargar_datos_iniciales()
+        self.assertEqual(Producto.objects.count(), 3)
+
+    def test_upsert_por_codigo_en_un_insert_por_lote(self):
+        self.cargar_datos_iniciales()
+        original = Producto.objects.get(codigo='HAM-SENCILLA')
+        Producto.objects.filter(pk=original.pk).update(calificacion=4.5, calificaciones_total=2, calificaciones_suma=9)
+        ruta = self.archivo('productos.csv', (
+            'codigo,nombre,precio,categoria,stock,disponible\n'
+            'HAM-SENCILLA,Hamburguesa Sencilla XL,21000,hamburguesas,80,no\n'
+            'NUEVO-1,Malteada,9000,Postres,5,sí\n'
+            'NUEVO-2,Limonada,4500.5,Bebidas,,\n'
+            'NUEVO-3,Aros de cebolla,7000,Acompañantes,10,1\n'
+            'MALO-1,Sin categoría,1000,Ensaladas,1,1\n'
+            'MALO-2,Precio inválido,gratis,Bebidas,1,1\n'
+            'MALO-3,Stock negativo,1000,Bebidas,-1,1\n'
+        ))
+
+        sentencias = []
+
+        def registrar(execute, sql, params, many, context):
+            sentencias.append(sql)
+            return execute(sql, params, many, context)
+
+        # El comando vacía connection.queries en cada lote: CaptureQueriesContext no sirve aquí
+        with connection.execute_wrapper(registrar):
+            salida, errores = self.importar(ruta, '--lote', '3')
+        inserts = [sql for sql in sentencias if sql.startswith('INSERT INTO "productos_producto"')]
+        self.assertEqual(len(inserts), 2)
+        self.assertIn('ON CONFLICT', inserts[0])
+        self.assertIn('importados: 4, rechazados: 3', salida)
+        self.assertIn('filas/s', salida)
+        self.assertIn("Línea 6: La categoría 'Ensaladas' no existe", errores)
+        self.assertIn("Línea 7: 'precio' debe ser un número", errores)
+        self.assertIn("Línea 8: 'stock' no puede ser negativo", errores)
+
+        actualizado = Producto.objects.get(codigo='HAM-SENCILLA')
+        self.assertEqual(actualizado.pk, original.pk)
+        self.assertEqual(actualizado.fecha_creacion, original.fecha_creacion)
+        self.assertEqual((actualizado.nombre, actualizado.precio, actualizado.stock), ('Hamburguesa Sencilla XL', 21000, 80))
+        self.assertFalse(actualizado.disponible)
+        self.assertEqual((actualizado.calificacion, actualizado.calificaciones_total), (4.5, 2))
+        self.assertGreater(actualizado.fecha_actualizacion, original.fecha_actualizacion)
+        self.assertEqual(Producto.objects.get(codigo='NUEVO-2').precio, Decimal('4500.50'))
+        self.assertEqual(Producto.objects.count(), 6)
+
+    def test_actualiza_busqueda_autocompletado_y_cache(self):
+        self.cargar_datos_iniciales()
+        self.client.get('/api/productos/autocomplete/', {'q': 'x'})
+        version = version_catalogo()
+        ruta = self.archivo('nuevos.jsonl', (
+            '{"codigo": "SAL-1", "nombre": "Salchipapa Especial", "precio": "15000", "categoria": "Combos"}\n'
+            '\n'
+            '["no", "es", "un", "objeto"]\n'
+        ))
+        salida, errores = self.importar(ruta)
+        self.assertIn('importados: 1, rechazados: 1', salida)
+        self.assertIn('Línea 3: Cada línea debe ser un objeto JSON', errores)
+
+        self.assertGreater(version_catalogo(), version)
+        response = self.client.get('/api/productos/autocomplete/', {'q': 'salchi'})
+        self.assertEqual([s['texto'] for s in response.data], ['Salchipapa Especial'])
+        with override_settings(CATALOGO_CACHE_TIMEOUT=0):
+            response = self.client.get('/api/productos/', {'search': 'salchipapa'})
+        self.assertEqual([p['nombre'] for p in response.data['results']], ['Salchipapa Especial'])
+
+    def test_invalida_el_autocompletado_de_otro_proceso(self):
+        self.cargar_datos_iniciales()
+        # El índice del servidor en marcha: el comando solo le llega por la cache compartida
+        servidor = Autocompletado()
+        servidor.buscar('x')
+        ruta = self.archivo('nuevos.csv', 'codigo,nombre,precio,categoria\nSAL-1,Salchipapa Especial,15000,Combos\n')
+        _, errores = self.importar(ruta)
+        self.assertEqual([s.texto for s in servidor.buscar('salchi')], ['Salchipapa Especial'])
+        # Los tests usan LocMem, que en producción no llegaría al servidor: el comando lo advierte
+        self.assertIn('CACHE_BACKEND=locmem', errores)
+
+    def test_crear_categorias_y_columnas_faltantes(self):
+        ruta = self.archivo('p.csv', 'codigo,nombre,precio,categoria\nE-1,Ensalada César,12000,Ensaladas\n')
+        self.importar(ruta, '--crear-categorias')
+        self.assertEqual(Producto.objects.get(codigo='E-1').categoria.nombre, 'Ensaladas')
+
+        with self.assertRaisesMessage(CommandError, 'Faltan columnas en el archivo: codigo, precio'):
+            self.importar(self.archivo('malo.csv', 'nombre,categoria\nX,Ensaladas\n'))
+        with self.assertRaisesMessage(CommandError, 'No se reconoce el formato'):
+            self.importar(self.archivo('datos.txt', ''))
+
+    def test_exportar_y_volver_a_importar(self):
+        self.cargar_datos_iniciales()
+        Producto.objects.filter(codigo='PER-COMBO').update(descripcion='Con “comillas”, comas\ny saltos')
+        esperado = list(Producto.objects.order_by('id').values_list(
+            'codigo', 'nombre', 'descripcion', 'precio', 'categoria__nombre', 'imagen', 'disponible', 'stock'
+        ))
+
+        for formato in ('csv', 'jsonl'):
+            ruta = os.path.join(self.directorio.name, f'exportado.{formato}')
+            salida = StringIO()
+            call_command('catalogo_export', ruta, '--lote', '2', stdout=salida)
+            self.assertIn('Productos exportados: 3', salida.getvalue())
+
+            Producto.objects.all().delete()
+            self.importar(ruta)
+            self.assertEqual(list(Producto.objects.order_by('id').values_list(
+                'codigo', 'nombre', 'descripcion', 'precio', 'categoria__nombre', 'imagen', 'disponible', 'stock'
+            )), [fila[:5] + (fila[5] or None,) + fila[6:] for fila in esperado])
+
+        salida = StringIO()
+        call_command('catalogo_export', '-', '--tipo', 'categorias', '--formato', 'jsonl', stdout=salida, stderr=StringIO())
+        lineas = salida.getvalue().splitlines()
+        self.assertEqual(len(lineas), 7)
+        self.assertEqual(json.loads(lineas[0]), {
+            'nombre': 'Bebidas', 'icono': '🥤', 'descripcion': 'Bebidas frías y calientes', 'activa': True
+        })
+
+
+class AjusteStockTests(TestCase):
+    """Ajustes de stock con UPDATE atómicos (individual y por lote)"""
+
+    def setUp(self):
+        self.client = APIClient()
+        admin = CustomUser.objects.create_user(username='admin', email='admin@test.com', password='x', is_staff=True)
+        self.client.force_authenticate(admin)
+        categoria = Categoria.objects.create(nombre='Bebidas')
+        self.gaseosa = Producto.objects.create(nombre='Gaseosa', precio=3000, stock=10, categoria=categoria)
+        self.jugo = Producto.objects.create(nombre='Jugo', precio=4000, stock=5, categoria=categoria)
+
+    def test_actualizar_stock_no_baja_de_cero(self):
+        url = f'/api/productos/{self.gaseosa.id}/actualizar_stock/'
+        response = self.client.post(url, {'cantidad': 5})
+        self.assertEqual(response.data['stock'], 15)
+        response = self.client.post(url, {'cantidad': -100})
+        self.assertEqual(response.data, {'mensaje': 'Stock actualizado a 0', 'stock': 0})
+        self.assertEqual(self.client.post(url, {'cantidad': 'x'}).status_code, 400)
+
+    def test_actualizar_stock_solo_escribe_el_stock(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(f'/api/productos/{self.gaseosa.id}/actualizar_stock/', {'cantidad': 1})
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"nombre"', updates[0])
+
+    def test_lote_en_un_solo_update(self):
+        ajustes = [
+            {'producto': self.gaseosa.id, 'cantidad': -4},
+            {'producto': self.jugo.id, 'cantidad': 3},
+            {'producto': self.gaseosa.id, 'cantidad': -1},
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/api/productos/ajustar_stock/', {'ajustes': ajustes}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['stock'], [
+            {'producto': self.gaseosa.id, 'stock': 5},
+            {'producto': self.jugo.id, 'stock': 8},
+        ])
+        self.assertEqual(sum(q['sql'].startswith('UPDATE') for q in ctx.captured_queries), 1)
+
+    def test_lote_es_todo_o_nada(self):
+        ajustes = [
+            {'producto': self.gaseosa.id, 'cantidad': -4},
+            {'producto': self.jugo.id, 'cantidad': -6},
+        ]
+        response = self.client.post('/api/productos/ajustar_stock/', {'ajustes': ajustes}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['productos'], [self.jugo.id])
+        self.gaseosa.refresh_from_db()
+        self.assertEqual(self.gaseosa.stock, 10)
+
+        ajustes = [{'producto': 999999, 'cantidad': 1}]
+        response = self.client.post('/api/productos/ajustar_stock/', {'ajustes': ajustes}, format='json')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post('/api/productos/ajustar_stock/', {'ajustes': 'x'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_lote_solo_para_administradores(self):
+        self.client.force_authenticate(None)
+        response = self.client.post('/api/productos/ajustar_stock/', {'ajustes': []}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+
+class CalificacionTests(TestCase):
+    """Un voto por usuario; suma, total y promedio se mantienen en Producto"""
+
+    def setUp(self):
+        cache.clear()
+        autocompletado.invalidar()
+        self.client = APIClient()
+        self.ana = CustomUser.objects.create_user(username='ana', email='ana@test.com', password='x')
+        self.luis = CustomUser.objects.create_user(username='luis', email='luis@test.com', password='x')
+        categoria = Categoria.objects.create(nombre='Hamburguesas')
+        self.producto = Producto.objects.create(nombre='Hamburguesa Doble', precio=18000, categoria=categoria)
+        self.url = f'/api/productos/{self.producto.id}/calificar/'
+
+    def tearDown(self):
+        autocompletado.invalidar()
+
+    def calificar(self, usuario, valor):
+        self.client.force_authenticate(usuario)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(self.url, {'calificacion': valor})
+
+    def test_promedio_de_votos_y_revoto_en_su_lugar(self):
+        self.assertEqual(self.calificar(self.ana, 5).data['calificacion'], 5)
+        response = self.calificar(self.luis, 2)
+        self.assertEqual(response.data['calificacion'], 3.5)
+        self.assertEqual(response.data['calificaciones_total'], 2)
+
+        # Ana cambia su voto: no cuenta dos veces
+        response = self.calificar(self.ana, 3)
+        self.assertEqual(response.data['calificacion'], 2.5)
+        self.assertEqual(response.data['calificaciones_total'], 2)
+        self.assertEqual(Calificacion.objects.count(), 2)
+
+        self.producto.refresh_from_db()
+        self.assertEqual((self.producto.calificaciones_suma, self.producto.calificaciones_total), (5, 2))
+
+    def test_voto_sin_reescribir_el_producto(self):
+        self.calificar(self.ana, 4)
+        with CaptureQueriesContext(connection) as ctx:
+            self.calificar(self.ana, 5)
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "productos_producto"')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"nombre"', updates[0])
+        self.assertIn('"calificaciones_suma" = ("productos_producto"."calificaciones_suma"', updates[0])
+
+    def test_actualiza_cache_y_autocompletado(self):
+        otro = Producto.objects.create(nombre='Hamburguesa Sencilla', precio=12000, categoria=self.producto.categoria)
+        self.client.get('/api/productos/autocomplete/', {'q': 'x'})
+        version = version_catalogo()
+
+        self.calificar(self.ana, 1)
+        self.calificar(self.luis, 5)
+        self.client.force_authenticate(self.luis)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/productos/{otro.id}/calificar/', {'calificacion': 4})
+
+        self.assertGreater(version_catalogo(), version)
+        response = self.client.get('/api/productos/autocomplete/', {'q': 'hamb'})
+        self.assertEqual([s['id'] for s in response.data if s['tipo'] == 'producto'], [otro.id, self.producto.id])
+
+    def test_validacion_y_autenticacion(self):
+        self.assertEqual(self.client.post(self.url, {'calificacion': 4}).status_code, 401)
+        for valor in (0, 6, 'x', ''):
+            self.assertEqual(self.calificar(self.ana, valor).status_code, 400)
+        self.assertFalse(Calificacion.objects.exists())
+
+    def test_recalcular_repara_los_agregados(self):
+        self.calificar(self.ana, 5)
+        self.calificar(self.luis, 2)
+        # Borrar un usuario elimina su voto sin pasar por calificar()
+        self.luis.delete()
+        sin_votos = Producto.objects.create(nombre='Malteada', precio=9000, categoria=self.producto.categoria)
+        Producto.objects.filter(pk=sin_votos.pk).update(calificaciones_total=3, calificaciones_suma=12, calificacion=4)
+
+        salida = StringIO()
+        call_command('recalcular_calificaciones', '--lote', '1', stdout=salida)
+        self.assertIn('2 productos corregidos', salida.getvalue())
+
+        self.assertEqual(
+            list(Producto.objects.order_by('id').values_list('calificaciones_suma', 'calificaciones_total', 'calificacion')),
+            [(5, 1, 5), (0, 0, 0)],
+        )
+
+
+class StockConcurrenteTests(TransactionTestCase):
+    """Muchos hilos descontando el mismo producto: no se pierden ni sobran unidades"""
+
+    def test_descuentos_concurrentes(self):
+        categoria = Categoria.objects.create(nombre='Hamburguesas')
+        producto = Producto.objects.create(nombre='Sencilla', precio=20000, stock=150, categoria=categoria)
+        exitos, errores = [], []
+
+        def descontar():
+            try:
+                for _ in range(10):
+                    for _intento in range(50):
+                        try:
+                            Producto.objects.ajustar_stock_lote({producto.id: -1})
+                            exitos.append(1)
+                        except StockInsuficiente:
+                            pass
+                        except OperationalError:
+                            continue  # SQLite: base bloqueada por otro hilo, reintentar
+                        break
+            except Exception as e:  # pragma: no cover - se reporta abajo
+                errores.append(e)
+            finally:
+                close_old_connections()
+
+        hilos = [threading.Thread(target=descontar) for _ in range(20)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+        producto.refresh_from_db()
+        self.assertEqual(len(exitos), 150)
+        self.assertEqual(producto.stock, 0)
+
+
+def imagen_de_prueba(ancho, alto, formato='PNG', **opciones):
+    contenido = BytesIO()
+    modo = 'RGBA' if formato == 'PNG' else 'RGB'
+    Image.new(modo, (ancho, alto), (200, 80, 20, 255)[:len(modo)]).save(contenido, formato, **opciones)
+    return contenido.getvalue()
+
+
+@override_settings(CATALOGO_CACHE_TIMEOUT=0, IMAGENES_PROCESOS=0, IMAGENES_ANCHOS=[160, 320, 640])
+class ImagenesProductoTests(TestCase):
+    """Imágenes guardadas en MEDIA_ROOT con miniaturas WebP/AVIF expuestas como srcset"""
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        media = override_settings(MEDIA_ROOT=directorio.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.media = directorio.name
+
+        # Un host con dominio: la validación de URL rechaza 'testserver' al reenviar la imagen
+        self.client = APIClient(HTTP_HOST='menu.example.com')
+        self.client.force_authenticate(
+            CustomUser.objects.create_user(username='admin', email='admin@test.com', is_staff=True)
+        )
+        self.categoria = Categoria.objects.create(nombre='Hamburguesas')
+        self.producto = Producto.objects.create(nombre='Doble carne', precio=20000, categoria=self.categoria)
+
+    def subir(self, contenido, nombre='foto.png', producto=None):
+        archivo = BytesIO(contenido)
+        archivo.name = nombre
+        return self.client.post(
+            f'/api/admin/productos/{(producto or self.producto).pk}/imagen/', {'imagen': archivo}, format='multipart'
+        )
+
+    def archivo_media(self, url):
+        return os.path.join(self.media, *url.split('/media/', 1)[1].split('/'))
+
+    def test_subida_guarda_original_y_miniaturas(self):
+        version = version_catalogo()
+        response = self.subir(imagen_de_prueba(800, 400))
+        self.assertEqual(response.status_code, 200)
+
+        producto = Producto.objects.get(pk=self.producto.pk)
+        self.assertRegex(producto.imagen, r'^/media/productos/[0-9a-f]{32}/original\.png$')
+        self.assertEqual(response.data['imagen'], 'http://menu.example.com' + producto.imagen)
+        self.assertGreater(version_catalogo(), version)
+
+        carpeta = 'http://menu.example.com' + producto.imagen.rsplit('/', 1)[0]
+        formatos = miniaturas.formatos_disponibles(['avif', 'webp'])
+        self.assertIn('webp', formatos)
+        self.assertEqual(response.data['imagen_srcset'], {
+            formato: f'{carpeta}/160.{formato} 160w, {carpeta}/320.{formato} 320w, {carpeta}/640.{formato} 640w'
+            for formato in formatos
+        })
+        for formato in formatos:
+            with Image.open(self.archivo_media(f'{carpeta}/320.{formato}')) as miniatura:
+                self.assertEqual((miniatura.format, miniatura.size), (formato.upper(), (320, 160)))
+
+        # El listado público (camino rápido desde .values()) expone lo mismo
+        listado = self.client.get('/api/productos/').data['results']
+        self.assertEqual(listado[0]['imagen_srcset'], response.data['imagen_srcset'])
+
+    def test_misma_foto_no_se_duplica_y_no_se_amplia(self):
+        contenido = imagen_de_prueba(100, 50, 'JPEG')
+        otro = Producto.objects.create(nombre='Sencilla', precio=15000, categoria=self.categoria)
+        primera = self.subir(contenido, 'a.jpg').data
+        segunda = self.subir(contenido, 'b.jpg', producto=otro).data
+        self.assertEqual(primera['imagen'], segunda['imagen'])
+        self.assertTrue(primera['imagen'].endswith('/original.jpg'))
+        self.assertEqual(primera['imagen_srcset']['webp'].rsplit(' ', 1)[1], '100w')
+
+    def test_archivos_invalidos(self):
+        response = self.subir(b'no es una imagen', 'foto.png')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'El archivo no es una imagen válida')
+        with override_settings(IMAGENES_TAMANO_MAXIMO=100):
+            response = self.subir(imagen_de_prueba(800, 400))
+        self.assertEqual(response.data['error'], 'La imagen supera el tamaño máximo permitido')
+        self.assertEqual(self.client.post(f'/api/admin/productos/{self.producto.pk}/imagen/').status_code, 400)
+        self.assertIsNone(Producto.objects.get(pk=self.producto.pk).imagen)
+
+    def test_reenviar_el_producto_conserva_la_imagen_local(self):
+        datos = self.subir(imagen_de_prueba(400, 400)).data
+        datos.pop('imagen_srcset')
+        response = self.client.put(f'/api/admin/productos/{self.producto.pk}/', datos, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Producto.objects.get(pk=self.producto.pk).imagen.startswith('/media/productos/'))
+        self.assertIn('webp', response.data['imagen_srcset'])
+
+        # Otra imagen: las miniaturas guardadas ya no corresponden y no se exponen
+        datos['imagen'] = 'https://cdn.example.com/otra.jpg'
+        response = self.client.put(f'/api/admin/productos/{self.producto.pk}/', datos, format='json')
+        self.assertEqual(response.data['imagen_srcset'], {})
+
+    def test_la_ruta_local_pasa_la_validacion_del_modelo(self):
+        # El admin de Django valida con full_clean(): la ruta de MEDIA_URL no es una URL
+        self.subir(imagen_de_prueba(400, 400))
+        producto = Producto.objects.get(pk=self.producto.pk)
+        self.assertTrue(producto.imagen.startswith('/media/productos/'))
+        producto.full_clean()
+        for imagen in ('/media/productos/../x.png', 'no es una url'):
+            producto.imagen = imagen
+            with self.assertRaises(ValidationError):
+                producto.full_clean()
+
+    def test_rutas_media_no_canonicas(self):
+        datos = self.subir(imagen_de_prueba(400, 400)).data
+        datos.pop('imagen_srcset')
+        datos['imagen'] = 'http://menu.example.com/media/productos/../../settings.py'
+        response = self.client.put(f'/api/admin/productos/{self.producto.pk}/', datos, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('imagen', response.data)
+
+        # Las que ya estén guardadas (p. ej. de un import) no se leen ni rompen el comando
+        for imagen in ('/media/productos/../..', '/media/productos/../../../etc/passwd', '/media/productos//x.png'):
+            self.assertIsNone(imagenes.ruta_local(imagen))
+        Producto.objects.create(nombre='Rara', precio=1000, categoria=self.categoria, imagen='/media/productos/../..')
+        salida = StringIO()
+        call_command('procesar_imagenes', '--procesos', '1', stdout=salida)
+        self.assertIn('Imágenes descargadas: 0, con miniaturas: 0, con error: 0', salida.getvalue())
+
+    def test_orientacion_exif(self):
+        exif = Image.Exif()
+        exif[miniaturas.ORIENTACION] = 6
+        imagen = self.archivo_media(imagenes.guardar_original(imagen_de_prueba(1200, 600, 'JPEG', exif=exif)))
+        variantes = miniaturas.generar_variantes(imagen, [160, 320, 640, 1280], ['webp'])
+        # Girada 90°: 600 de ancho final, así que no hay variante de 640 ni de 1280
+        self.assertEqual(variantes, {'webp': [160, 320]})
+        with Image.open(os.path.join(os.path.dirname(imagen), '320.webp')) as miniatura:
+            self.assertEqual(miniatura.size, (320, 640))
+
+    def test_comando_descarga_y_procesa_en_el_pool(self):
+        externa = Producto.objects.create(
+            nombre='Externa', precio=1000, categoria=self.categoria, imagen='https://cdn.example.com/x.png'
+        )
+        rota = Producto.objects.create(
+            nombre='Rota', precio=1000, categoria=self.categoria, imagen='https://cdn.example.com/404.png'
+        )
+        contenido = imagen_de_prueba(500, 250)
+
+        def urlopen(peticion, timeout):
+            if peticion.full_url.endswith('404.png'):
+                raise OSError('HTTP Error 404')
+            return BytesIO(contenido)
+
+        salida, errores = StringIO(), StringIO()
+        with mock.patch('productos.imagenes.urlopen', side_effect=urlopen):
+            call_command('procesar_imagenes', '--descargar', '--procesos', '2', stdout=salida, stderr=errores)
+        self.assertIn('Imágenes descargadas: 1, con miniaturas: 1, con error: 1', salida.getvalue())
+        self.assertIn('https://cdn.example.com/404.png: No se pudo descargar', errores.getvalue())
+
+        externa.refresh_from_db()
+        self.assertTrue(externa.imagen.startswith('/media/productos/'))
+        self.assertEqual(externa.imagen_variantes['origen'], externa.imagen)
+        self.assertEqual(externa.imagen_variantes['webp'], [160, 320])
+        self.assertTrue(os.path.exists(self.archivo_media(externa.imagen.replace('original.png', '320.webp'))))
+        self.assertEqual(Producto.objects.get(pk=rota.pk).imagen, 'https://cdn.example.com/404.png')
+
+        # Ya están al día: una segunda pasada no hace nada
+        call_command('procesar_imagenes', '--procesos', '1', stdout=salida)
+        self.assertIn('Imágenes descargadas: 0, con miniaturas: 0, con error: 0', salida.getvalue())
+
+
+class ServidorArchivosTests(TestCase):
+    """WhiteNoiseAsyncMiddleware: build de Vite precomprimido, imágenes de productos y rutas del SPA"""
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.dist = os.path.join(directorio.name, 'dist')
+        self.media = os.path.join(directorio.name, 'media')
+        os.makedirs(os.path.join(self.dist, 'assets'))
+        os.makedirs(self.media)
+        self.escribir('index.html', '<!doctype html><script type="module" src="/assets/index-Ab1_cD2e.js"></script>')
+        self.escribir('assets/index-Ab1_cD2e.js', 'console.log("menú");' * 500)
+        self.escribir('favicon.svg', '<svg></svg>')
+        for ruta in ('index.html', 'assets/index-Ab1_cD2e.js'):
+            list(Compressor(quiet=True).compress(os.path.join(self.dist, ruta)))
+
+        ajustes = override_settings(
+            SERVIR_FRONTEND=True, WHITENOISE_ROOT=self.dist, MEDIA_ROOT=self.media, WHITENOISE_AUTOREFRESH=False,
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def escribir(self, nombre, contenido):
+        with open(os.path.join(self.dist, nombre), 'w', encoding='utf-8') as archivo:
+            archivo.write(contenido)
+
+    def test_assets_con_hash_precomprimidos_e_inmutables(self):
+        response = self.client.get('/assets/index-Ab1_cD2e.js', headers={'accept-encoding': 'gzip, br'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertLess(int(response['Content-Length']), 500)
+
+        response = self.client.get('/favicon.svg')
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_index_y_rutas_del_spa(self):
+        for url in ('/', '/buscar', '/register-success'):
+            response = self.client.get(url, headers={'accept': 'text/html,*/*'})
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual(response['Cache-Control'], 'no-cache')
+            self.assertIn(b'index-Ab1_cD2e.js', b''.join(response.streaming_content))
+
+        # La API y los clientes que no piden HTML conservan su 404
+        self.assertEqual(self.client.get('/api/no-existe/', headers={'accept': 'text/html'}).status_code, 404)
+        self.assertEqual(self.client.get('/buscar', headers={'accept': 'application/json'}).status_code, 404)
+        with override_settings(SERVIR_FRONTEND=False):
+            self.assertEqual(APIClient().get('/buscar', headers={'accept': 'text/html'}).status_code, 404)
+
+    async def test_rutas_del_spa_en_la_cadena_async(self):
+        response = await self.async_client.get('/buscar', headers={'accept': 'text/html'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+    async def test_media_en_la_cadena_async_busca_en_disco_en_un_hilo(self):
+        url = imagenes.guardar_original(imagen_de_prueba(40, 20))
+        bucle = threading.get_ident()
+        hilos = []
+        isfile = os.path.isfile
+
+        def isfile_registrado(ruta):
+            hilos.append(threading.get_ident())
+            return isfile(ruta)
+
+        with mock.patch('mi_proyecto.middleware.os.path.isfile', side_effect=isfile_registrado):
+            self.assertEqual((await self.async_client.get('/media/productos/x.png')).status_code, 404)
+            self.assertEqual((await self.async_client.get(url)).status_code, 200)
+            # Ya recordada: ni disco ni hilo
+            self.assertEqual((await self.async_client.get(url)).status_code, 200)
+        self.assertEqual(len(hilos), 2)
+        self.assertNotIn(bucle, hilos)
+
+    def test_imagenes_de_productos_generadas_en_caliente(self):
+        # El archivo aparece después de arrancar el middleware, como una miniatura recién generada
+        self.assertEqual(self.client.get('/media/productos/x.png').status_code, 404)
+        url = imagenes.guardar_original(imagen_de_prueba(40, 20))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('immutable', response['Cache-Control'])
+
+        # La segunda vez la URL ya está en el diccionario de WhiteNoise: no se vuelve al disco
+        with mock.patch('mi_proyecto.middleware.os.path.isfile', side_effect=AssertionError):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+        with open(os.path.join(self.media, 'suelta.png'), 'wb') as archivo:
+            archivo.write(imagen_de_prueba(10, 10))
+        self.assertNotIn('immutable', self.client.get('/media/suelta.png')['Cache-Control'])
+        self.assertEqual(self.client.get('/media/../dist/index.html').status_code, 404)
@@ -1,11 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CategoriaViewSet, ProductoViewSet
+from .views import CategoriaViewSet, ProductoViewSet, CacheCatalogoView
 
 router = DefaultRouter()
 router.register(r'categorias', CategoriaViewSet, basename='categoria')
 router.register(r'productos', ProductoViewSet, basename='producto')
 
 urlpatterns = [
+    path('catalogo/cache/', CacheCatalogoView.as_view(), name='catalogo-cache'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
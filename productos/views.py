@@ -1,9 +1,38 @@
 from rest_framework import viewsets, filters, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Categoria, Producto
-from .serializers import CategoriaSerializer, ProductoSerializer
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from .models import Categoria, Producto, StockInsuficiente
+from .serializers import AjusteStockSerializer, CategoriaSerializer, ProductoSerializer
+from .pagination import ProductoPagination
+from .search import BusquedaProductoFilter
+from .autocomplete import autocompletado
+from .cache import (
+    cache_catalogo, estadisticas, etag_catalogo, etag_producto, incrementar_version,
+    ultima_modificacion, ultima_modificacion_producto,
+)
+
+
+# GET condicional: con un If-None-Match vigente se responde 304 sin serializar nada
+condicion_catalogo = method_decorator(condition(etag_func=etag_catalogo, last_modified_func=ultima_modificacion))
+condicion_producto = method_decorator(
+    condition(etag_func=etag_producto, last_modified_func=ultima_modificacion_producto)
+)
+
+
+def datos_autocompletado(query_params):
+    """Cuerpo de la respuesta de /productos/autocomplete/ (también lo usa la vista async)"""
+    try:
+        limite = min(max(int(query_params.get('limit', 8)), 1), 20)
+    except ValueError:
+        limite = 8
+    sugerencias = autocompletado.buscar(query_params.get('q', ''), limite)
+    return [{'tipo': s.tipo, 'id': s.id, 'texto': s.texto} for s in sugerencias]
 
 
 class IsAdminOrReadOnly(permissions.BasePermission):
@@ -20,10 +49,28 @@ class CategoriaViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.SearchFilter]
     search_fields = ['nombre', 'descripcion']
 
+    def get_queryset(self):
+        """Anota los conteos de productos en la misma consulta del listado"""
+        return Categoria.objects.annotate(
+            num_productos=Count('productos'),
+            num_disponibles=Count('productos', filter=Q(productos__disponible=True)),
+        ).order_by('nombre')  # Meta.ordering no se aplica a consultas con GROUP BY
+
+    @condicion_catalogo
+    @cache_catalogo
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @condicion_catalogo
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     @action(detail=False, methods=['get'])
+    @condicion_catalogo
+    @cache_catalogo
     def activas(self, request):
         """Obtiene solo las categorías activas"""
-        activas = Categoria.objects.filter(activa=True)
+        activas = self.get_queryset().filter(activa=True)
         serializer = self.get_serializer(activas, many=True)
         return Response(serializer.data)
 
@@ -32,48 +79,121 @@ class ProductoViewSet(viewsets.ModelViewSet):
     queryset = Producto.objects.filter(disponible=True).select_related('categoria')
     serializer_class = ProductoSerializer
     permission_classes = [IsAdminOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = ProductoPagination
+    # BusquedaProductoFilter (texto completo) va al final para poder ordenar por relevancia
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, BusquedaProductoFilter]
     filterset_fields = ['categoria', 'disponible', 'precio']
-    search_fields = ['nombre', 'descripcion']
     ordering_fields = ['precio', 'calificacion', 'fecha_creacion']
     ordering = ['-fecha_creacion']
+    max_ajustes_stock = 1000
+
+    def representar_lista(self, queryset):
+        """Listados de solo lectura por el camino rápido de ProductoSerializer (desde .values())"""
+        return ProductoSerializer.representar_filas(queryset, self.get_serializer_context())
+
+    @condicion_catalogo
+    @cache_catalogo
+    def list(self, request, *args, **kwargs):
+        queryset = ProductoSerializer.filas(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.representar_lista(page))
+        return Response(self.representar_lista(queryset))
+
+    @condicion_producto
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     @action(detail=False, methods=['get'])
+    @condicion_catalogo
+    @cache_catalogo
     def disponibles(self, request):
         """Obtiene solo productos disponibles"""
-        disponibles = self.queryset.filter(disponible=True)
-        serializer = self.get_serializer(disponibles, many=True)
-        return Response(serializer.data)
+        disponibles = ProductoSerializer.filas(self.queryset.filter(disponible=True))
+        return Response(self.representar_lista(disponibles))
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """Sugerencias de productos y categorías por prefijo, desde el índice en memoria"""
+        return Response(datos_autocompletado(request.query_params))
 
     @action(detail=True, methods=['post'])
     def actualizar_stock(self, request, pk=None):
-        """Actualiza el stock de un producto"""
+        """Actualiza el stock de un producto (nunca queda por debajo de cero)"""
         if not request.user.is_staff:
             return Response(
                 {'error': 'No tienes permisos'},
                 status=status.HTTP_403_FORBIDDEN
             )
-        
-        producto = self.get_object()
-        cantidad = request.data.get('cantidad', 0)
-        
+
         try:
-            cantidad = int(cantidad)
-            producto.stock = max(0, producto.stock + cantidad)
-            producto.save()
-            return Response({
-                'mensaje': f'Stock actualizado a {producto.stock}',
-                'stock': producto.stock
-            })
+            cantidad = int(request.data.get('cantidad', 0))
         except (ValueError, TypeError):
             return Response(
                 {'error': 'Cantidad debe ser un número'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # UPDATE atómico en la base de datos: sin carreras entre pedidos concurrentes
+        stock = self.get_queryset().ajustar_stock(pk, cantidad)
+        if stock is None:
+            return Response({'detail': 'No encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+        transaction.on_commit(incrementar_version)
+        return Response({
+            'mensaje': f'Stock actualizado a {stock}',
+            'stock': stock
+        })
+
+    @action(detail=False, methods=['post'])
+    def ajustar_stock(self, request):
+        """
+        Ajusta el stock de varios productos en una sola transacción.
+        Body: {"ajustes": [{"producto": 1, "cantidad": -2}, ...]}. Es todo o nada.
+        """
+        if not request.user.is_staff:
+            return Response(
+                {'error': 'No tienes permisos'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        serializer = AjusteStockSerializer(data=request.data.get('ajustes'), many=True)
+        if not serializer.is_valid():
+            return Response(
+                {'error': 'Ajustes inválidos', 'detalle': serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(serializer.validated_data) > self.max_ajustes_stock:
+            return Response(
+                {'error': f'Máximo {self.max_ajustes_stock} ajustes por petición'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        ajustes = {}
+        for ajuste in serializer.validated_data:
+            ajustes[ajuste['producto']] = ajustes.get(ajuste['producto'], 0) + ajuste['cantidad']
+
+        try:
+            stocks = Producto.objects.ajustar_stock_lote(ajustes)
+        except Producto.DoesNotExist as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        except StockInsuficiente as e:
+            return Response(
+                {'error': 'Stock insuficiente', 'productos': e.productos},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        transaction.on_commit(incrementar_version)
+        return Response({
+            'mensaje': f'Stock actualizado para {len(stocks)} productos',
+            'stock': [{'producto': pk, 'stock': stock} for pk, stock in sorted(stocks.items())]
+        })
+
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def calificar(self, request, pk=None):
-        """Permite a usuarios calificar un producto (1-5 estrellas)"""
+        """
+        Permite a usuarios calificar un producto (1-5 estrellas). Cada usuario
+        tiene un voto por producto; calificacion es el promedio de los votos.
+        """
         producto = self.get_object()
         calificacion = request.data.get('calificacion')
         
@@ -81,14 +201,31 @@ class ProductoViewSet(viewsets.ModelViewSet):
             calificacion = float(calificacion)
             if not (1 <= calificacion <= 5):
                 raise ValueError
-            producto.calificacion = calificacion
-            producto.save()
-            return Response({
-                'mensaje': f'Producto calificado con {calificacion} estrellas',
-                'calificacion': producto.calificacion
-            })
         except (ValueError, TypeError):
             return Response(
                 {'error': 'Calificación debe estar entre 1 y 5'},
                 status=status.HTTP_400_BAD_REQUEST
-            )
\ No newline at end of file
+            )
+
+        try:
+            promedio, total = Producto.objects.calificar(producto.pk, request.user, calificacion)
+        except Producto.DoesNotExist as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+
+        # update() no emite post_save: el peso del autocompletado y la cache se actualizan aquí
+        producto.calificacion = promedio
+        transaction.on_commit(lambda: autocompletado.calificacion_cambiada(producto))
+        transaction.on_commit(incrementar_version)
+        return Response({
+            'mensaje': f'Producto calificado con {calificacion} estrellas',
+            'calificacion': promedio,
+            'calificaciones_total': total
+        })
+
+
+class CacheCatalogoView(APIView):
+    """Contadores de aciertos/fallos de la cache del menú (solo administradores)"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(estadisticas())
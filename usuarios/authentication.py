@@ -0,0 +1,112 @@
+"""
+Autenticación JWT que guarda en cache la proyección mínima del usuario.
+
+JWTAuthentication consulta la fila de CustomUser en cada petición autenticada.
+Aquí se guardan (id, username, rol, is_staff, is_active) por id de usuario
+durante JWT_USUARIO_CACHE_TIMEOUT segundos y el usuario se reconstruye con
+Model.from_db: el resto de campos quedan diferidos, como con .only(), y se
+cargan solo si alguna vista los usa. Guardar o borrar un CustomUser invalida
+su entrada (ver usuarios/signals.py).
+
+Con JWT_SOLO_CLAIMS = True y un token con los claims de RefreshTokenUsuario, el
+usuario se arma desde el token y autorizar no toca la base de datos (ver
+usuarios/tokens.py). En ambos modos se rechazan los jti revocados. En el modo
+de claims el usuario desactivado o borrado se rechaza por la marca que deja
+bloquear_usuario() en la cache durante ACCESS_TOKEN_LIFETIME.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .tokens import CLAIMS_USUARIO, revocados
+
+CAMPOS_USUARIO = ('id', 'username', 'rol', 'is_staff', 'is_active')
+
+
+def clave_usuario(user_id):
+    return f'auth:usuario:{user_id}'
+
+
+def invalidar_usuario(user_id):
+    cache.delete(clave_usuario(user_id))
+
+
+def clave_bloqueo(user_id):
+    return f'auth:bloqueado:{user_id}'
+
+
+def bloquear_usuario(user_id):
+    """Rechaza los access tokens con claims ya emitidos del usuario hasta que venzan"""
+    cache.set(clave_bloqueo(user_id), True, int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()))
+
+
+def desbloquear_usuario(user_id):
+    cache.delete(clave_bloqueo(user_id))
+
+
+class JWTCacheAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        user = self.usuario_sin_consulta(validated_token)
+        if user is not None:
+            return user
+
+        timeout = getattr(settings, 'JWT_USUARIO_CACHE_TIMEOUT', 60)
+        if not timeout or not self.proyeccion_soportada():
+            return super().get_user(validated_token)
+
+        user_id = self.user_id(validated_token)
+        valores = self.user_model.objects.filter(id=user_id).values_list(*self.campos()).first()
+        if valores is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        cache.set(clave_usuario(user_id), valores, timeout)
+        return self.construir_usuario(valores)
+
+    def usuario_sin_consulta(self, validated_token):
+        """
+        Usuario armado desde los claims del token o desde la cache; None si hace
+        falta consultar la base de datos. Lo usan también las vistas async.
+        """
+        if revocados.contiene(validated_token.get(api_settings.JTI_CLAIM)):
+            raise AuthenticationFailed("Token revocado", code="token_revoked")
+        if not self.proyeccion_soportada():
+            return None
+
+        user_id = self.user_id(validated_token)
+        # Los tokens emitidos sin los claims (p. ej. antes de activar el modo) se resuelven como siempre
+        if getattr(settings, 'JWT_SOLO_CLAIMS', False) and all(c in validated_token for c in CLAIMS_USUARIO):
+            if cache.get(clave_bloqueo(user_id)):
+                raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+            datos = {claim: validated_token[claim] for claim in CLAIMS_USUARIO}
+            datos['id'] = user_id
+            valores = [datos[campo] for campo in self.campos()]
+        elif getattr(settings, 'JWT_USUARIO_CACHE_TIMEOUT', 60):
+            valores = cache.get(clave_usuario(user_id))
+            if valores is None:
+                return None
+        else:
+            return None
+        return self.construir_usuario(valores)
+
+    def proyeccion_soportada(self):
+        # Revisar el hash de la contraseña necesita la fila completa
+        return not api_settings.CHECK_REVOKE_TOKEN and api_settings.USER_ID_FIELD == 'id'
+
+    def user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+    def campos(self):
+        # from_db espera los valores en el orden de los campos del modelo
+        return [f.attname for f in self.user_model._meta.concrete_fields if f.attname in CAMPOS_USUARIO]
+
+    def construir_usuario(self, valores):
+        user = self.user_model.from_db(router.db_for_read(self.user_model), self.campos(), valores)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
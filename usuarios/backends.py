@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from .hashers import hashear_password, verificar_password
+
+
+class HashAcotadoBackend(ModelBackend):
+    """
+    ModelBackend con el hash en el pool acotado de usuarios/hashers.py. La
+    consulta y el guardado del rehash siguen en el hilo de la petición (las
+    conexiones a la base de datos son por hilo).
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hashear igual para no revelar por el tiempo de respuesta qué usuarios existen
+            hashear_password(password)
+            return None
+
+        correcta, rehashear = verificar_password(password, user.password)
+        if not correcta or not self.user_can_authenticate(user):
+            return None
+        if rehashear:
+            # Rehash transparente al algoritmo o parámetros preferidos (PASSWORD_HASHERS[0])
+            user.password = hashear_password(password)
+            user.save(update_fields=['password'])
+        return user
@@ -0,0 +1,94 @@
+"""
+Almacenamiento de los códigos de verificación 2FA.
+
+CODIGOS_2FA_STORE elige dónde viven:
+- 'db' (por defecto): tabla CodigoVerificacion, buscada por el índice único de
+  session_id. Los vencidos se borran con `python manage.py purgar_codigos`.
+- 'cache': solo en la cache de Django, con el mismo tiempo de expiración; la
+  verificación no consulta la base de datos para el código y no queda nada que
+  purgar. Con varios procesos requiere una cache compartida (CACHE_BACKEND=file).
+"""
+import random
+import string
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import CodigoVerificacion
+
+VIGENCIA = timedelta(minutes=10)
+
+
+class SesionInvalida(Exception):
+    pass
+
+
+class CodigoExpirado(Exception):
+    pass
+
+
+class CodigoIncorrecto(Exception):
+    pass
+
+
+def usa_cache():
+    return getattr(settings, 'CODIGOS_2FA_STORE', 'db') == 'cache'
+
+
+def clave_codigo(session_id):
+    return f'2fa:{session_id}'
+
+
+def crear_codigo(usuario, session_id, tipo='login'):
+    """Genera y guarda un código para la sesión; devuelve el código"""
+    if usa_cache():
+        codigo = ''.join(random.choices(string.digits, k=6))
+        cache.set(
+            clave_codigo(session_id),
+            {'usuario_id': usuario.pk, 'codigo': codigo, 'tipo': tipo},
+            int(VIGENCIA.total_seconds()),
+        )
+        return codigo
+
+    return CodigoVerificacion.objects.create(usuario=usuario, tipo=tipo, session_id=session_id).codigo
+
+
+def verificar_codigo(session_id, codigo):
+    """
+    Consume el código de la sesión y devuelve el usuario. Un código solo se puede
+    usar una vez aunque lleguen dos verificaciones a la vez.
+    """
+    if usa_cache():
+        clave = clave_codigo(session_id)
+        datos = cache.get(clave)
+        if datos is None:
+            raise SesionInvalida()
+        if datos['codigo'] != codigo:
+            raise CodigoIncorrecto()
+        # delete() indica si la clave existía: solo una petición gana
+        if not cache.delete(clave):
+            raise CodigoExpirado()
+        try:
+            return get_user_model().objects.get(pk=datos['usuario_id'])
+        except get_user_model().DoesNotExist:
+            raise SesionInvalida()
+
+    try:
+        codigo_obj = CodigoVerificacion.objects.select_related('usuario').get(session_id=session_id)
+    except CodigoVerificacion.DoesNotExist:
+        raise SesionInvalida()
+
+    if not codigo_obj.es_valido():
+        raise CodigoExpirado()
+    if codigo_obj.codigo != codigo:
+        raise CodigoIncorrecto()
+
+    marcados = CodigoVerificacion.objects.filter(
+        pk=codigo_obj.pk, usado=False, expira_en__gt=timezone.now()
+    ).update(usado=True)
+    if not marcados:
+        raise CodigoExpirado()
+    return codigo_obj.usuario
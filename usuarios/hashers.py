@@ -0,0 +1,62 @@
+"""
+Hash de contraseñas fuera del hilo de la petición.
+
+- ScryptAjustableHasher: scrypt (memory-hard) con parámetros desde settings
+  (SCRYPT_WORK_FACTOR, SCRYPT_BLOCK_SIZE, SCRYPT_PARALLELISM). Si cambian, las
+  contraseñas se vuelven a hashear en el siguiente login.
+- ejecutar_hash(): corre el hash en un pool de HASH_WORKERS hilos con una cola
+  de HASH_COLA_MAXIMA; si está lleno lanza HashSaturado (la vista responde 503)
+  en vez de acumular peticiones. hashlib libera el GIL, así que los hilos
+  aprovechan varios núcleos y la memoria de scrypt queda acotada.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import ScryptPasswordHasher, make_password, verify_password
+
+
+class HashSaturado(Exception):
+    pass
+
+
+class ScryptAjustableHasher(ScryptPasswordHasher):
+    # Mismo algorithm que el de Django: verifica los hashes ya guardados
+    work_factor = getattr(settings, 'SCRYPT_WORK_FACTOR', 2**14)
+    block_size = getattr(settings, 'SCRYPT_BLOCK_SIZE', 8)
+    parallelism = getattr(settings, 'SCRYPT_PARALLELISM', 1)
+
+
+_executor = None
+_cupos = None
+_lock = threading.Lock()
+
+
+def _pool():
+    global _executor, _cupos
+    with _lock:
+        if _executor is None:
+            workers = getattr(settings, 'HASH_WORKERS', 2)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hash')
+            _cupos = threading.BoundedSemaphore(workers + getattr(settings, 'HASH_COLA_MAXIMA', 8))
+    return _executor, _cupos
+
+
+def ejecutar_hash(funcion, *args):
+    """Ejecuta funcion(*args) en el pool de hash y espera el resultado"""
+    executor, cupos = _pool()
+    if not cupos.acquire(blocking=False):
+        raise HashSaturado()
+    try:
+        return executor.submit(funcion, *args).result(timeout=getattr(settings, 'HASH_TIMEOUT', 10))
+    finally:
+        cupos.release()
+
+
+def hashear_password(password):
+    return ejecutar_hash(make_password, password)
+
+
+def verificar_password(password, encoded):
+    """(correcta, hay_que_rehashear), igual que django.contrib.auth.hashers.verify_password"""
+    return ejecutar_hash(verify_password, password, encoded)
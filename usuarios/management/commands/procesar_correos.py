@@ -0,0 +1,115 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from django.utils import timezone
+
+from usuarios.models import CorreoPendiente
+
+
+class Command(BaseCommand):
+    help = (
+        "Envía los correos de la bandeja de salida (CorreoPendiente) con un número fijo de hilos. "
+        "Cada hilo reutiliza una sola conexión SMTP por lote y los fallos se reintentan con backoff."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrencia', type=int, default=4, help="Hilos de envío (default: 4)")
+        parser.add_argument('--lote', type=int, default=50, help="Correos reservados por vuelta (default: 50)")
+        parser.add_argument('--intervalo', type=float, default=2.0,
+                            help="Segundos de espera cuando la bandeja está vacía (default: 2)")
+        parser.add_argument('--max-intentos', type=int, default=5,
+                            help="Intentos antes de marcar el correo como fallido (default: 5)")
+        parser.add_argument('--backoff', type=int, default=30,
+                            help="Espera base en segundos entre reintentos, se duplica en cada fallo (default: 30)")
+        parser.add_argument('--reserva', type=int, default=300,
+                            help="Segundos que un correo queda reservado por este worker (default: 300)")
+        parser.add_argument('--una-vez', action='store_true',
+                            help="Vacía los correos listos para enviar y termina (útil en cron y en pruebas)")
+
+    def handle(self, *args, **options):
+        self.opciones = options
+        concurrencia = max(1, options['concurrencia'])
+        enviados = fallidos = 0
+
+        with ThreadPoolExecutor(max_workers=concurrencia, thread_name_prefix='correos') as pool:
+            while True:
+                correos = self.reservar(options['lote'], options['reserva'])
+                if not correos:
+                    if options['una_vez']:
+                        break
+                    time.sleep(options['intervalo'])
+                    continue
+
+                # Repartir el lote entre los hilos: cada grupo usa una sola conexión
+                grupos = [correos[i::concurrencia] for i in range(concurrencia) if correos[i::concurrencia]]
+                resultados = [r for grupo in pool.map(self.enviar_grupo, grupos) for r in grupo]
+                ok, error = self.registrar(resultados)
+                enviados += ok
+                fallidos += error
+
+        self.stdout.write(self.style.SUCCESS(f"Correos enviados: {enviados}, con error: {fallidos}"))
+
+    def reservar(self, lote, segundos):
+        """
+        Toma hasta `lote` correos listos y los marca con un token propio. Mover
+        proximo_intento hacia adelante evita que otro worker los tome; si este
+        proceso muere, la reserva vence y otro worker los reintenta.
+        """
+        ahora = timezone.now()
+        listos = CorreoPendiente.objects.filter(estado='pendiente', proximo_intento__lte=ahora)
+        ids = list(listos.values_list('id', flat=True)[:lote])
+        if not ids:
+            return []
+
+        token = uuid.uuid4().hex
+        listos.filter(id__in=ids).update(
+            reservado_por=token, proximo_intento=ahora + timedelta(seconds=segundos)
+        )
+        return list(CorreoPendiente.objects.filter(reservado_por=token))
+
+    def enviar_grupo(self, correos):
+        """Se ejecuta en un hilo del pool; no toca la base de datos"""
+        resultados = []
+        try:
+            with get_connection() as conexion:
+                for correo in correos:
+                    mensaje = EmailMessage(correo.asunto, correo.mensaje, None, [correo.destinatario],
+                                           connection=conexion)
+                    try:
+                        if not conexion.send_messages([mensaje]):
+                            raise RuntimeError("El backend no envió el mensaje")
+                        resultados.append((correo, None))
+                    except Exception as e:
+                        resultados.append((correo, e))
+        except Exception as e:
+            # Falló la conexión: los correos que no se intentaron cuentan como fallidos
+            resultados.extend((correo, e) for correo in correos[len(resultados):])
+        return resultados
+
+    def registrar(self, resultados):
+        ahora = timezone.now()
+        enviados = [correo.id for correo, error in resultados if error is None]
+        if enviados:
+            CorreoPendiente.objects.filter(id__in=enviados).update(
+                estado='enviado', enviado_en=ahora, intentos=F('intentos') + 1,
+                reservado_por='', ultimo_error=''
+            )
+
+        fallidos = [(correo, error) for correo, error in resultados if error is not None]
+        for correo, error in fallidos:
+            intentos = correo.intentos + 1
+            cambios = {'intentos': intentos, 'reservado_por': '', 'ultimo_error': str(error)[:1000]}
+            if intentos >= self.opciones['max_intentos']:
+                cambios['estado'] = 'fallido'
+            else:
+                espera = min(self.opciones['backoff'] * 2 ** (intentos - 1), 3600)
+                cambios['proximo_intento'] = ahora + timedelta(seconds=espera)
+            CorreoPendiente.objects.filter(id=correo.id).update(**cambios)
+            self.stderr.write(f"Error enviando correo {correo.id} a {correo.destinatario}: {error}")
+
+        return len(enviados), len(fallidos)
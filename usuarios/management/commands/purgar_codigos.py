@@ -0,0 +1,42 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from usuarios.models import CodigoVerificacion
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra los códigos de verificación vencidos por lotes pequeños, cada uno en su "
+        "propia transacción, para no bloquear la tabla mientras se hacen logins"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help="Filas por DELETE (default: 1000)")
+        parser.add_argument('--pausa', type=float, default=0.0,
+                            help="Segundos de espera entre lotes (default: 0)")
+        parser.add_argument('--margen-minutos', type=int, default=0,
+                            help="Conservar los códigos vencidos hace menos de N minutos (default: 0)")
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(minutes=options['margen_minutos'])
+        # Recorre el índice de expira_en; el límite fijo evita perseguir filas que vencen durante la purga
+        vencidos = CodigoVerificacion.objects.filter(expira_en__lt=limite).order_by('expira_en')
+
+        inicio = time.monotonic()
+        total = 0
+        while True:
+            ids = list(vencidos.values_list('id', flat=True)[:options['lote']])
+            if not ids:
+                break
+            borrados, _ = CodigoVerificacion.objects.filter(id__in=ids).delete()
+            total += borrados
+            if len(ids) < options['lote']:
+                break
+            if options['pausa']:
+                time.sleep(options['pausa'])
+
+        segundos = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(f"Códigos vencidos borrados: {total} en {segundos:.1f} s"))
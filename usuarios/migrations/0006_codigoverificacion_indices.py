@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:22
+
+from django.db import migrations, models
+
+
+def vaciar_session_id_en_blanco(apps, schema_editor):
+    # Los '' repetidos violarían el índice único; NULL se permite varias veces
+    CodigoVerificacion = apps.get_model('usuarios', 'CodigoVerificacion')
+    CodigoVerificacion.objects.filter(session_id='').update(session_id=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0005_correopendiente'),
+    ]
+
+    operations = [
+        migrations.RunPython(vaciar_session_id_en_blanco, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='codigoverificacion',
+            name='session_id',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='codigoverificacion',
+            index=models.Index(condition=models.Q(('usado', False)), fields=['usuario', 'tipo', 'expira_en'], name='codigo_vigente_usuario_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='codigoverificacion',
+            index=models.Index(fields=['expira_en'], name='codigo_expira_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:38
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+MOSTRADOS = 20
+
+
+def verificar_duplicados(apps, schema_editor):
+    """
+    Las restricciones fallarían con usuarios que solo difieren en mayúsculas
+    ("Juan" y "juan"). Cuáles conservar lo decide una persona: se aborta con la lista.
+    """
+    CustomUser = apps.get_model('usuarios', 'CustomUser')
+    problemas = []
+    for campo in ('username', 'email'):
+        repetidos = (
+            CustomUser.objects.annotate(valor=Lower(campo)).values('valor')
+            .annotate(total=Count('id')).filter(total__gt=1).values_list('valor', flat=True)
+        )
+        for valor in repetidos[:MOSTRADOS]:
+            usuarios = CustomUser.objects.annotate(valor=Lower(campo)).filter(valor=valor).order_by('id')
+            problemas.append(f"  {campo} '{valor}': " + ', '.join(
+                f"id={pk} ({original})" for pk, original in usuarios.values_list('id', campo)
+            ))
+    if problemas:
+        raise RuntimeError(
+            "Hay usuarios cuyo username o email solo difiere en mayúsculas. Renombra o elimina los "
+            "sobrantes y vuelve a ejecutar migrate:\n" + '\n'.join(problemas)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('usuarios', '0006_codigoverificacion_indices'),
+    ]
+
+    operations = [
+        migrations.RunPython(verificar_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='customuser',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('username'), name='usuario_username_ci_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='customuser',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='usuario_email_ci_unico'),
+        ),
+    ]
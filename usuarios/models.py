@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Lower
 from django.utils import timezone
 from datetime import timedelta
 import random
@@ -11,6 +12,13 @@ class CustomUser(AbstractUser):
     rol = models.CharField(max_length=20, choices=[("admin", "Admin"), ("cliente", "Cliente")], default="cliente")
     verificado_2fa = models.BooleanField(default=False)
 
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # El registro inserta directamente y traduce el IntegrityError (ver RegisterView)
+            models.UniqueConstraint(Lower('username'), name='usuario_username_ci_unico'),
+            models.UniqueConstraint(Lower('email'), name='usuario_email_ci_unico'),
+        ]
+
     def __str__(self):
         return self.username
 # Create your models here.
@@ -26,10 +34,20 @@ class CodigoVerificacion(models.Model):
         choices=[('registro', 'Registro'), ('login', 'Login')],
         default='login'
     )
-    session_id = models.CharField(max_length=100, blank=True, null=True)  # Para manejar 2FA sin depender de Django sessions
+    session_id = models.CharField(max_length=100, blank=True, null=True, unique=True)  # Para manejar 2FA sin depender de Django sessions
     
     class Meta:
         ordering = ['-creado_en']
+        indexes = [
+            # Códigos vigentes de un usuario (parcial: los usados no ocupan espacio en el índice)
+            models.Index(
+                fields=['usuario', 'tipo', 'expira_en'],
+                condition=models.Q(usado=False),
+                name='codigo_vigente_usuario_idx',
+            ),
+            # Para purgar_codigos
+            models.Index(fields=['expira_en'], name='codigo_expira_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.codigo:
@@ -42,4 +60,35 @@ class CodigoVerificacion(models.Model):
         return not self.usado and timezone.now() < self.expira_en
     
     def __str__(self):
-        return f"Código {self.codigo} para {self.usuario.username}"
\ No newline at end of file
+        return f"Código {self.codigo} para {self.usuario.username}"
+
+
+class CorreoPendiente(models.Model):
+    """
+    Bandeja de salida de correos. Las vistas solo insertan aquí y el worker
+    `python manage.py procesar_correos` los envía, reintentando con backoff.
+    """
+    ESTADOS = [('pendiente', 'Pendiente'), ('enviado', 'Enviado'), ('fallido', 'Fallido')]
+
+    destinatario = models.EmailField()
+    asunto = models.CharField(max_length=200)
+    mensaje = models.TextField()
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
+    intentos = models.PositiveIntegerField(default=0)
+    # Próximo momento en que el worker puede tomarlo (reintentos y reservas vencidas)
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    reservado_por = models.CharField(max_length=36, blank=True)
+    ultimo_error = models.TextField(blank=True)
+    creado_en = models.DateTimeField(auto_now_add=True)
+    enviado_en = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['proximo_intento']
+        verbose_name_plural = "Correos pendientes"
+        indexes = [
+            models.Index(fields=['estado', 'proximo_intento']),
+            models.Index(fields=['reservado_por']),
+        ]
+
+    def __str__(self):
+        return f"{self.asunto} para {self.destinatario} ({self.estado})"
@@ -0,0 +1,19 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import bloquear_usuario, desbloquear_usuario, invalidar_usuario
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def usuario_modificado(sender, instance, signal, **kwargs):
+    """Descarta la proyección cacheada por JWTCacheAuthentication"""
+    pk = instance.pk
+    transaction.on_commit(lambda: invalidar_usuario(pk))
+    # Los access tokens con claims no consultan el usuario: desactivarlo o borrarlo los bloquea
+    if signal is post_delete or not instance.is_active:
+        transaction.on_commit(lambda: bloquear_usuario(pk))
+    elif not kwargs.get('created'):
+        transaction.on_commit(lambda: desbloquear_usuario(pk))
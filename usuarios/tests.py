@@ -1,3 +1,434 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from smtplib import SMTPException
+from unittest import mock
+import threading
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail import get_connection
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .models import CodigoVerificacion, CorreoPendiente
+from .tokens import RefreshTokenUsuario, revocados
+from .utils import enviar_codigo_email
+
+User = get_user_model()
+
+
+def procesar_correos(*args):
+    call_command('procesar_correos', '--una-vez', *args, stdout=StringIO(), stderr=StringIO())
+
+
+class BandejaCorreosTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='ana', email='ana@example.com', password='clave-segura-1')
+
+    def test_login_encola_sin_enviar_en_la_peticion(self):
+        response = self.client.post('/api/usuarios/login/', {'username': 'ana', 'password': 'clave-segura-1'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+        correo = CorreoPendiente.objects.get()
+        self.assertEqual(correo.destinatario, 'ana@example.com')
+        self.assertIn(response.data['debug_code'], correo.mensaje)
+
+        procesar_correos()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['ana@example.com'])
+        correo.refresh_from_db()
+        self.assertEqual(correo.estado, 'enviado')
+        self.assertEqual(correo.intentos, 1)
+        self.assertIsNotNone(correo.enviado_en)
+
+    @override_settings(EMAIL_HOST_USER='fastfood@example.com', EMAIL_HOST_PASSWORD='x')
+    def test_enviar_codigo_email_usa_la_bandeja(self):
+        self.assertTrue(enviar_codigo_email('ana@example.com', '123456'))
+        self.assertEqual(len(mail.outbox), 0)
+
+        procesar_correos()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('123456', mail.outbox[0].body)
+
+    def test_una_conexion_por_grupo(self):
+        for i in range(6):
+            CorreoPendiente.objects.create(destinatario=f'c{i}@example.com', asunto='Hola', mensaje='...')
+
+        with mock.patch(
+            'usuarios.management.commands.procesar_correos.get_connection', wraps=get_connection
+        ) as conexion:
+            procesar_correos('--concurrencia', '2')
+
+        self.assertEqual(conexion.call_count, 2)
+        self.assertEqual(len(mail.outbox), 6)
+        self.assertFalse(CorreoPendiente.objects.exclude(estado='enviado').exists())
+
+    def test_reintento_con_backoff_y_fallo_definitivo(self):
+        correo = CorreoPendiente.objects.create(destinatario='ana@example.com', asunto='Hola', mensaje='...')
+
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=SMTPException('caído')
+        ):
+            procesar_correos('--backoff', '60', '--max-intentos', '2')
+            correo.refresh_from_db()
+            self.assertEqual(correo.estado, 'pendiente')
+            self.assertEqual(correo.intentos, 1)
+            self.assertIn('caído', correo.ultimo_error)
+            self.assertGreater(correo.proximo_intento, timezone.now() + timedelta(seconds=50))
+
+            # Aún no toca reintentar
+            procesar_correos('--backoff', '60', '--max-intentos', '2')
+            correo.refresh_from_db()
+            self.assertEqual(correo.intentos, 1)
+
+            CorreoPendiente.objects.filter(pk=correo.pk).update(proximo_intento=timezone.now())
+            procesar_correos('--backoff', '60', '--max-intentos', '2')
+
+        correo.refresh_from_db()
+        self.assertEqual(correo.estado, 'fallido')
+        self.assertEqual(correo.intentos, 2)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_reserva_vencida_se_vuelve_a_tomar(self):
+        # Un worker que murió dejó el correo reservado con una reserva ya vencida
+        CorreoPendiente.objects.create(
+            destinatario='ana@example.com', asunto='Hola', mensaje='...',
+            reservado_por='otro-worker', proximo_intento=timezone.now() - timedelta(seconds=1)
+        )
+        procesar_correos()
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class CodigoVerificacionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='ana', email='ana@example.com', password='clave-segura-1')
+
+    def login(self):
+        response = self.client.post('/api/usuarios/login/', {'username': 'ana', 'password': 'clave-segura-1'})
+        self.assertEqual(response.status_code, 200)
+        return response.data['session_id'], response.data['debug_code']
+
+    def verificar(self, session_id, codigo):
+        return self.client.post('/api/usuarios/verify-code/', {'session_id': session_id, 'codigo': codigo})
+
+    def comprobar_flujo(self):
+        session_id, codigo = self.login()
+        incorrecto = '000000' if codigo != '000000' else '111111'
+
+        self.assertEqual(self.verificar('no-existe', codigo).status_code, 400)
+        self.assertEqual(self.verificar(session_id, incorrecto).status_code, 401)
+
+        response = self.verificar(session_id, codigo)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['username'], 'ana')
+        self.assertIn('access', response.data)
+
+        # Un código solo se usa una vez
+        self.assertEqual(self.verificar(session_id, codigo).status_code, 400)
+
+    def test_flujo_con_base_de_datos(self):
+        self.comprobar_flujo()
+        self.assertTrue(CodigoVerificacion.objects.get().usado)
+
+    @override_settings(CODIGOS_2FA_STORE='cache')
+    def test_flujo_con_cache(self):
+        self.comprobar_flujo()
+        self.assertFalse(CodigoVerificacion.objects.exists())
+
+    @override_settings(CODIGOS_2FA_STORE='cache')
+    def test_cache_no_consulta_la_base_para_el_codigo(self):
+        session_id, codigo = self.login()
+        # Solo se lee el usuario para emitir los tokens
+        with self.assertNumQueries(1):
+            self.assertEqual(self.verificar(session_id, codigo).status_code, 200)
+
+    def test_codigo_vencido(self):
+        session_id, codigo = self.login()
+        CodigoVerificacion.objects.update(expira_en=timezone.now() - timedelta(seconds=1))
+        response = self.verificar(session_id, codigo)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Código expirado o ya usado')
+
+    def test_purgar_codigos_por_lotes(self):
+        vencido = timezone.now() - timedelta(minutes=1)
+        for i in range(7):
+            CodigoVerificacion.objects.create(usuario=self.user, session_id=f'viejo-{i}', expira_en=vencido)
+        vigente = CodigoVerificacion.objects.create(usuario=self.user, session_id='nuevo')
+
+        salida = StringIO()
+        call_command('purgar_codigos', '--lote', '3', stdout=salida)
+
+        self.assertIn('borrados: 7', salida.getvalue())
+        self.assertQuerySetEqual(CodigoVerificacion.objects.all(), [vigente])
+
+
+@override_settings(JWT_USUARIO_CACHE_TIMEOUT=60)
+class JWTCacheAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='ana', email='ana@example.com', password='clave-segura-1')
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def consultas_usuario(self, url='/api/categorias/'):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        return response, [q for q in ctx.captured_queries if 'usuarios_customuser' in q['sql']]
+
+    def test_segunda_peticion_no_consulta_el_usuario(self):
+        response, consultas = self.consultas_usuario()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(consultas), 1)
+
+        response, consultas = self.consultas_usuario()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(consultas, [])
+
+    def test_usuario_cacheado_carga_campos_diferidos(self):
+        self.consultas_usuario()
+        response = self.client.get('/api/categorias/')
+        user = response.wsgi_request.user
+        self.assertEqual((user.pk, user.username, user.rol, user.is_staff), (self.user.pk, 'ana', 'cliente', False))
+        self.assertEqual(user.email, 'ana@example.com')
+
+    def test_guardar_usuario_invalida_la_cache(self):
+        self.assertEqual(self.consultas_usuario('/api/admin/estadisticas/resumen/')[0].status_code, 403)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_staff = True
+            self.user.save()
+        self.assertEqual(self.consultas_usuario('/api/admin/estadisticas/resumen/')[0].status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.consultas_usuario()[0].status_code, 401)
+
+    @override_settings(JWT_USUARIO_CACHE_TIMEOUT=0)
+    def test_timeout_cero_consulta_siempre(self):
+        self.consultas_usuario()
+        self.assertEqual(len(self.consultas_usuario()[1]), 1)
+
+
+@override_settings(JWT_SOLO_CLAIMS=True)
+class TokenSoloClaimsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        revocados.limpiar()
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            username='jefe', email='jefe@example.com', password='clave-segura-1', is_staff=True, rol='admin'
+        )
+        self.refresh = RefreshTokenUsuario.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.refresh.access_token}')
+
+    def consultas_usuario(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        return response, [q for q in ctx.captured_queries if 'usuarios_customuser' in q['sql']]
+
+    def test_access_token_lleva_los_claims(self):
+        access = self.refresh.access_token
+        self.assertEqual(
+            (access['username'], access['rol'], access['is_staff'], access['is_active']), ('jefe', 'admin', True, True)
+        )
+
+    def test_login_admin_emite_tokens_con_claims(self):
+        response = self.client.post('/api/usuarios/admin-login/', {'username': 'jefe', 'password': 'clave-segura-1'})
+        self.assertEqual(AccessToken(response.data['access'])['rol'], 'admin')
+
+    def test_permisos_sin_consultar_el_usuario(self):
+        response, consultas = self.consultas_usuario('/api/admin/estadisticas/resumen/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(consultas, [])
+
+    def test_token_sin_claims_consulta_como_siempre(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.admin).access_token}')
+        response, consultas = self.consultas_usuario('/api/admin/estadisticas/resumen/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(consultas), 1)
+
+    def test_logout_revoca_access_y_refresh(self):
+        response = self.client.post('/api/usuarios/logout/', {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.client.get('/api/admin/estadisticas/resumen/').status_code, 401)
+        response = self.client.post('/api/usuarios/refresh/', {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, 401)
+
+    def test_logout_vale_en_los_demas_procesos(self):
+        self.client.post('/api/usuarios/logout/', {'refresh': str(self.refresh)})
+        # Otro worker: su lista en memoria está vacía, pero comparte la cache
+        revocados.limpiar()
+        self.assertEqual(self.client.get('/api/admin/estadisticas/resumen/').status_code, 401)
+        revocados.limpiar()
+        response = self.client.post('/api/usuarios/refresh/', {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, 401)
+
+    def test_desactivar_corta_el_acceso_y_el_refresh(self):
+        self.assertEqual(self.client.get('/api/admin/estadisticas/resumen/').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.is_active = False
+            self.admin.save()
+
+        response, consultas = self.consultas_usuario('/api/admin/estadisticas/resumen/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(consultas, [])
+        response = self.client.post('/api/usuarios/refresh/', {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, 401)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.is_active = True
+            self.admin.save()
+        self.assertEqual(self.client.get('/api/admin/estadisticas/resumen/').status_code, 200)
+
+    def test_borrar_corta_el_acceso(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.delete()
+        self.assertEqual(self.client.get('/api/admin/estadisticas/resumen/').status_code, 401)
+
+    def test_claim_is_active_falso_se_rechaza(self):
+        self.refresh['is_active'] = False
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.refresh.access_token}')
+        self.assertEqual(self.client.get('/api/admin/estadisticas/resumen/').status_code, 401)
+
+    def test_refresh_actualiza_los_claims(self):
+        self.admin.is_staff = False
+        self.admin.save()
+
+        response = self.client.post('/api/usuarios/refresh/', {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(AccessToken(response.data['access'])['is_staff'])
+
+
+class HashYLimitesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='ana', email='ana@example.com', password='clave-segura-1')
+
+    def login(self, username='ana', password='incorrecta', url='/api/usuarios/login/'):
+        return self.client.post(url, {'username': username, 'password': password})
+
+    def test_hash_memory_hard_y_rehash_al_iniciar_sesion(self):
+        self.assertTrue(self.user.password.startswith('scrypt$'))
+
+        User.objects.filter(pk=self.user.pk).update(
+            password=make_password('clave-segura-1', hasher='pbkdf2_sha256')
+        )
+        response = self.login(password='clave-segura-1')
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('scrypt$'))
+        self.assertTrue(self.user.check_password('clave-segura-1'))
+
+    def test_registro_hashea_con_scrypt(self):
+        response = self.client.post('/api/usuarios/register/', {
+            'username': 'luis', 'email': 'luis@example.com', 'password': 'clave-segura-2'
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(User.objects.get(username='luis').password.startswith('scrypt$'))
+
+    @override_settings(LIMITE_AUTH_USUARIO='3/min', LIMITE_AUTH_IP='100/min')
+    def test_limite_por_usuario_antes_de_hashear(self):
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, 401)
+
+        with mock.patch('usuarios.backends.verificar_password') as verificar:
+            response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        verificar.assert_not_called()
+
+        # Otro usuario desde la misma IP no se ve afectado
+        self.assertEqual(self.login(username='otro').status_code, 401)
+
+    @override_settings(LIMITE_AUTH_USUARIO='100/min', LIMITE_AUTH_IP='4/min')
+    def test_limite_por_ip_en_todas_las_vistas(self):
+        self.assertEqual(self.login(username='a').status_code, 401)
+        self.assertEqual(self.login(username='b', url='/api/usuarios/admin-login/').status_code, 401)
+        self.assertEqual(self.client.post('/api/usuarios/register/', {}).status_code, 400)
+        self.assertEqual(self.login(username='c').status_code, 401)
+        self.assertEqual(self.login(username='d').status_code, 429)
+        self.assertEqual(self.client.post('/api/usuarios/register/', {}).status_code, 429)
+
+    @override_settings(LIMITE_AUTH_USUARIO='100/min', LIMITE_AUTH_IP='2/min')
+    def test_x_forwarded_for_falso_no_estrena_limite(self):
+        # Detrás del proxy (NUM_PROXIES=1) solo cuenta la última entrada, la que agrega el proxy
+        for i in range(2):
+            response = self.client.post('/api/usuarios/login/', {'username': f'u{i}', 'password': 'x'},
+                                        HTTP_X_FORWARDED_FOR=f'203.0.113.{i}, 198.51.100.7')
+            self.assertEqual(response.status_code, 401)
+        response = self.client.post('/api/usuarios/login/', {'username': 'u2', 'password': 'x'},
+                                    HTTP_X_FORWARDED_FOR='203.0.113.99, 198.51.100.7')
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(LIMITE_AUTH_USUARIO='100/min', LIMITE_AUTH_IP='2/min',
+                       REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 0})
+    def test_sin_proxy_ignora_x_forwarded_for(self):
+        for i in range(3):
+            response = self.client.post('/api/usuarios/login/', {'username': f'u{i}', 'password': 'x'},
+                                        HTTP_X_FORWARDED_FOR=f'203.0.113.{i}')
+        self.assertEqual(response.status_code, 429)
+
+    def test_pool_de_hash_saturado_responde_503(self):
+        lleno = threading.BoundedSemaphore(1)
+        lleno.acquire()
+        with mock.patch('usuarios.hashers._pool', return_value=(None, lleno)):
+            response = self.login(password='clave-segura-1')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+class RegistroTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        User.objects.create_user(username='Ana', email='Ana@Example.com', password='clave-segura-1')
+
+    def registrar(self, username, email):
+        return self.client.post('/api/usuarios/register/', {
+            'username': username, 'email': email, 'password': 'clave-segura-2'
+        })
+
+    def test_registro_es_un_solo_insert(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.registrar('luis', 'luis@example.com')
+
+        self.assertEqual(response.status_code, 201)
+        sentencias = [q['sql'] for q in consultas if 'usuarios_customuser' in q['sql']]
+        self.assertEqual(len(sentencias), 1)
+        self.assertTrue(sentencias[0].startswith('INSERT'))
+        self.assertTrue(User.objects.get(username='luis').verificado_2fa)
+
+    def test_conflictos_sin_distinguir_mayusculas(self):
+        response = self.registrar('ANA', 'otra@example.com')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Usuario ya existe')
+
+        response = self.registrar('luis', 'ana@EXAMPLE.com')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Email ya registrado')
+
+        # Un usuario cuyo nombre contiene "email" no se confunde con un email repetido
+        User.objects.create_user(username='miemail', email='mi@example.com')
+        response = self.registrar('MiEmail', 'nuevo@example.com')
+        self.assertEqual(response.data['error'], 'Usuario ya existe')
+
+        self.assertEqual(User.objects.count(), 2)
@@ -0,0 +1,64 @@
+"""
+Token bucket por IP y por nombre de usuario para registro y login.
+
+DRF evalúa los throttles en initial(), antes de la vista, así que una ráfaga
+de intentos se rechaza con 429 sin hashear ninguna contraseña. La tasa usa el
+formato de DRF ("10/min"): capacidad 10 y recarga de 10 fichas por minuto.
+El estado vive en la cache de Django (compartida si CACHE_BACKEND=file).
+La IP sale de get_ident() de DRF, que depende de NUM_PROXIES (ver settings.py).
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    setting = None
+
+    def get_rate(self):
+        # Se lee en cada petición (y no de DEFAULT_THROTTLE_RATES) para poder ajustarlo por entorno
+        return getattr(settings, self.setting, None)
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        ahora = time.time()
+        capacidad, periodo = self.num_requests, self.duration
+        recarga = capacidad / periodo
+        fichas, ultima = cache.get(self.key, (capacidad, ahora))
+        fichas = min(capacidad, fichas + (ahora - ultima) * recarga)
+
+        if fichas < 1:
+            self.espera = (1 - fichas) / recarga
+            cache.set(self.key, (fichas, ahora), periodo)
+            return False
+        cache.set(self.key, (fichas - 1, ahora), periodo)
+        return True
+
+    def wait(self):
+        return getattr(self, 'espera', None)
+
+
+class LimiteAuthIP(TokenBucketThrottle):
+    scope = 'auth_ip'
+    setting = 'LIMITE_AUTH_IP'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LimiteAuthUsuario(TokenBucketThrottle):
+    scope = 'auth_usuario'
+    setting = 'LIMITE_AUTH_USUARIO'
+
+    def get_cache_key(self, request, view):
+        username = request.data.get('username') if hasattr(request.data, 'get') else None
+        if not username:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': str(username).strip().lower()[:150]}
@@ -0,0 +1,115 @@
+"""
+Tokens JWT con los datos que necesitan los permisos (username, rol, is_staff,
+is_active).
+
+RefreshTokenUsuario.for_user agrega esos claims al refresh token y simplejwt los
+copia al access token. Con JWT_SOLO_CLAIMS = True, JWTCacheAuthentication arma
+el usuario desde el token sin consultar la base de datos; los cambios de rol o
+de is_staff se ven cuando el access token expira (ACCESS_TOKEN_LIFETIME), porque
+al refrescarlo los claims se toman otra vez del usuario y un usuario
+desactivado o borrado ya no puede refrescar. Desactivar o borrar un usuario
+además lo bloquea en la cache hasta que venzan sus access tokens (ver
+usuarios/signals.py).
+
+La revocación antes de tiempo usa la lista `revocados`: cada jti se guarda en
+memoria y en la cache compartida hasta que el token vence, así el logout
+atendido por un worker vale también en los demás (con CACHE_BACKEND=locmem
+solo en el proceso que lo atendió).
+"""
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+CLAIMS_USUARIO = ('username', 'rol', 'is_staff', 'is_active')
+
+
+class RefreshTokenUsuario(RefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in CLAIMS_USUARIO:
+            token[claim] = getattr(user, claim)
+        return token
+
+
+class TokenObtainPairUsuarioSerializer(TokenObtainPairSerializer):
+    """Para /api/login/ (TokenObtainPairView), ver SIMPLE_JWT en settings"""
+    token_class = RefreshTokenUsuario
+
+
+class TokenRefreshUsuarioSerializer(TokenRefreshSerializer):
+    """Para /api/token/refresh/: rechaza refresh revocados y actualiza los claims"""
+    token_class = RefreshTokenUsuario
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if revocados.contiene(refresh.get(api_settings.JTI_CLAIM)):
+            raise InvalidToken("Token revocado")
+        # El access token nuevo copia los claims del refresh, que pueden estar desactualizados
+        valores = get_user_model().objects.filter(
+            pk=refresh.get(api_settings.USER_ID_CLAIM)
+        ).values_list(*CLAIMS_USUARIO).first()
+        if valores is None or not dict(zip(CLAIMS_USUARIO, valores))['is_active']:
+            raise AuthenticationFailed("La cuenta no existe o está desactivada", code="no_active_account")
+        data = super().validate(attrs)
+
+        access = AccessToken(data['access'])
+        for claim, valor in zip(CLAIMS_USUARIO, valores):
+            access[claim] = valor
+        data['access'] = str(access)
+        return data
+
+
+def clave_revocado(jti):
+    return f'auth:revocado:{jti}'
+
+
+class ListaRevocados:
+    """
+    jti revocados hasta su expiración; los vencidos se descartan solos. El
+    diccionario local responde sin ir a la cache para los jti ya vistos.
+    """
+
+    def __init__(self):
+        self.jtis = {}
+        self.lock = threading.Lock()
+
+    def agregar(self, jti, exp):
+        with self.lock:
+            self.jtis[jti] = exp
+            self._purgar()
+        # Un segundo de más: el token no debe sobrevivir a su marca por el redondeo
+        cache.set(clave_revocado(jti), exp, max(int(exp - time.time()) + 1, 1))
+
+    def contiene(self, jti):
+        if jti in self.jtis:
+            return True
+        exp = cache.get(clave_revocado(jti))
+        if exp is None:
+            return False
+        with self.lock:
+            self.jtis[jti] = exp
+        return True
+
+    def _purgar(self):
+        ahora = time.time()
+        for jti in [jti for jti, exp in self.jtis.items() if exp < ahora]:
+            del self.jtis[jti]
+
+    def limpiar(self):
+        with self.lock:
+            self.jtis.clear()
+
+
+revocados = ListaRevocados()
+
+
+def revocar(token):
+    """Revoca un token validado (access o refresh) hasta que expire"""
+    revocados.agregar(token['jti'], token['exp'])
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import RegisterView, LoginView, VerifyCodeView, AdminLoginView
+from .views import RegisterView, LoginView, VerifyCodeView, AdminLoginView, LogoutView
 from rest_framework_simplejwt.views import TokenRefreshView
 
 urlpatterns = [
@@ -8,4 +8,5 @@ urlpatterns = [
     path("admin-login/", AdminLoginView.as_view(), name="admin-login"),
     path("verify-code/", VerifyCodeView.as_view(), name="verify-code"),
     path("refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("logout/", LogoutView.as_view(), name="logout"),
 ]
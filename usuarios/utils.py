@@ -1,13 +1,23 @@
-from django.core.mail import send_mail
 from django.conf import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+def encolar_correo(destinatario, asunto, mensaje):
+    """
+    Guarda el correo en la bandeja de salida (CorreoPendiente). No abre conexiones
+    SMTP: el envío lo hace el worker `python manage.py procesar_correos`.
+    """
+    from .models import CorreoPendiente
+
+    return CorreoPendiente.objects.create(destinatario=destinatario, asunto=asunto, mensaje=mensaje)
+
+
 def enviar_codigo_email(email, codigo):
     """
-    Envía un código de verificación por email.
-    Retorna True si se envió exitosamente, False en caso contrario.
+    Encola un código de verificación por email en la bandeja de salida.
+    Retorna True si quedó encolado, False en caso contrario.
     """
     try:
         # Validar configuración
@@ -31,23 +41,12 @@ Saludos,
 Equipo FastFood.exe
         """
         
-        logger.info(f"Intentando enviar email a: {email}")
-        logger.info(f"Usando EMAIL_HOST_USER: {settings.EMAIL_HOST_USER}")
-        logger.info(f"Usando EMAIL_HOST: {settings.EMAIL_HOST}")
-        logger.info(f"Usando EMAIL_PORT: {settings.EMAIL_PORT}")
-        
-        send_mail(
-            asunto,
-            mensaje,
-            settings.EMAIL_HOST_USER,  # From
-            [email],                    # To
-            fail_silently=False,
-        )
+        encolar_correo(email, asunto, mensaje)
         
-        logger.info(f"✅ Email enviado exitosamente a {email}")
+        logger.info(f"✅ Email encolado para {email}")
         return True
         
     except Exception as e:
-        logger.error(f"❌ Error al enviar email a {email}: {str(e)}", exc_info=True)
+        logger.error(f"❌ Error al encolar email para {email}: {str(e)}", exc_info=True)
         logger.info(f"MODO DEBUG: Código de verificación para {email}: {codigo}")
         return False
\ No newline at end of file
@@ -1,10 +1,15 @@
 ﻿from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny 
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.contrib.auth import get_user_model, authenticate
+from django.db import IntegrityError, connection, transaction
 from rest_framework import status
-from rest_framework_simplejwt.tokens import RefreshToken
-from .models import CodigoVerificacion
+from rest_framework_simplejwt.exceptions import TokenError
+from .codigos import CodigoExpirado, CodigoIncorrecto, SesionInvalida, crear_codigo, verificar_codigo
+from .hashers import HashSaturado, hashear_password
+from .throttling import LimiteAuthIP, LimiteAuthUsuario
+from .tokens import RefreshTokenUsuario, revocar
+from .utils import encolar_correo
 from django.utils import timezone
 import logging
 import uuid
@@ -12,8 +17,32 @@ import uuid
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
+LIMITES_AUTH = [LimiteAuthIP, LimiteAuthUsuario]
+
+
+def insertar_usuario(user):
+    """
+    Un solo INSERT. Dentro de una transacción (ATOMIC_REQUESTS, tests) va en un
+    savepoint para que un IntegrityError no deje la transacción rota.
+    """
+    if connection.in_atomic_block:
+        with transaction.atomic():
+            user.save(force_insert=True)
+    else:
+        user.save(force_insert=True)
+
+
+def respuesta_saturado():
+    response = Response(
+        {"error": "Servidor ocupado, intenta de nuevo en unos segundos"},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+    response["Retry-After"] = "1"
+    return response
+
 class RegisterView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = LIMITES_AUTH
     
     def post(self, request):
         try:
@@ -27,21 +56,25 @@ class RegisterView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            if User.objects.filter(username=username).exists():
-                return Response({"error": "Usuario ya existe"}, status=status.HTTP_400_BAD_REQUEST)
-            
-            if User.objects.filter(email=email).exists():
-                return Response({"error": "Email ya registrado"}, status=status.HTTP_400_BAD_REQUEST)
-
-            # Create user
-            user = User.objects.create_user(username=username, password=password, email=email)
-            
+            # Create user (el hash se calcula en el pool acotado, ver usuarios/hashers.py)
             # Auto-verify for now to simplify flow
-            user.verificado_2fa = True
-            user.save()
+            user = User(
+                username=User.normalize_username(username),
+                email=User.objects.normalize_email(email),
+                password=hashear_password(password),
+                verificado_2fa=True,
+            )
+            try:
+                insertar_usuario(user)
+            except IntegrityError as e:
+                # Los índices únicos (sin distinguir mayúsculas) deciden si ya existe.
+                # La primera línea nombra el índice; PostgreSQL pone los valores en DETAIL.
+                if 'email' in str(e).splitlines()[0].lower():
+                    return Response({"error": "Email ya registrado"}, status=status.HTTP_400_BAD_REQUEST)
+                return Response({"error": "Usuario ya existe"}, status=status.HTTP_400_BAD_REQUEST)
             
             # Generate tokens immediately
-            refresh = RefreshToken.for_user(user)
+            refresh = RefreshTokenUsuario.for_user(user)
             
             return Response({
                 "message": "Usuario creado exitosamente",
@@ -52,6 +85,8 @@ class RegisterView(APIView):
                 "user_id": user.id
             }, status=status.HTTP_201_CREATED)
             
+        except HashSaturado:
+            return respuesta_saturado()
         except Exception as e:
             logger.error(f"Error en registro: {str(e)}", exc_info=True)
             return Response(
@@ -62,6 +97,7 @@ class RegisterView(APIView):
 
 class LoginView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = LIMITES_AUTH
     
     def post(self, request):
         try:
@@ -84,49 +120,34 @@ class LoginView(APIView):
             
             # Generate 2FA code and session ID
             session_id = str(uuid.uuid4())
-            codigo_obj = CodigoVerificacion.objects.create(
-                usuario=user,
-                tipo='login',
-                session_id=session_id
-            )
+            codigo = crear_codigo(user, session_id, tipo='login')
             
-            # Enviar correo electrónico
-            from django.core.mail import send_mail
-            import threading
-
-            def send_async_email(subject, message, from_email, recipient_list):
-                 try:
-                     send_mail(subject, message, from_email, recipient_list, fail_silently=False)
-                 except Exception as e:
-                     logger.error(f"Error enviando correo: {e}")
-
+            # Encolar el correo: lo envía el worker procesar_correos fuera de la petición
             subject = 'Código de verificación - FastFood'
             message = f'''Hola {user.username},
 
 Tu código de verificación es:
 
-    {codigo_obj.codigo}
+    {codigo}
 
 Este código expira en 10 minutos.
 Si no solicitaste este código, ignora este mensaje.
 '''
-            email_thread = threading.Thread(
-                target=send_async_email,
-                args=(subject, message, None, [user.email])
-            )
-            email_thread.start()
+            encolar_correo(user.email, subject, message)
 
             # Logging para debug en servidor
-            print(f"Código generado para {user.email}: {codigo_obj.codigo}")
+            print(f"Código generado para {user.email}: {codigo}")
             
             return Response({
                 "requires_2fa": True,
                 "session_id": session_id,
                 "message": "Código de verificación enviado. Revisa la consola del servidor.",
                 "email": user.email,  # For demo purposes
-                "debug_code": codigo_obj.codigo # Para facilitar pruebas
+                "debug_code": codigo # Para facilitar pruebas
             }, status=status.HTTP_200_OK)
             
+        except HashSaturado:
+            return respuesta_saturado()
         except Exception as e:
             logger.error(f"Error en login: {str(e)}", exc_info=True)
             return Response(
@@ -149,35 +170,27 @@ class VerifyCodeView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Get codigo_obj by session_id
+            # Consumir el código de la sesión (índice único en DB o cache, ver codigos.py)
             try:
-                codigo_obj = CodigoVerificacion.objects.get(session_id=session_id)
-                user = codigo_obj.usuario
-            except CodigoVerificacion.DoesNotExist:
+                user = verificar_codigo(session_id, codigo)
+            except SesionInvalida:
                 return Response(
                     {"error": "Sesión inválida o expirada"}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            
-            # Verify code
-            if not codigo_obj.es_valido():
+            except CodigoExpirado:
                 return Response(
                     {"error": "Código expirado o ya usado"}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            
-            if codigo_obj.codigo != codigo:
+            except CodigoIncorrecto:
                 return Response(
                     {"error": "Código incorrecto"}, 
                     status=status.HTTP_401_UNAUTHORIZED
                 )
             
-            # Mark code as used
-            codigo_obj.usado = True
-            codigo_obj.save()
-            
             # Generate tokens
-            refresh = RefreshToken.for_user(user)
+            refresh = RefreshTokenUsuario.for_user(user)
             
             logger.info(f"Usuario {user.username} verificado con 2FA exitosamente")
             
@@ -200,6 +213,7 @@ class VerifyCodeView(APIView):
 
 class AdminLoginView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = LIMITES_AUTH
     
     def post(self, request):
         try:
@@ -221,7 +235,7 @@ class AdminLoginView(APIView):
                 )
             
             # Generate tokens directly (NO 2FA for admin)
-            refresh = RefreshToken.for_user(user)
+            refresh = RefreshTokenUsuario.for_user(user)
             
             return Response({
                 "access": str(refresh.access_token),
@@ -232,9 +246,31 @@ class AdminLoginView(APIView):
                 "is_superuser": user.is_superuser
             }, status=status.HTTP_200_OK)
             
+        except HashSaturado:
+            return respuesta_saturado()
         except Exception as e:
             logger.error(f"Error en login admin: {str(e)}", exc_info=True)
             return Response(
                 {"error": f"Error interno del servidor: {str(e)}"}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class LogoutView(APIView):
+    """Revoca el access token actual y, si se envía, el refresh token"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        revocar(request.auth)
+
+        refresh = request.data.get("refresh")
+        if refresh:
+            try:
+                revocar(RefreshTokenUsuario(refresh))
+            except TokenError:
+                return Response(
+                    {"error": "Refresh token inválido"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        return Response({"message": "Sesión cerrada"}, status=status.HTTP_200_OK)
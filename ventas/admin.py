@@ -1,3 +1,29 @@
 from django.contrib import admin
+from .models import VentaPorDia, VentaPorHora, VentaPorProducto
 
-# Register your models here.
+
+class RollupAdmin(admin.ModelAdmin):
+    """Los rollups se calculan solos: en el admin son de solo lectura"""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(VentaPorHora)
+class VentaPorHoraAdmin(RollupAdmin):
+    list_display = ['hora', 'num_ventas', 'unidades', 'ingresos']
+
+
+@admin.register(VentaPorDia)
+class VentaPorDiaAdmin(RollupAdmin):
+    list_display = ['fecha', 'num_ventas', 'unidades', 'ingresos']
+    date_hierarchy = 'fecha'
+
+
+@admin.register(VentaPorProducto)
+class VentaPorProductoAdmin(RollupAdmin):
+    list_display = ['producto', 'num_ventas', 'unidades', 'ingresos']
+    list_select_related = ['producto']
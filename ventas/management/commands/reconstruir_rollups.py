@@ -0,0 +1,72 @@
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Max, Sum
+from django.db.models.functions import TruncDate, TruncHour
+
+from administracion.models import DetalleVenta, Venta
+from ventas.models import VentaPorDia, VentaPorHora, VentaPorProducto
+from ventas.rollups import acumular, acumular_lote
+
+
+class Command(BaseCommand):
+    help = "Reconstruye las tablas de resumen de ventas desde el historial, por lotes de ventas"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=5000, help="Ventas por transacción (default: 5000)")
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+        with transaction.atomic():
+            for modelo in (VentaPorHora, VentaPorDia, VentaPorProducto):
+                modelo.objects.all().delete()
+            # Las ventas posteriores a este id ya se suman en vivo a las tablas vacías
+            hasta_id = Venta.objects.aggregate(maximo=Max('id'))['maximo'] or 0
+
+        inicio = time.monotonic()
+        desde = 0
+        while desde < hasta_id:
+            fin = min(desde + lote, hasta_id)
+            with transaction.atomic():
+                self.acumular_lote(desde, fin)
+            self.stdout.write(f"Ventas {desde + 1}-{fin} de {hasta_id}")
+            desde = fin
+
+        segundos = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"Rollups reconstruidos: {hasta_id} ids de venta en {segundos:.1f} s"
+        ))
+
+    def acumular_lote(self, desde, hasta):
+        ventas = Venta.objects.filter(id__gt=desde, id__lte=hasta)
+        detalles = DetalleVenta.objects.filter(venta_id__gt=desde, venta_id__lte=hasta)
+
+        for campo, modelo, trunc in (('hora', VentaPorHora, TruncHour), ('fecha', VentaPorDia, TruncDate)):
+            unidades = defaultdict(int)
+            for fila in detalles.annotate(bucket=trunc('venta__fecha_venta')).values('bucket').annotate(
+                unidades=Sum('cantidad')
+            ):
+                unidades[fila['bucket']] = fila['unidades']
+
+            for fila in ventas.annotate(bucket=trunc('fecha_venta')).values('bucket').annotate(
+                num_ventas=Count('id'), ingresos=Sum('total')
+            ):
+                acumular(
+                    modelo, {campo: fila['bucket']},
+                    num_ventas=fila['num_ventas'],
+                    unidades=unidades[fila['bucket']],
+                    ingresos=fila['ingresos'],
+                )
+
+        subtotal = ExpressionWrapper(
+            F('cantidad') * F('precio_unitario'), output_field=DecimalField(max_digits=14, decimal_places=2)
+        )
+        por_producto = {
+            fila.pop('producto_id'): fila
+            for fila in detalles.values('producto_id').annotate(
+                num_ventas=Count('venta_id', distinct=True), unidades=Sum('cantidad'), ingresos=Sum(subtotal)
+            )
+        }
+        acumular_lote(VentaPorProducto, 'producto_id', por_producto)
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('productos', '0003_busqueda_texto_completo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaPorDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('num_ventas', models.PositiveIntegerField(default=0)),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'verbose_name_plural': 'Ventas por día',
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.CreateModel(
+            name='VentaPorHora',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hora', models.DateTimeField(unique=True)),
+                ('num_ventas', models.PositiveIntegerField(default=0)),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'verbose_name_plural': 'Ventas por hora',
+                'ordering': ['-hora'],
+            },
+        ),
+        migrations.CreateModel(
+            name='VentaPorProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('num_ventas', models.PositiveIntegerField(default=0)),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='resumen_ventas', to='productos.producto')),
+            ],
+            options={
+                'verbose_name_plural': 'Ventas por producto',
+                'ordering': ['-unidades'],
+                'indexes': [models.Index(fields=['-unidades'], name='ventas_vent_unidade_dfa894_idx'), models.Index(fields=['-ingresos'], name='ventas_vent_ingreso_c3337a_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,53 @@
 from django.db import models
+from productos.models import Producto
 
-# Create your models here.
+
+# Tablas de resumen (rollups) de ventas. Se actualizan de forma incremental al
+# confirmar cada pedido (ver ventas/rollups.py) y se pueden reconstruir desde
+# el historial con `python manage.py reconstruir_rollups`. Las horas y los días
+# se agrupan en la zona horaria local (TIME_ZONE).
+
+class VentaPorHora(models.Model):
+    hora = models.DateTimeField(unique=True)
+    num_ventas = models.PositiveIntegerField(default=0)
+    unidades = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-hora']
+        verbose_name_plural = "Ventas por hora"
+
+    def __str__(self):
+        return f"{self.hora:%Y-%m-%d %H:00} - ${self.ingresos}"
+
+
+class VentaPorDia(models.Model):
+    fecha = models.DateField(unique=True)
+    num_ventas = models.PositiveIntegerField(default=0)
+    unidades = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-fecha']
+        verbose_name_plural = "Ventas por día"
+
+    def __str__(self):
+        return f"{self.fecha} - ${self.ingresos}"
+
+
+class VentaPorProducto(models.Model):
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, related_name='resumen_ventas')
+    num_ventas = models.PositiveIntegerField(default=0)
+    unidades = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-unidades']
+        verbose_name_plural = "Ventas por producto"
+        indexes = [
+            models.Index(fields=['-unidades']),
+            models.Index(fields=['-ingresos']),
+        ]
+
+    def __str__(self):
+        return f"{self.producto.nombre} - {self.unidades} unidades"
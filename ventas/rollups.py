@@ -0,0 +1,95 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from .models import VentaPorDia, VentaPorHora, VentaPorProducto
+
+
+def acumular(modelo, claves, **valores):
+    """Suma valores a la fila identificada por claves (la crea si no existe)"""
+    incrementos = {campo: F(campo) + valor for campo, valor in valores.items()}
+    if modelo.objects.filter(**claves).update(**incrementos):
+        return
+    try:
+        with transaction.atomic():
+            modelo.objects.create(**claves, **valores)
+    except IntegrityError:
+        # Otra transacción creó la fila al mismo tiempo
+        modelo.objects.filter(**claves).update(**incrementos)
+
+
+def acumular_lote(modelo, campo, valores_por_clave):
+    """
+    Como acumular() pero para muchas filas con un número fijo de consultas:
+    un SELECT de las claves existentes, un UPDATE con CASE y un bulk_create.
+    valores_por_clave: {clave: {campo_numerico: valor}}
+    """
+    if not valores_por_clave:
+        return
+    existentes = set(
+        modelo.objects.filter(**{f'{campo}__in': valores_por_clave.keys()}).values_list(campo, flat=True)
+    )
+    if existentes:
+        columnas = next(iter(valores_por_clave.values())).keys()
+        modelo.objects.filter(**{f'{campo}__in': existentes}).update(**{
+            columna: F(columna) + Case(
+                *[When(**{campo: clave, 'then': Value(valores_por_clave[clave][columna])}) for clave in existentes],
+                output_field=modelo._meta.get_field(columna),
+            )
+            for columna in columnas
+        })
+    nuevos = [clave for clave in valores_por_clave if clave not in existentes]
+    try:
+        with transaction.atomic():
+            modelo.objects.bulk_create([
+                modelo(**{campo: clave}, **valores_por_clave[clave]) for clave in nuevos
+            ])
+    except IntegrityError:
+        for clave in nuevos:
+            acumular(modelo, {campo: clave}, **valores_por_clave[clave])
+
+
+def inicio_de_hora(fecha):
+    return timezone.localtime(fecha).replace(minute=0, second=0, microsecond=0)
+
+
+def registrar_venta(venta, detalles, signo=1):
+    """
+    Suma una venta recién creada a los rollups (signo=-1 la resta). Debe llamarse
+    dentro de la misma transacción que crea la venta, así ambos se confirman (o
+    revierten) juntos.
+    """
+    unidades = sum(detalle.cantidad for detalle in detalles)
+    hora = inicio_de_hora(venta.fecha_venta)
+    acumular(VentaPorHora, {'hora': hora}, num_ventas=signo, unidades=signo * unidades, ingresos=signo * venta.total)
+    acumular(VentaPorDia, {'fecha': hora.date()}, num_ventas=signo, unidades=signo * unidades,
+             ingresos=signo * venta.total)
+
+    por_producto = defaultdict(lambda: {'num_ventas': signo, 'unidades': 0, 'ingresos': 0})
+    for detalle in detalles:
+        por_producto[detalle.producto_id]['unidades'] += signo * detalle.cantidad
+        por_producto[detalle.producto_id]['ingresos'] += signo * detalle.cantidad * detalle.precio_unitario
+    acumular_lote(VentaPorProducto, 'producto_id', por_producto)
+
+
+def _aplicar_guardada(venta, signo):
+    guardada = type(venta).objects.prefetch_related('detalles').filter(pk=venta.pk).first()
+    if guardada is not None:
+        registrar_venta(guardada, list(guardada.detalles.all()), signo)
+
+
+def quitar_venta(venta):
+    """
+    Resta de los rollups la venta tal como está en la base, con sus detalles.
+    Para los cambios que no pasan por crear_pedido (API y admin de Django): se
+    llama antes de modificar o borrar la venta, en la misma transacción, y tras
+    modificarla sumar_venta() agrega la versión nueva.
+    """
+    _aplicar_guardada(venta, -1)
+
+
+def sumar_venta(venta):
+    """Suma a los rollups la venta tal como está en la base (ver quitar_venta)"""
+    _aplicar_guardada(venta, 1)
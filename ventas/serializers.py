@@ -0,0 +1,22 @@
+from rest_framework import serializers
+from .models import VentaPorDia, VentaPorHora, VentaPorProducto
+
+
+class VentaPorHoraSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = VentaPorHora
+        fields = ['hora', 'num_ventas', 'unidades', 'ingresos']
+
+
+class VentaPorDiaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = VentaPorDia
+        fields = ['fecha', 'num_ventas', 'unidades', 'ingresos']
+
+
+class VentaPorProductoSerializer(serializers.ModelSerializer):
+    producto_nombre = serializers.CharField(source='producto.nombre', read_only=True)
+
+    class Meta:
+        model = VentaPorProducto
+        fields = ['producto', 'producto_nombre', 'num_ventas', 'unidades', 'ingresos']
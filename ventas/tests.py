@@ -1,3 +1,156 @@
-from django.test import TestCase
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from administracion.models import DetalleVenta, Venta
+from productos.models import Categoria, Producto
+from usuarios.models import CustomUser
+
+from .models import VentaPorDia, VentaPorHora, VentaPorProducto
+
+
+class RollupsVentasTests(TestCase):
+    """Rollups de ventas: incrementales al confirmar pedidos y reconstruibles"""
+
+    def setUp(self):
+        self.usuario = CustomUser.objects.create_user(username='cliente', email='cliente@test.com', password='x')
+        categoria = Categoria.objects.create(nombre='Hamburguesas')
+        self.sencilla = Producto.objects.create(nombre='Sencilla', precio=20000, stock=100, categoria=categoria)
+        self.doble = Producto.objects.create(nombre='Doble', precio=30000, stock=100, categoria=categoria)
+
+    def crear_pedidos(self):
+        Venta.crear_pedido(self.usuario, {self.sencilla.id: 2, self.doble.id: 1})
+        Venta.crear_pedido(self.usuario, {self.doble.id: 3})
+
+    def resumen(self):
+        return {
+            'horas': list(VentaPorHora.objects.values_list('hora', 'num_ventas', 'unidades', 'ingresos')),
+            'dias': list(VentaPorDia.objects.values_list('fecha', 'num_ventas', 'unidades', 'ingresos')),
+            'productos': list(VentaPorProducto.objects.order_by('producto_id').values_list(
+                'producto_id', 'num_ventas', 'unidades', 'ingresos'
+            )),
+        }
+
+    def test_pedidos_actualizan_los_rollups(self):
+        self.crear_pedidos()
+        dia = VentaPorDia.objects.get()
+        self.assertEqual((dia.num_ventas, dia.unidades, dia.ingresos), (2, 6, Decimal('160000.00')))
+        self.assertEqual(dia.fecha, timezone.localdate())
+        hora = VentaPorHora.objects.get()
+        self.assertEqual(timezone.localtime(hora.hora).minute, 0)
+        doble = VentaPorProducto.objects.get(producto=self.doble)
+        self.assertEqual((doble.num_ventas, doble.unidades, doble.ingresos), (2, 4, Decimal('120000.00')))
+
+    def test_reconstruir_da_lo_mismo_que_lo_incremental(self):
+        self.crear_pedidos()
+        # Una venta vieja creada por fuera del checkout (p. ej. desde el admin)
+        vieja = Venta.objects.create(usuario=self.usuario, fecha_venta=timezone.now() - timedelta(days=3))
+        DetalleVenta.objects.create(venta=vieja, producto=self.sencilla, cantidad=1)
+        Venta.objects.filter(pk=vieja.pk).update(total=20000)
+
+        incremental = self.resumen()
+        call_command('reconstruir_rollups', lote=1, stdout=StringIO())
+        reconstruido = self.resumen()
+
+        self.assertEqual(len(reconstruido['dias']), 2)
+        self.assertEqual(VentaPorProducto.objects.get(producto=self.sencilla).unidades, 3)
+        self.assertEqual(
+            [d for d in reconstruido['dias'] if d[0] == timezone.localdate()],
+            incremental['dias']
+        )
+
+
+class RollupsCambiosAdminTests(TestCase):
+    """Ventas creadas, editadas o borradas fuera de crear_pedido también ajustan los rollups"""
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(
+            username='admin', email='admin@test.com', password='x', is_staff=True, is_superuser=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        categoria = Categoria.objects.create(nombre='Hamburguesas')
+        self.producto = Producto.objects.create(nombre='Doble', precio=30000, stock=100, categoria=categoria)
+        self.venta, _ = Venta.crear_pedido(self.admin, {self.producto.id: 2})
+
+    def totales(self):
+        dia = VentaPorDia.objects.get()
+        hora = VentaPorHora.objects.get()
+        producto = VentaPorProducto.objects.get(producto=self.producto)
+        self.assertEqual((hora.num_ventas, hora.unidades, hora.ingresos), (dia.num_ventas, dia.unidades, dia.ingresos))
+        return (dia.num_ventas, dia.unidades, dia.ingresos), (producto.num_ventas, producto.unidades, producto.ingresos)
+
+    def test_borrar_desde_la_api_descuenta(self):
+        Venta.crear_pedido(self.admin, {self.producto.id: 1})
+        response = self.client.delete(f'/api/admin/ventas/{self.venta.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.totales(), ((1, 1, Decimal('30000.00')), (1, 1, Decimal('30000.00'))))
+
+    def test_crear_desde_la_api_suma(self):
+        response = self.client.post('/api/admin/ventas/', {'usuario': self.admin.id})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.totales()[0], (2, 2, Decimal('60000.00')))
+
+    def test_borrar_desde_el_admin_de_django_descuenta(self):
+        cliente = Client()
+        cliente.force_login(self.admin)
+        response = cliente.post('/admin/administracion/venta/', {
+            'action': 'delete_selected', '_selected_action': [self.venta.id], 'post': 'yes',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Venta.objects.exists())
+        self.assertEqual(self.totales(), ((0, 0, Decimal('0.00')), (0, 0, Decimal('0.00'))))
+
+
+class EstadisticasEndpointTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        admin = CustomUser.objects.create_user(username='admin', email='admin@test.com', password='x', is_staff=True)
+        self.client.force_authenticate(admin)
+        categoria = Categoria.objects.create(nombre='Pizza')
+        self.productos = Producto.objects.bulk_create([
+            Producto(nombre=f'Pizza {i}', precio=1000, categoria=categoria) for i in range(3)
+        ])
+        hoy = timezone.localdate()
+        zona = timezone.get_current_timezone()
+        for dias in range(3):
+            fecha = hoy - timedelta(days=dias)
+            VentaPorDia.objects.create(fecha=fecha, num_ventas=2, unidades=4, ingresos=Decimal('5000.00'))
+            VentaPorHora.objects.create(
+                hora=datetime(fecha.year, fecha.month, fecha.day, 12, tzinfo=zona),
+                num_ventas=2, unidades=4, ingresos=Decimal('5000.00')
+            )
+        for i, producto in enumerate(self.productos):
+            VentaPorProducto.objects.create(producto=producto, num_ventas=1, unidades=10 - i, ingresos=1000 * (i + 1))
+
+    def test_resumen_con_ticket_promedio_en_una_consulta(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/admin/estadisticas/resumen/')
+        self.assertEqual(response.data['num_ventas'], 6)
+        self.assertEqual(response.data['ingresos'], '15000.00')
+        self.assertEqual(response.data['ticket_promedio'], '2500.00')
+
+    def test_series_por_dia_y_hora(self):
+        hoy = timezone.localdate()
+        response = self.client.get('/api/admin/estadisticas/por-dia/', {'desde': hoy - timedelta(days=1)})
+        self.assertEqual([d['fecha'] for d in response.data], [str(hoy - timedelta(days=1)), str(hoy)])
+        response = self.client.get('/api/admin/estadisticas/por-hora/')
+        self.assertEqual(len(response.data), 1)
+        response = self.client.get('/api/admin/estadisticas/por-dia/', {'desde': '2020-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_top_productos(self):
+        response = self.client.get('/api/admin/estadisticas/productos/', {'limite': 2})
+        self.assertEqual([p['producto_nombre'] for p in response.data], ['Pizza 0', 'Pizza 1'])
+        response = self.client.get('/api/admin/estadisticas/productos/', {'orden': 'ingresos', 'limite': 1})
+        self.assertEqual(response.data[0]['producto'], self.productos[2].id)
+
+    def test_solo_administradores(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/admin/estadisticas/resumen/').status_code, 401)
@@ -0,0 +1,13 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import ResumenVentasView, VentaPorDiaViewSet, VentaPorHoraViewSet, VentaPorProductoViewSet
+
+router = DefaultRouter()
+router.register(r'por-hora', VentaPorHoraViewSet, basename='venta-por-hora')
+router.register(r'por-dia', VentaPorDiaViewSet, basename='venta-por-dia')
+router.register(r'productos', VentaPorProductoViewSet, basename='venta-por-producto')
+
+urlpatterns = [
+    path('resumen/', ResumenVentasView.as_view(), name='ventas-resumen'),
+    path('', include(router.urls)),
+]
@@ -1,3 +1,98 @@
-from django.shortcuts import render
+from datetime import datetime, time, timedelta
+from decimal import Decimal
 
-# Create your views here.
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import VentaPorDia, VentaPorHora, VentaPorProducto
+from .serializers import VentaPorDiaSerializer, VentaPorHoraSerializer, VentaPorProductoSerializer
+
+
+# Todas las consultas leen los rollups con un rango de fechas acotado, así el
+# costo no depende de cuánto historial de ventas exista.
+
+def rango_fechas(request, dias_por_defecto, dias_maximos):
+    """Lee ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD (ambos inclusive) con límites"""
+    hoy = timezone.localdate()
+    try:
+        hasta = parse_date(request.query_params.get('hasta', '')) or hoy
+        desde = parse_date(request.query_params.get('desde', '')) or hasta - timedelta(days=dias_por_defecto - 1)
+    except ValueError:
+        raise ValidationError({'error': 'Fechas inválidas, usa el formato AAAA-MM-DD'})
+    if desde > hasta:
+        raise ValidationError({'error': 'desde debe ser anterior a hasta'})
+    if (hasta - desde).days >= dias_maximos:
+        raise ValidationError({'error': f'El rango máximo es de {dias_maximos} días'})
+    return desde, hasta
+
+
+class VentaPorHoraViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = VentaPorHoraSerializer
+    permission_classes = [IsAdminUser]
+    pagination_class = None
+
+    def get_queryset(self):
+        desde, hasta = rango_fechas(self.request, dias_por_defecto=1, dias_maximos=31)
+        zona = timezone.get_current_timezone()
+        return VentaPorHora.objects.filter(
+            hora__gte=datetime.combine(desde, time.min, tzinfo=zona),
+            hora__lt=datetime.combine(hasta + timedelta(days=1), time.min, tzinfo=zona),
+        ).order_by('hora')
+
+
+class VentaPorDiaViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = VentaPorDiaSerializer
+    permission_classes = [IsAdminUser]
+    pagination_class = None
+
+    def get_queryset(self):
+        desde, hasta = rango_fechas(self.request, dias_por_defecto=30, dias_maximos=366)
+        return VentaPorDia.objects.filter(fecha__range=(desde, hasta)).order_by('fecha')
+
+
+class VentaPorProductoViewSet(viewsets.ReadOnlyModelViewSet):
+    """Productos más vendidos: ?orden=unidades|ingresos&limite=10"""
+    serializer_class = VentaPorProductoSerializer
+    permission_classes = [IsAdminUser]
+    pagination_class = None
+
+    def get_queryset(self):
+        orden = self.request.query_params.get('orden', 'unidades')
+        if orden not in ('unidades', 'ingresos'):
+            raise ValidationError({'error': 'orden debe ser unidades o ingresos'})
+        queryset = VentaPorProducto.objects.select_related('producto').order_by(f'-{orden}', 'producto_id')
+        if self.action == 'list':
+            try:
+                limite = min(max(int(self.request.query_params.get('limite', 10)), 1), 100)
+            except ValueError:
+                limite = 10
+            queryset = queryset[:limite]
+        return queryset
+
+
+class ResumenVentasView(APIView):
+    """Totales y ticket promedio de un rango de días (por defecto, los últimos 30)"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        desde, hasta = rango_fechas(request, dias_por_defecto=30, dias_maximos=366)
+        totales = VentaPorDia.objects.filter(fecha__range=(desde, hasta)).aggregate(
+            num_ventas=Sum('num_ventas'), unidades=Sum('unidades'), ingresos=Sum('ingresos')
+        )
+        num_ventas = totales['num_ventas'] or 0
+        ingresos = totales['ingresos'] or Decimal('0.00')
+        ticket = (ingresos / num_ventas).quantize(Decimal('0.01')) if num_ventas else Decimal('0.00')
+        return Response({
+            'desde': desde,
+            'hasta': hasta,
+            'num_ventas': num_ventas,
+            'unidades': totales['unidades'] or 0,
+            'ingresos': f'{ingresos:.2f}',
+            'ticket_promedio': f'{ticket:.2f}',
+        })